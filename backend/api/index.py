@@ -1,11 +1,20 @@
 """
 Vercel serverless function entry point for FastAPI
 This file is required for Vercel to deploy FastAPI as a serverless function.
+
+Everything built here (settings, the app, and the HTTP and storage clients
+created on first use) lives at module level, so warm invocations reuse it.
+Only a cold start pays for imports; keep them cheap and check with:
+    python -m benchmarks.cold_start
 """
+import os
+
+# Must be set before app.config is imported (see Settings.SERVERLESS_MODE)
+os.environ.setdefault("SERVERLESS_MODE", "true")
+
 from mangum import Mangum
 from app.main import app
 
 # Create Mangum handler for Vercel serverless functions
 # Mangum is an ASGI-to-AWS-Lambda/Vercel adapter
 handler = Mangum(app, lifespan="off")
-
@@ -1,10 +1,22 @@
 import os
 from typing import List
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Paths rebased under SERVERLESS_WRITABLE_DIR in serverless mode
+_WRITABLE_PATH_FIELDS = (
+    "LOCAL_STORAGE_DIR",
+    "STORAGE_HOT_TIER_DIR",
+    "FILE_CONTENT_CACHE_DISK_DIR",
+    "FILE_INDEX_PATH",
+    "WEATHER_CACHE_DISK_DIR",
+    "JOB_QUEUE_PATH",
+    "IDEMPOTENCY_STORE_PATH"
+)
+
 class Settings(BaseSettings):
     # Storage configuration
     STORAGE_TYPE: str = "gcs"
@@ -19,12 +31,144 @@ class Settings(BaseSettings):
     AWS_REGION: str = "us-east-1"
     S3_BUCKET_NAME: str = ""
     
+    # Local filesystem storage (STORAGE_TYPE=local, for development and tests)
+    LOCAL_STORAGE_DIR: str = ".data/storage"
+    
+    # Stored object format: json, json-gzip, json-zstd or columnar
+    STORAGE_FORMAT: str = "json"
+    
+    # Storage execution (blocking SDK calls run in a bounded thread pool)
+    STORAGE_MAX_WORKERS: int = 32
+    GCS_MAX_CONCURRENCY: int = 16
+    S3_MAX_CONCURRENCY: int = 16
+    LOCAL_MAX_CONCURRENCY: int = 32
+    
+    # Chunk size for streamed object reads (ranged backend reads per chunk)
+    STORAGE_STREAM_CHUNK_SIZE: int = 1024 * 1024
+    
+    # Storage connection pools (one long-lived client per process)
+    GCS_MAX_POOL_CONNECTIONS: int = 16
+    S3_MAX_POOL_CONNECTIONS: int = 16
+    
+    # Local hot tier in front of GCS/S3: writes land on disk and are uploaded
+    # in the background (write-behind); reads check the local copy first
+    STORAGE_HOT_TIER_ENABLED: bool = False
+    STORAGE_HOT_TIER_DIR: str = ".cache/hot"
+    STORAGE_HOT_TIER_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # synced files beyond this are evicted, oldest first
+    STORAGE_HOT_TIER_SYNC_CONCURRENCY: int = 4
+    STORAGE_HOT_TIER_SYNC_RETRY_MAX_SECONDS: float = 60.0
+    STORAGE_HOT_TIER_FLUSH_TIMEOUT_SECONDS: float = 30.0  # shutdown wait for queued uploads
+    
+    # Read-through cache of stored file content (memory LRU + disk tier)
+    FILE_CONTENT_CACHE_ENABLED: bool = True
+    FILE_CONTENT_CACHE_MEMORY_MAX_BYTES: int = 128 * 1024 * 1024
+    FILE_CONTENT_CACHE_DISK_DIR: str = ".cache/files"  # empty string disables the disk tier
+    FILE_CONTENT_CACHE_DISK_MAX_BYTES: int = 1024 * 1024 * 1024
+    FILE_CONTENT_CACHE_REVALIDATE_SECONDS: float = 60.0
+    
+    # Local SQLite index of stored files
+    FILE_INDEX_ENABLED: bool = True
+    FILE_INDEX_PATH: str = ".cache/file_index.sqlite3"
+    FILE_INDEX_RECONCILE_INTERVAL_SECONDS: int = 300
+    FILE_INDEX_RECONCILE_MAX_OBJECTS: int = 50000  # objects listed per reconcile; later runs resume (0 = whole bucket)
+    
+    # Prometheus metrics on /metrics
+    METRICS_ENABLED: bool = True
+    
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:3001"
     
     # Open-Meteo API
     OPEN_METEO_BASE_URL: str = "https://archive-api.open-meteo.com/v1/archive"
     
+    # Upstream HTTP client (shared connection pool)
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP2_ENABLED: bool = False
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 30.0
+    HTTP_WRITE_TIMEOUT: float = 10.0
+    HTTP_POOL_TIMEOUT: float = 5.0
+    
+    # Upstream governor: rate limit, adaptive concurrency, retries and circuit breaker
+    UPSTREAM_GOVERNOR_ENABLED: bool = True
+    UPSTREAM_RATE_LIMIT_PER_SECOND: float = 10.0  # 0 disables the token bucket
+    UPSTREAM_RATE_LIMIT_BURST: int = 20
+    UPSTREAM_INITIAL_CONCURRENCY: int = 8
+    UPSTREAM_MIN_CONCURRENCY: int = 1
+    UPSTREAM_MAX_CONCURRENCY: int = 20  # keep at or below HTTP_MAX_CONNECTIONS
+    UPSTREAM_LATENCY_SPIKE_FACTOR: float = 3.0
+    UPSTREAM_MAX_ATTEMPTS: int = 3
+    UPSTREAM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    UPSTREAM_RETRY_MAX_DELAY_SECONDS: float = 10.0
+    UPSTREAM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    UPSTREAM_CIRCUIT_OPEN_SECONDS: float = 30.0
+    
+    # Open-Meteo archive response cache (memory LRU + disk tier)
+    WEATHER_CACHE_ENABLED: bool = True
+    WEATHER_CACHE_MEMORY_MAX_BYTES: int = 64 * 1024 * 1024
+    WEATHER_CACHE_DISK_DIR: str = ".cache/weather"
+    WEATHER_CACHE_DISK_MAX_BYTES: int = 512 * 1024 * 1024
+    WEATHER_CACHE_COORD_PRECISION: int = 4
+    WEATHER_CACHE_FRESHNESS_DAYS: int = 5
+    
+    # Grid-snapped month tiles under tiles/ in the configured storage: nearby
+    # coordinates share a model grid cell, and any range is assembled from
+    # per-cell month tiles, fetching only the months that are missing
+    WEATHER_TILES_ENABLED: bool = False
+    WEATHER_TILE_GRID_DEGREES: float = 0.1  # ERA5-Land resolution; match the archive model in use
+    WEATHER_TILE_FORMAT: str = "json-gzip"
+    
+    # Request coalescing (identical upstream fetches are always coalesced)
+    COALESCE_STORE_REQUESTS: bool = True
+    
+    # Idempotent stores: content-addressed file names (an identical stored file
+    # is reused instead of uploaded again) and Idempotency-Key replay
+    STORE_IDEMPOTENT: bool = False  # default for requests that don't set "idempotent"
+    IDEMPOTENCY_STORE_PATH: str = ".cache/idempotency.sqlite3"
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 24 * 3600
+    
+    # Batch store endpoint
+    BATCH_MAX_ITEMS: int = 500
+    BATCH_COORDS_PER_REQUEST: int = 50
+    BATCH_FETCH_CONCURRENCY: int = 4
+    BATCH_UPLOAD_CONCURRENCY: int = 16
+    
+    # Long-range mode (ranges over 31 days, fetched in calendar-year chunks)
+    LONG_RANGE_MAX_DAYS: int = 366 * 100
+    # A single merged file holds the whole series in memory while it is
+    # serialized; longer ranges must use long_range_output="manifest"
+    LONG_RANGE_SINGLE_MAX_DAYS: int = 366 * 10
+    LONG_RANGE_CONCURRENCY: int = 4
+    
+    # Asynchronous store jobs (?async=true returns 202 and a job ID)
+    JOBS_ENABLED: bool = True
+    JOB_QUEUE_BACKEND: str = "sqlite"  # sqlite (survives restarts) or memory
+    JOB_QUEUE_PATH: str = ".cache/jobs.sqlite3"
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_MAX_PENDING: int = 10000
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 5.0
+    JOB_LEASE_SECONDS: float = 600.0  # a running job not finished by then is picked up again
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_RESULT_TTL_SECONDS: int = 24 * 3600
+    JOB_SHUTDOWN_TIMEOUT_SECONDS: float = 30.0
+    JOB_CALLBACK_TIMEOUT_SECONDS: float = 10.0
+    JOB_CALLBACK_MAX_ATTEMPTS: int = 3
+    JOB_CALLBACK_ALLOWED_HOSTS: str = ""  # comma-separated; empty disables callbacks
+    
+    # Server-side analytics across stored files
+    ANALYTICS_MAX_FILES: int = 200
+    ANALYTICS_FETCH_CONCURRENCY: int = 16
+    
+    # Serverless entry point (api/index.py turns this on). Relative cache, index
+    # and queue paths move under SERVERLESS_WRITABLE_DIR, the only writable
+    # directory on Vercel and Lambda, the write-behind hot tier is skipped and
+    # async store jobs are rejected
+    SERVERLESS_MODE: bool = False
+    SERVERLESS_WRITABLE_DIR: str = "/tmp"
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -32,6 +176,19 @@ class Settings(BaseSettings):
     @property
     def cors_origins_list(self) -> List[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
+    
+    @property
+    def job_callback_allowed_hosts_list(self) -> List[str]:
+        return [host.strip().lower() for host in self.JOB_CALLBACK_ALLOWED_HOSTS.split(",") if host.strip()]
+    
+    @model_validator(mode="after")
+    def _rebase_writable_paths(self) -> "Settings":
+        if self.SERVERLESS_MODE:
+            for field in _WRITABLE_PATH_FIELDS:
+                path = getattr(self, field)
+                if path and path != ":memory:" and not os.path.isabs(path):
+                    setattr(self, field, os.path.join(self.SERVERLESS_WRITABLE_DIR, path))
+        return self
 
 settings = Settings()
 
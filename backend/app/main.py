@@ -1,8 +1,21 @@
+import asyncio
 import logging
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import weather
+from app.routes import analytics, jobs, weather
 from app.config import settings
+from app.services.http_client import init_http_client, close_http_client, get_http_client
+from app.services.idempotency import close_idempotency_store
+from app.services.jobs import close_job_pool, get_job_pool
+from app.services.upstream_governor import get_upstream_governor
+from app.services.weather_cache import get_weather_cache
+from app.services.weather_tiles import get_weather_tiles
+from app.storage.executor import shutdown_storage_executor
+from app.storage.file_index import close_file_index, get_file_index, run_reconcile_loop
+from app.storage.storage_client import close_storage_clients, flush_storage_clients, storage_client_stats
+from app.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
+from app.utils.singleflight import singleflight_stats
 
 # Configure logging
 logging.basicConfig(
@@ -11,10 +24,38 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: open long-lived clients shared across requests
+    await init_http_client()
+    reconcile_task = None
+    if settings.FILE_INDEX_ENABLED and settings.FILE_INDEX_RECONCILE_INTERVAL_SECONDS > 0:
+        reconcile_task = asyncio.create_task(run_reconcile_loop(settings.FILE_INDEX_RECONCILE_INTERVAL_SECONDS))
+    if settings.JOBS_ENABLED:
+        # Also picks up jobs left queued by a previous run (SQLite queue)
+        get_job_pool().start()
+    yield
+    # Shutdown: stop background jobs, release pooled connections and storage worker threads
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+        try:
+            await reconcile_task
+        except asyncio.CancelledError:
+            pass
+    # Running jobs still need the HTTP and storage clients, so they stop first
+    await close_job_pool(settings.JOB_SHUTDOWN_TIMEOUT_SECONDS)
+    close_file_index()
+    close_idempotency_store()
+    await close_http_client()
+    await flush_storage_clients(settings.STORAGE_HOT_TIER_FLUSH_TIMEOUT_SECONDS)
+    close_storage_clients()
+    shutdown_storage_executor()
+
 app = FastAPI(
     title="Weather Explorer API",
     description="API for fetching and storing weather data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration - Allow all origins (no restrictions)
@@ -26,8 +67,14 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Request metrics (outermost, so it also times CORS handling)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(weather.router, prefix="/api", tags=["weather"])
+app.include_router(analytics.router, prefix="/api", tags=["analytics"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
 
 @app.get("/")
 async def root():
@@ -37,3 +84,26 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/stats")
+async def stats():
+    """Runtime statistics for sizing pools and caches"""
+    weather_cache = get_weather_cache()
+    weather_tiles = get_weather_tiles()
+    file_index = get_file_index()
+    return {
+        "http_pool": get_http_client().stats(),
+        "upstream_governor": get_upstream_governor().stats() if settings.UPSTREAM_GOVERNOR_ENABLED else None,
+        "weather_cache": weather_cache.stats() if weather_cache is not None else None,
+        "weather_tiles": weather_tiles.stats() if weather_tiles is not None else None,
+        "coalescing": singleflight_stats(),
+        "file_index": file_index.stats() if file_index is not None else None,
+        "storage": storage_client_stats(),
+        "jobs": get_job_pool().stats() if settings.JOBS_ENABLED else None
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: request, upstream, storage and serialization latency and volume"""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
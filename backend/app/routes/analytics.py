@@ -0,0 +1,105 @@
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+import asyncio
+import logging
+
+from app.config import settings
+from app.services.weather_service import DAILY_VARIABLES
+from app.storage.file_index import get_file_index
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+class WeatherStatsRequest(BaseModel):
+    files: Optional[List[str]] = Field(None, description="Stored file names to aggregate; omit to select files from the index")
+    latitude: Optional[float] = Field(None, ge=-90, le=90, description="Index query: latitude")
+    longitude: Optional[float] = Field(None, ge=-180, le=180, description="Index query: longitude")
+    tolerance: float = Field(0.01, ge=0, le=10, description="Index query: coordinate tolerance in degrees")
+    start_date: Optional[str] = Field(None, description="Only include days from this date (YYYY-MM-DD)")
+    end_date: Optional[str] = Field(None, description="Only include days up to this date (YYYY-MM-DD)")
+    variables: List[str] = Field(default_factory=lambda: list(DAILY_VARIABLES), description="Daily variables to aggregate")
+    percentiles: List[float] = Field(default_factory=lambda: [5, 25, 50, 75, 95], description="Percentiles between 0 and 100")
+    rolling_window: int = Field(7, ge=1, le=366, description="Rolling mean window in days")
+    include_series: bool = Field(True, description="Include the per-day mean and rolling mean series")
+
+def _bad_request(message: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail={"status": "error", "message": message}
+    )
+
+def _validate(request: WeatherStatsRequest) -> None:
+    unknown = [name for name in request.variables if name not in DAILY_VARIABLES]
+    if unknown:
+        raise _bad_request(f"Unknown variables: {', '.join(unknown)}. Use any of: {', '.join(DAILY_VARIABLES)}")
+    if any(not 0 <= p <= 100 for p in request.percentiles):
+        raise _bad_request("Percentiles must be between 0 and 100")
+    for value in (request.start_date, request.end_date):
+        if value is not None:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise _bad_request("Invalid date format. Use YYYY-MM-DD")
+
+async def _select_files(request: WeatherStatsRequest) -> List[str]:
+    max_files = settings.ANALYTICS_MAX_FILES
+    if request.files is not None:
+        if not request.files:
+            raise _bad_request("files must not be empty")
+        if len(request.files) > max_files:
+            raise _bad_request(f"At most {max_files} files can be aggregated per request")
+        return list(dict.fromkeys(request.files))
+    
+    file_index = get_file_index()
+    if file_index is None:
+        raise _bad_request("Pass files explicitly; the file index is disabled (FILE_INDEX_ENABLED=false)")
+    rows = await asyncio.to_thread(
+        file_index.search,
+        request.latitude,
+        request.longitude,
+        request.tolerance,
+        request.start_date,
+        request.end_date,
+        max_files + 1
+    )
+    if len(rows) > max_files:
+        raise _bad_request(f"The query matches more than {max_files} files; narrow the location or date range")
+    return [row["name"] for row in rows]
+
+@router.post("/analytics/weather-stats")
+async def weather_stats(request: WeatherStatsRequest):
+    """
+    Aggregate daily variables across stored weather files on the server
+    
+    Files come from the request or from a file index query. They are fetched
+    concurrently and reduced with NumPy to per-variable min, max, mean, std
+    and percentiles, the daily range (max - min), and optionally a per-day
+    mean series with a rolling mean. Only these results are returned.
+    """
+    # NumPy is imported on first use: it adds ~75 ms to every cold start otherwise
+    from app.services.analytics_service import compute_weather_statistics, load_weather_files
+    
+    _validate(request)
+    file_names = await _select_files(request)
+    try:
+        datasets, skipped = await load_weather_files(file_names, request.variables)
+        result = await asyncio.to_thread(
+            compute_weather_statistics,
+            datasets,
+            request.variables,
+            request.percentiles,
+            request.rolling_window,
+            request.include_series,
+            request.start_date,
+            request.end_date
+        )
+        logger.info(f"Aggregated {len(datasets)} files ({len(skipped)} skipped) over {result['days']} days")
+        return {"status": "ok", "files": len(datasets), "skipped": skipped, **result}
+    except Exception as e:
+        logger.error(f"Error aggregating weather files: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"status": "error", "message": f"Failed to aggregate weather files: {str(e)}"}
+        )
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+
+from app.services.job_queue import public_job
+from app.services.jobs import get_job_pool
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    callback_status: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """
+    Status of a background job (queued, running, succeeded or failed)
+    
+    A succeeded store job carries the same body the synchronous endpoint
+    returns in `result`. Finished jobs are kept for JOB_RESULT_TTL_SECONDS.
+    """
+    job = await asyncio.to_thread(get_job_pool().queue.get, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"status": "error", "message": f"Job '{job_id}' not found"}
+        )
+    return public_job(job)
@@ -1,13 +1,42 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional
-from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple, Union
+from datetime import date, datetime, timezone
+import asyncio
+import email.utils
+import hashlib
 import json
 import logging
 
-from app.services.weather_service import WeatherService
-from app.storage.storage_client import get_storage_client
-from app.utils.validation import validate_weather_request
+from app.config import settings
+from app.services.idempotency import get_idempotency_store
+from app.services.jobs import PermanentJobError, get_job_pool, register_job_handler
+from app.services.upstream_governor import UpstreamUnavailableError
+from app.services.weather_service import get_weather_service
+from app.services.weather_summary import (
+    MAX_METADATA_SUMMARY_BYTES,
+    decode_summary,
+    encode_summary,
+    merge_summaries,
+    summarize_weather_data
+)
+from app.storage.file_index import get_file_index
+from app.storage.serialization import (
+    COLUMNAR_MEDIA_TYPE,
+    FORMAT_COLUMNAR,
+    FORMAT_JSON,
+    FORMATS,
+    detect_format,
+    deserialize,
+    get_format,
+    serialize,
+    stream_decompressor
+)
+from app.storage.storage_client import decode_cursor, encode_cursor, get_storage_client, is_hidden_object
+from app.utils.metrics import IDEMPOTENCY_REPLAYS, SERIALIZATION_DURATION, STORE_DEDUP
+from app.utils.singleflight import get_singleflight
+from app.utils.validation import validate_callback_url, validate_weather_request
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -17,74 +46,450 @@ class WeatherRequest(BaseModel):
     longitude: float = Field(..., ge=-180, le=180, description="Longitude between -180 and 180")
     start_date: str = Field(..., description="Start date in YYYY-MM-DD format")
     end_date: str = Field(..., description="End date in YYYY-MM-DD format")
+    bypass_cache: bool = Field(False, description="Skip the archive cache and fetch fresh data from Open-Meteo")
+    long_range: bool = Field(False, description="Allow ranges over 31 days, fetched in calendar-year chunks")
+    long_range_output: Literal["single", "manifest"] = Field(
+        "single",
+        description="Long-range output: one merged file, or one file per chunk plus a manifest"
+    )
+    callback_url: Optional[str] = Field(
+        None,
+        description="Async mode only: URL that receives a POST with the finished job"
+    )
+    idempotent: bool = Field(
+        default_factory=lambda: settings.STORE_IDEMPOTENT,
+        description="Name the file by a hash of the request and data, and reuse an identical stored file instead of uploading again"
+    )
 
 class WeatherResponse(BaseModel):
     status: str
     file: Optional[str] = None
     message: Optional[str] = None
+    cache: Optional[str] = None
+    chunks: Optional[int] = None
+    deduplicated: Optional[bool] = None
+
+class JobAcceptedResponse(BaseModel):
+    status: str
+    job_id: str
+    status_url: str
+
+class VariableRange(BaseModel):
+    min: float
+    max: float
+
+class FileSummary(BaseModel):
+    days: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    variables: Dict[str, VariableRange] = {}
 
 class FileInfo(BaseModel):
     name: str
     size: int
     created_at: Optional[str] = None
+    summary: Optional[FileSummary] = None
 
 class FileListResponse(BaseModel):
     files: list[FileInfo]
+    next_cursor: Optional[str] = None
+
+class IndexedFileInfo(FileInfo):
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    content_hash: Optional[str] = None
+
+class FileSearchResponse(BaseModel):
+    files: List[IndexedFileInfo]
+
+class BatchWeatherRequest(BaseModel):
+    items: List[WeatherRequest] = Field(..., min_length=1, description="Locations and date ranges to store")
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str
+    file: Optional[str] = None
+    message: Optional[str] = None
+    cache: Optional[str] = None
+    deduplicated: Optional[bool] = None
+
+class BatchWeatherResponse(BaseModel):
+    status: str
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
 
-@router.post("/store-weather-data", response_model=WeatherResponse)
-async def store_weather_data(request: WeatherRequest):
+# Upstream fields that differ between otherwise identical responses
+_VOLATILE_FIELDS = ("generationtime_ms",)
+
+def _content_digest(request: WeatherRequest, weather_data: Dict[str, Any], start_date: str, end_date: str, suffix: str, format_name: str) -> str:
+    """Hash of the canonical request and payload, used as the idempotent file name suffix"""
+    canonical = {
+        "request": {
+            "latitude": request.latitude,
+            "longitude": request.longitude,
+            "start_date": start_date,
+            "end_date": end_date,
+            "suffix": suffix,
+            "format": format_name
+        },
+        "data": {key: value for key, value in weather_data.items() if key not in _VOLATILE_FIELDS}
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode()).hexdigest()[:16]
+
+async def _find_stored_copy(file_name: str, summary: Dict[str, Any]) -> Optional[str]:
+    """How an existing object under a content-addressed name was found ("index" or "head"), or None"""
+    file_index = get_file_index()
+    if file_index is not None and await asyncio.to_thread(file_index.get, file_name) is not None:
+        return "index"
+    head = await get_storage_client().head_file(file_name)
+    if head is None:
+        return None
+    if file_index is not None:
+        try:
+            await asyncio.to_thread(file_index.upsert, {"name": file_name, "size": head["size"], "summary": summary})
+        except Exception as e:
+            logger.warning(f"Failed to index stored file '{file_name}': {str(e)}")
+    return "head"
+
+async def _upload_weather_data(
+    request: WeatherRequest,
+    weather_data: Dict[str, Any],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    suffix: str = "",
+    storage_format: Optional[str] = None,
+    summary: Optional[Dict[str, Any]] = None
+) -> Tuple[str, bool, bool]:
     """
-    Fetch weather data from Open-Meteo API and store it in cloud storage
+    Serialize weather data and upload it under a generated file name.
+    
+    Returns (file_name, success, deduplicated). Idempotent requests name the
+    file by a hash of the request and data instead of a timestamp; when that
+    object already exists it is returned and the upload is skipped.
+    
+    A summary of the data (computed here unless given) is written to the
+    object's metadata and the file index, so listings can show it.
     """
-    # Validate inputs
-    is_valid, error_message = validate_weather_request(
+    object_format = get_format(storage_format or settings.STORAGE_FORMAT)
+    if summary is None:
+        summary = summarize_weather_data(weather_data)
+    
+    # Generate and sanitize file name (chunk uploads pass their own dates)
+    start_date = start_date or request.start_date
+    end_date = end_date or request.end_date
+    if request.idempotent:
+        name_suffix = _content_digest(request, weather_data, start_date, end_date, suffix, object_format.name)
+    else:
+        name_suffix = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    file_name = f"weather_{request.latitude}_{request.longitude}_{start_date}_{end_date}_{name_suffix}{suffix}{object_format.extension}"
+    # Sanitize file name to handle special characters
+    file_name = file_name.replace('/', '_').replace('\\', '_').replace(' ', '_')
+    
+    if request.idempotent:
+        found_by = await _find_stored_copy(file_name, summary)
+        if found_by is not None:
+            STORE_DEDUP.labels(found_by).inc()
+            logger.info(f"Identical weather data already stored in file: {file_name} (found by {found_by}); skipping upload")
+            return file_name, True, True
+    
+    # Store in cloud storage
+    storage_client = get_storage_client()
+    with SERIALIZATION_DURATION.labels("serialize", object_format.name).time():
+        content = serialize(weather_data, object_format.name)
+    metadata = {"format": object_format.name}
+    encoded_summary = encode_summary(summary)
+    if len(encoded_summary.encode()) <= MAX_METADATA_SUMMARY_BYTES:
+        metadata["summary"] = encoded_summary
+    logger.info(f"Storing weather data to file: {file_name} ({len(content)} bytes, format={object_format.name})")
+    success = await storage_client.upload_file(
+        file_name,
+        content,
+        content_type=object_format.content_type,
+        content_encoding=object_format.content_encoding,
+        metadata=metadata
+    )
+    
+    if not success:
+        logger.error(f"Failed to store file '{file_name}' in cloud storage")
+    else:
+        logger.info(f"Successfully stored weather data to file: {file_name}")
+        await _index_stored_file(file_name, content, summary)
+        if request.idempotent:
+            STORE_DEDUP.labels("uploaded").inc()
+    return file_name, success, False
+
+async def _index_stored_file(file_name: str, content: bytes, summary: Optional[Dict[str, Any]] = None) -> None:
+    """Record a newly stored object in the local file index (best effort)"""
+    file_index = get_file_index()
+    if file_index is None:
+        return
+    try:
+        await asyncio.to_thread(file_index.upsert, {
+            "name": file_name,
+            "size": len(content),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "content_hash": hashlib.sha256(content).hexdigest(),
+            "summary": summary
+        })
+    except Exception as e:
+        # The periodic reconcile will pick the file up; don't fail the store
+        logger.warning(f"Failed to index stored file '{file_name}': {str(e)}")
+
+def _upload_failed(file_name: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail={"status": "error", "message": f"Failed to store file '{file_name}' in cloud storage. Please check storage configuration."}
+    )
+
+async def _fetch_and_store_manifest(request: WeatherRequest) -> WeatherResponse:
+    """Upload each long-range chunk as its own file as it arrives, then a manifest listing them"""
+    weather_service = get_weather_service()
+    chunk_files = []
+    chunk_summaries = []
+    statuses = set()
+    async for chunk_start, chunk_end, chunk_data, cache_status in weather_service.iter_weather_chunks(
+        request.latitude,
+        request.longitude,
+        request.start_date,
+        request.end_date,
+        bypass_cache=request.bypass_cache
+    ):
+        statuses.add(cache_status)
+        chunk_summary = summarize_weather_data(chunk_data)
+        chunk_summaries.append(chunk_summary)
+        file_name, success, _ = await _upload_weather_data(request, chunk_data, chunk_start, chunk_end, summary=chunk_summary)
+        if not success:
+            raise _upload_failed(file_name)
+        chunk_files.append({
+            "file": file_name,
+            "start_date": chunk_start,
+            "end_date": chunk_end,
+            "days": chunk_summary["days"]
+        })
+    
+    manifest = {
+        "type": "manifest",
+        "latitude": request.latitude,
+        "longitude": request.longitude,
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "chunks": chunk_files
+    }
+    # The manifest is summarized over its chunks, not over its own (list of files) content
+    file_name, success, deduplicated = await _upload_weather_data(
+        request, manifest, suffix=".manifest", storage_format=FORMAT_JSON, summary=merge_summaries(chunk_summaries)
+    )
+    if not success:
+        raise _upload_failed(file_name)
+    
+    cache_status = statuses.pop() if len(statuses) == 1 else "partial"
+    return WeatherResponse(
+        status="ok",
+        file=file_name,
+        cache=cache_status,
+        chunks=len(chunk_files),
+        deduplicated=deduplicated if request.idempotent else None
+    )
+
+async def _fetch_and_store(request: WeatherRequest) -> WeatherResponse:
+    """Fetch weather data for a validated request and upload it to cloud storage"""
+    if request.long_range and request.long_range_output == "manifest":
+        return await _fetch_and_store_manifest(request)
+    
+    # Fetch weather data
+    weather_service = get_weather_service()
+    if request.long_range:
+        weather_data, cache_status, chunks = await weather_service.fetch_weather_data_long_range(
+            request.latitude,
+            request.longitude,
+            request.start_date,
+            request.end_date,
+            bypass_cache=request.bypass_cache
+        )
+        file_name, success, deduplicated = await _upload_weather_data(request, weather_data)
+        if not success:
+            raise _upload_failed(file_name)
+        return WeatherResponse(
+            status="ok",
+            file=file_name,
+            cache=cache_status,
+            chunks=chunks,
+            deduplicated=deduplicated if request.idempotent else None
+        )
+    
+    weather_data, cache_status = await weather_service.fetch_weather_data_with_cache_status(
         request.latitude,
         request.longitude,
         request.start_date,
-        request.end_date
+        request.end_date,
+        bypass_cache=request.bypass_cache
     )
     
+    file_name, success, deduplicated = await _upload_weather_data(request, weather_data)
+    
+    if not success:
+        raise _upload_failed(file_name)
+    
+    return WeatherResponse(status="ok", file=file_name, cache=cache_status, deduplicated=deduplicated if request.idempotent else None)
+
+async def _store(request: WeatherRequest) -> WeatherResponse:
+    """Run a validated store request, coalescing identical concurrent ones"""
+    if settings.COALESCE_STORE_REQUESTS:
+        # Identical concurrent store requests share one fetch and one upload
+        key = (
+            request.latitude,
+            request.longitude,
+            request.start_date,
+            request.end_date,
+            request.bypass_cache,
+            request.long_range,
+            request.long_range_output,
+            request.idempotent
+        )
+        response, shared = await get_singleflight("weather-store").do(key, lambda: _fetch_and_store(request))
+        if shared:
+            logger.info(f"Coalesced store request into file: {response.file}")
+        return response
+    return await _fetch_and_store(request)
+
+STORE_JOB_KIND = "store-weather-data"
+
+async def _run_store_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: the same fetch and upload as the synchronous endpoint"""
+    try:
+        response = await _store(WeatherRequest(**payload))
+    except HTTPException as e:
+        message = e.detail.get("message") if isinstance(e.detail, dict) else str(e.detail)
+        if e.status_code < 500:
+            raise PermanentJobError(message)
+        raise RuntimeError(message)
+    return response.model_dump()
+
+register_job_handler(STORE_JOB_KIND, _run_store_job)
+
+def _prefers_async(prefer: Optional[str]) -> bool:
+    # RFC 7240: "Prefer: respond-async"
+    return prefer is not None and any(token.strip().lower() == "respond-async" for token in prefer.split(","))
+
+def _validate_single_output_range(start_date: str, end_date: str) -> Tuple[bool, Optional[str]]:
+    """Merged long-range output is built in memory, so it is capped; manifests stream chunk by chunk"""
+    days = (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days
+    if days > settings.LONG_RANGE_SINGLE_MAX_DAYS:
+        return False, (
+            f"Long ranges over {settings.LONG_RANGE_SINGLE_MAX_DAYS} days must use "
+            f"long_range_output \"manifest\""
+        )
+    return True, None
+
+def _validate_callback_url(callback_url: str) -> None:
+    is_valid, error_message = validate_callback_url(callback_url, settings.job_callback_allowed_hosts_list)
     if not is_valid:
-        logger.warning(f"Invalid weather request: lat={request.latitude}, lon={request.longitude}, dates={request.start_date} to {request.end_date}, error={error_message}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"status": "error", "message": error_message}
         )
+
+async def _submit_store_job(request: WeatherRequest) -> JSONResponse:
+    """Queue a validated store request and answer 202 with the job to poll"""
+    if not settings.JOBS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": "Asynchronous store jobs are disabled"}
+        )
+    if settings.SERVERLESS_MODE:
+        # Both queue backends are per instance: a frozen invocation stalls the
+        # workers, and the job's status URL may be routed to another instance
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": "Asynchronous store jobs are not available in serverless mode"}
+        )
+    if request.callback_url:
+        _validate_callback_url(request.callback_url)
     
-    try:
-        # Fetch weather data
-        weather_service = WeatherService()
-        weather_data = await weather_service.fetch_weather_data(
-            request.latitude,
-            request.longitude,
-            request.start_date,
-            request.end_date
+    pool = get_job_pool()
+    counts = await asyncio.to_thread(pool.queue.counts)
+    if counts["queued"] >= settings.JOB_QUEUE_MAX_PENDING:
+        # Shed load instead of growing the backlog without bound
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"status": "error", "message": "Too many queued store jobs, please retry later"},
+            headers={"Retry-After": str(max(1, int(settings.JOB_POLL_INTERVAL_SECONDS * 5)))}
         )
-        
-        # Generate and sanitize file name
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        file_name = f"weather_{request.latitude}_{request.longitude}_{request.start_date}_{request.end_date}_{timestamp}.json"
-        # Sanitize file name to handle special characters
-        file_name = file_name.replace('/', '_').replace('\\', '_').replace(' ', '_')
-        
-        # Store in cloud storage
-        storage_client = get_storage_client()
-        json_content = json.dumps(weather_data, indent=2).encode('utf-8')
-        logger.info(f"Storing weather data to file: {file_name} ({len(json_content)} bytes)")
-        success = await storage_client.upload_file(file_name, json_content)
-        
-        if not success:
-            logger.error(f"Failed to store file '{file_name}' in cloud storage")
+    
+    job = await pool.submit(STORE_JOB_KIND, request.model_dump(exclude={"callback_url"}), request.callback_url)
+    status_url = f"/api/jobs/{job['id']}"
+    logger.info(f"Queued store job {job['id']}: lat={request.latitude}, lon={request.longitude}, dates={request.start_date} to {request.end_date}")
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=JobAcceptedResponse(status="accepted", job_id=job["id"], status_url=status_url).model_dump(),
+        headers={"Location": status_url}
+    )
+
+def _request_fingerprint(request: WeatherRequest, async_requested: bool) -> str:
+    body = {"request": request.model_dump(), "async": async_requested}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def _idempotent_response(saved: Dict[str, Any], replayed: bool) -> JSONResponse:
+    headers = {"Idempotent-Replayed": "true" if replayed else "false"}
+    if saved["status_code"] == status.HTTP_202_ACCEPTED:
+        headers["Location"] = saved["body"]["status_url"]
+    return JSONResponse(status_code=saved["status_code"], content=saved["body"], headers=headers)
+
+async def _with_idempotency_key(
+    key: str,
+    fingerprint: str,
+    run: Callable[[], Awaitable[Union[WeatherResponse, JSONResponse]]]
+) -> JSONResponse:
+    """Answer from the response saved under key, or run the request and save its response"""
+    if not key or len(key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": "Idempotency-Key must be 1 to 255 characters"}
+        )
+    store = get_idempotency_store()
+    saved = await asyncio.to_thread(store.get, key)
+    if saved is not None:
+        if saved["fingerprint"] != fingerprint:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail={"status": "error", "message": f"Failed to store file '{file_name}' in cloud storage. Please check storage configuration."}
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={"status": "error", "message": "Idempotency-Key was already used with a different request"}
             )
-        
-        logger.info(f"Successfully stored weather data to file: {file_name}")
-        return WeatherResponse(status="ok", file=file_name)
+        IDEMPOTENCY_REPLAYS.inc()
+        logger.info(f"Replaying saved response for Idempotency-Key '{key}'")
+        return _idempotent_response(saved, replayed=True)
+    
+    async def execute() -> Dict[str, Any]:
+        response = await run()
+        if isinstance(response, JSONResponse):
+            saved = {"status_code": response.status_code, "body": json.loads(response.body)}
+        else:
+            saved = {"status_code": status.HTTP_200_OK, "body": response.model_dump()}
+        await asyncio.to_thread(store.put, key, fingerprint, saved["status_code"], saved["body"])
+        return saved
+    
+    # Retries that arrive while the first attempt is still running share its result
+    saved, shared = await get_singleflight("idempotency-key").do((key, fingerprint), execute)
+    return _idempotent_response(saved, replayed=shared)
+
+async def _store_response(request: WeatherRequest) -> WeatherResponse:
+    """Run a validated synchronous store, mapping failures to HTTP errors"""
+    try:
+        return await _store(request)
     
     except HTTPException:
         raise
+    except UpstreamUnavailableError as e:
+        # Throttled or circuit open: tell the client when to come back instead of a 500
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"status": "error", "message": str(e)},
+            headers={"Retry-After": str(max(1, round(e.retry_after if e.retry_after is not None else settings.UPSTREAM_RETRY_MAX_DELAY_SECONDS)))}
+        )
     except Exception as e:
         logger.error(f"Unexpected error in store_weather_data: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -92,25 +497,296 @@ async def store_weather_data(request: WeatherRequest):
             detail={"status": "error", "message": f"Internal server error: {str(e)}"}
         )
 
+@router.post(
+    "/store-weather-data",
+    response_model=WeatherResponse,
+    responses={202: {"model": JobAcceptedResponse, "description": "Queued as a background job (async mode)"}}
+)
+async def store_weather_data(
+    request: WeatherRequest,
+    async_mode: bool = Query(False, alias="async", description="Queue the store and return 202 with a job ID"),
+    prefer: Optional[str] = Header(None, description="'respond-async' is the same as ?async=true"),
+    idempotency_key: Optional[str] = Header(None, description="Retries with the same key and body get the first response back")
+):
+    """
+    Fetch weather data from Open-Meteo API and store it in cloud storage
+    
+    In async mode the request is validated, queued and answered with 202
+    and a job ID at once; poll GET /api/jobs/{job_id} or pass callback_url
+    to receive the finished job.
+    
+    With an Idempotency-Key header, a retry of the same request gets the
+    first response again (Idempotent-Replayed: true) without a new fetch,
+    upload or job. With "idempotent": true the file is named by a hash of
+    the request and data, and an identical stored file is reused.
+    """
+    # Validate inputs
+    is_valid, error_message = validate_weather_request(
+        request.latitude,
+        request.longitude,
+        request.start_date,
+        request.end_date,
+        max_days=settings.LONG_RANGE_MAX_DAYS if request.long_range else 31
+    )
+    
+    if is_valid and request.long_range and request.long_range_output == "single":
+        is_valid, error_message = _validate_single_output_range(request.start_date, request.end_date)
+    
+    if not is_valid:
+        logger.warning(f"Invalid weather request: lat={request.latitude}, lon={request.longitude}, dates={request.start_date} to {request.end_date}, error={error_message}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": error_message}
+        )
+    
+    async_requested = async_mode or _prefers_async(prefer)
+    if request.callback_url and not async_requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": "callback_url requires async mode (?async=true)"}
+        )
+    
+    run = (lambda: _submit_store_job(request)) if async_requested else (lambda: _store_response(request))
+    if idempotency_key is not None:
+        return await _with_idempotency_key(idempotency_key, _request_fingerprint(request, async_requested), run)
+    return await run()
+
+@router.post("/store-weather-data/batch", response_model=BatchWeatherResponse)
+async def store_weather_data_batch(request: BatchWeatherRequest):
+    """
+    Fetch and store weather data for many locations and date ranges in one call
+    
+    Items sharing a date range are fetched together in multi-coordinate
+    Open-Meteo calls, and uploads run concurrently. Each item gets its own
+    result, so one failure does not fail the whole batch.
+    """
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": f"Batch must contain {settings.BATCH_MAX_ITEMS} items or fewer"}
+        )
+    
+    results: List[Optional[BatchItemResult]] = [None] * len(request.items)
+    valid_indexes = []
+    for index, item in enumerate(request.items):
+        is_valid, error_message = validate_weather_request(
+            item.latitude,
+            item.longitude,
+            item.start_date,
+            item.end_date
+        )
+        if is_valid and (item.long_range or item.long_range_output != "single"):
+            is_valid, error_message = False, "long_range items are not supported in batches; use /store-weather-data"
+        if is_valid and item.callback_url:
+            is_valid, error_message = False, "callback_url is not supported in batches; use /store-weather-data?async=true"
+        if is_valid:
+            valid_indexes.append(index)
+        else:
+            results[index] = BatchItemResult(index=index, status="error", message=error_message)
+    
+    try:
+        weather_service = get_weather_service()
+        fetched = await weather_service.fetch_weather_data_batch([
+            (item.latitude, item.longitude, item.start_date, item.end_date, item.bypass_cache)
+            for item in (request.items[i] for i in valid_indexes)
+        ])
+    except Exception as e:
+        # Still a per-item failure: items rejected above keep their own message
+        logger.error(f"Unexpected error in store_weather_data_batch: {str(e)}", exc_info=True)
+        fetched = [Exception(f"Internal server error: {str(e)}")] * len(valid_indexes)
+    
+    semaphore = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+    
+    async def store_item(index: int, outcome: Any) -> None:
+        if isinstance(outcome, Exception):
+            results[index] = BatchItemResult(index=index, status="error", message=str(outcome))
+            return
+        weather_data, cache_status = outcome
+        async with semaphore:
+            try:
+                file_name, success, deduplicated = await _upload_weather_data(request.items[index], weather_data)
+            except Exception as e:
+                logger.error(f"Unexpected error storing batch item {index}: {str(e)}", exc_info=True)
+                results[index] = BatchItemResult(index=index, status="error", message=f"Internal server error: {str(e)}")
+                return
+        if success:
+            results[index] = BatchItemResult(
+                index=index,
+                status="ok",
+                file=file_name,
+                cache=cache_status,
+                deduplicated=deduplicated if request.items[index].idempotent else None
+            )
+        else:
+            results[index] = BatchItemResult(
+                index=index,
+                status="error",
+                file=file_name,
+                message=f"Failed to store file '{file_name}' in cloud storage. Please check storage configuration."
+            )
+    
+    await asyncio.gather(*(store_item(index, outcome) for index, outcome in zip(valid_indexes, fetched)))
+    
+    succeeded = sum(1 for result in results if result.status == "ok")
+    failed = len(results) - succeeded
+    batch_status = "ok" if failed == 0 else "error" if succeeded == 0 else "partial"
+    logger.info(f"Batch store finished: {succeeded} succeeded, {failed} failed")
+    return BatchWeatherResponse(status=batch_status, succeeded=succeeded, failed=failed, results=results)
+
+def _file_info(file: Dict[str, Any], summary: Optional[Dict[str, Any]] = None) -> FileInfo:
+    return FileInfo(
+        name=file["name"],
+        size=file["size"],
+        created_at=file.get("created_at"),
+        summary=summary
+    )
+
+# Files per summary lookup while streaming a listing
+_SUMMARY_LOOKUP_BATCH = 500
+
+# Index rows read per query while streaming a listing from the file index
+_INDEX_STREAM_BATCH = 1000
+
+async def _with_summaries(files: List[Dict[str, Any]]) -> List[FileInfo]:
+    """
+    FileInfo for each listed file, with the summary recorded at store time:
+    from the file index, or else from the object metadata in the listing
+    """
+    file_index = get_file_index()
+    summaries = {}
+    if file_index is not None and files:
+        summaries = await asyncio.to_thread(file_index.summaries, [file["name"] for file in files])
+    return [
+        _file_info(file, summaries.get(file["name"]) or decode_summary((file.get("metadata") or {}).get("summary")))
+        for file in files
+    ]
+
 @router.get("/list-weather-files", response_model=FileListResponse)
-async def list_weather_files():
+async def list_weather_files(
+    page_size: Optional[int] = Query(None, ge=1, le=1000, description="Return one page of this many files"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    prefix: str = Query("", description="Only list files whose names start with this prefix"),
+    created_after: Optional[datetime] = Query(None, description="Only files created at or after this time (UTC if no offset)"),
+    created_before: Optional[datetime] = Query(None, description="Only files created before this time (UTC if no offset)"),
+    format: Literal["json", "ndjson"] = Query("json", description="ndjson streams one file per line"),
+    source: Literal["storage", "index"] = Query("storage", description="index answers from the local file index"),
+    include_summary: bool = Query(False, description="Include each file's stored summary (day count, range, min/max per variable)")
+):
     """
-    List all weather files stored in cloud storage
+    List weather files stored in cloud storage
+    
+    Without page_size all matching files are returned in one response. With
+    page_size one page is returned along with next_cursor. format=ndjson
+    streams every matching file (starting after cursor, if given) without
+    buffering the listing. source=index answers from the local file index
+    instead of listing the bucket.
+    
+    include_summary adds the summary computed when each file was stored.
+    Summaries come from the file index in the same pass (one batched lookup
+    per page), falling back to the object metadata the listing returned;
+    never from the objects' contents. Files with neither get null.
     """
     try:
-        logger.info("Listing weather files from cloud storage")
         storage_client = get_storage_client()
-        files = await storage_client.list_files()
+        start_after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": str(e)}
+        )
+    
+    file_index = get_file_index() if source == "index" else None
+    if source == "index" and file_index is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": "File index is disabled (FILE_INDEX_ENABLED=false)"}
+        )
+    
+    if file_index is not None and format == "json":
+        rows = await asyncio.to_thread(
+            file_index.list, prefix, start_after,
+            page_size + 1 if page_size is not None else None,
+            created_after, created_before
+        )
+        next_cursor = None
+        if page_size is not None and len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor(rows[-1]["name"])
+        logger.info(f"Listed {len(rows)} files from the file index")
+        return FileListResponse(
+            files=[_file_info(row, row["summary"] if include_summary else None) for row in rows],
+            next_cursor=next_cursor
+        )
+    
+    if format == "ndjson":
+        async def stream_lines():
+            count = 0
+            try:
+                if file_index is not None:
+                    # Page through the index so memory stays at one batch, like iter_files
+                    after = start_after
+                    while True:
+                        files = await asyncio.to_thread(
+                            file_index.list, prefix, after, _INDEX_STREAM_BATCH, created_after, created_before
+                        )
+                        for file in files:
+                            count += 1
+                            yield _file_info(file, file["summary"] if include_summary else None).model_dump_json() + "\n"
+                        if len(files) < _INDEX_STREAM_BATCH:
+                            break
+                        after = files[-1]["name"]
+                    logger.info(f"Successfully streamed {count} files from the file index")
+                    return
+                if not include_summary:
+                    async for file in storage_client.iter_files(prefix, start_after, created_after, created_before):
+                        count += 1
+                        yield _file_info(file).model_dump_json() + "\n"
+                    return
+                batch = []
+                async for file in storage_client.iter_files(prefix, start_after, created_after, created_before):
+                    batch.append(file)
+                    if len(batch) >= _SUMMARY_LOOKUP_BATCH:
+                        for info in await _with_summaries(batch):
+                            count += 1
+                            yield info.model_dump_json() + "\n"
+                        batch = []
+                for info in await _with_summaries(batch):
+                    count += 1
+                    yield info.model_dump_json() + "\n"
+            except Exception as e:
+                # Headers are already sent; log and end the stream
+                logger.error(f"Error streaming weather file listing after {count} files: {str(e)}", exc_info=True)
+                return
+            logger.info(f"Successfully streamed {count} files")
+        
+        logger.info("Streaming weather file listing from cloud storage")
+        return StreamingResponse(stream_lines(), media_type="application/x-ndjson")
+    
+    try:
+        if page_size is not None:
+            logger.info(f"Listing page of weather files from cloud storage (page_size={page_size}, prefix='{prefix}')")
+            page = await storage_client.list_files_page(prefix, page_size, cursor, created_after, created_before)
+            if include_summary:
+                file_list = await _with_summaries(page["files"])
+            else:
+                file_list = [_file_info(file) for file in page["files"]]
+            logger.info(f"Successfully listed {len(file_list)} files")
+            return FileListResponse(files=file_list, next_cursor=page["next_cursor"])
+        
+        logger.info("Listing weather files from cloud storage")
+        if prefix or start_after or created_after or created_before:
+            files = [
+                file async for file in storage_client.iter_files(prefix, start_after, created_after, created_before)
+            ]
+        else:
+            # The full listing includes internal objects (tiles/); iter_files skips them
+            files = [file for file in await storage_client.list_files() if not is_hidden_object(file["name"])]
         
         # Filter only weather files (optional, or return all)
-        file_list = [
-            FileInfo(
-                name=file["name"],
-                size=file["size"],
-                created_at=file.get("created_at")
-            )
-            for file in files
-        ]
+        if include_summary:
+            file_list = await _with_summaries(files)
+        else:
+            file_list = [_file_info(file) for file in files]
         
         logger.info(f"Successfully listed {len(file_list)} files")
         return FileListResponse(files=file_list)
@@ -122,10 +798,85 @@ async def list_weather_files():
             detail={"status": "error", "message": f"Failed to list files: {str(e)}"}
         )
 
+@router.get("/search-weather-files", response_model=FileSearchResponse)
+async def search_weather_files(
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    tolerance: float = Query(0.01, ge=0, le=10, description="Coordinate tolerance in degrees"),
+    start_date: Optional[str] = Query(None, description="Files whose range overlaps from this date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="Files whose range overlaps up to this date (YYYY-MM-DD)"),
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """
+    Find stored weather files by location and date range using the local file index
+    """
+    file_index = get_file_index()
+    if file_index is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": "File index is disabled (FILE_INDEX_ENABLED=false)"}
+        )
+    try:
+        rows = await asyncio.to_thread(file_index.search, latitude, longitude, tolerance, start_date, end_date, limit)
+        logger.info(f"File index search returned {len(rows)} files")
+        return FileSearchResponse(files=[IndexedFileInfo(**row) for row in rows])
+    except Exception as e:
+        logger.error(f"Error searching weather files: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"status": "error", "message": f"Failed to search files: {str(e)}"}
+        )
+
+@router.post("/index/reconcile")
+async def reconcile_file_index(
+    max_objects: Optional[int] = Query(
+        None, ge=0, description="Objects to list in this run (default FILE_INDEX_RECONCILE_MAX_OBJECTS, 0 = rest of the bucket)"
+    )
+):
+    """
+    Reconcile the next slice of the local file index with the bucket now
+    """
+    file_index = get_file_index()
+    if file_index is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"status": "error", "message": "File index is disabled (FILE_INDEX_ENABLED=false)"}
+        )
+    try:
+        result = await file_index.reconcile(get_storage_client(), max_objects=max_objects)
+        return {"status": "ok", **result}
+    except Exception as e:
+        logger.error(f"Error reconciling file index: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"status": "error", "message": f"Failed to reconcile file index: {str(e)}"}
+        )
+
+def _accepts(header_value: Optional[str], token: str) -> bool:
+    """True when a comma-separated Accept/Accept-Encoding header lists token with q > 0"""
+    for item in (header_value or "").lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip() != token:
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
 @router.get("/weather-file-content/{file_name:path}")
-async def get_weather_file_content(file_name: str):
+async def get_weather_file_content(file_name: str, request: Request):
     """
     Get the content of a specific weather file from cloud storage
+    
+    Stored objects may be plain JSON, gzip/zstd-compressed JSON or columnar.
+    The decoded JSON is returned by default. Clients sending
+    Accept: application/vnd.weather.columnar get the columnar encoding, and
+    clients whose Accept-Encoding matches a compressed object get the
+    stored bytes as-is with Content-Encoding set.
     """
     try:
         logger.info(f"Fetching content for file: {file_name}")
@@ -139,10 +890,29 @@ async def get_weather_file_content(file_name: str):
                 detail={"status": "error", "message": f"File '{file_name}' not found in storage"}
             )
         
+        stored_format = FORMATS[detect_format(content)]
+        vary = {"Vary": "Accept, Accept-Encoding"}
+        
+        if _accepts(request.headers.get("accept"), COLUMNAR_MEDIA_TYPE):
+            if stored_format.name != FORMAT_COLUMNAR:
+                content = serialize(deserialize(content), FORMAT_COLUMNAR)
+            logger.info(f"Successfully retrieved columnar content for file: {file_name} ({len(content)} bytes)")
+            return Response(content=content, media_type=COLUMNAR_MEDIA_TYPE, headers=vary)
+        
+        if stored_format.content_encoding and _accepts(request.headers.get("accept-encoding"), stored_format.content_encoding):
+            # Already compressed JSON the client can decode: pass it through untouched
+            logger.info(f"Successfully retrieved {stored_format.name} content for file: {file_name} ({len(content)} bytes)")
+            return Response(
+                content=content,
+                media_type="application/json",
+                headers={**vary, "Content-Encoding": stored_format.content_encoding}
+            )
+        
         # Parse and return JSON
-        json_data = json.loads(content.decode('utf-8'))
+        with SERIALIZATION_DURATION.labels("deserialize", stored_format.name).time():
+            json_data = deserialize(content)
         logger.info(f"Successfully retrieved content for file: {file_name} ({len(content)} bytes)")
-        return json_data
+        return JSONResponse(content=json_data, headers=vary)
     
     except HTTPException:
         raise
@@ -159,3 +929,173 @@ async def get_weather_file_content(file_name: str):
             detail={"status": "error", "message": f"Failed to retrieve file '{file_name}': {str(e)}"}
         )
 
+class _RangeNotSatisfiable(Exception):
+    pass
+
+def _parse_range(header_value: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Resolve a single "bytes=" Range header to an inclusive (start, end).
+    
+    Returns None when the header is absent, malformed or asks for several
+    ranges (the full body is served instead, as RFC 9110 allows); raises
+    _RangeNotSatisfiable when no requested byte exists.
+    """
+    if not header_value:
+        return None
+    unit, _, spec = header_value.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise _RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise _RangeNotSatisfiable()
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+def _etag_matches(header_value: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match / If-Range header against an ETag"""
+    if not header_value:
+        return False
+    for candidate in header_value.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag.removeprefix("W/"):
+            return True
+    return False
+
+async def _stream_object(
+    file_name: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    content_encoding: Optional[str] = None
+):
+    """Relay stored bytes to the response, decoding on the fly when content_encoding is set"""
+    storage_client = get_storage_client()
+    decoder = stream_decompressor(content_encoding) if content_encoding else None
+    sent = 0
+    try:
+        async for chunk in storage_client.iter_file_content(
+            file_name, start=start, end=end, chunk_size=settings.STORAGE_STREAM_CHUNK_SIZE
+        ):
+            if decoder is not None:
+                chunk = decoder.decompress(chunk)
+            if chunk:
+                sent += len(chunk)
+                yield chunk
+        if decoder is not None:
+            tail = decoder.flush()
+            if tail:
+                sent += len(tail)
+                yield tail
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated body
+        logger.error(f"Stream of '{file_name}' aborted after {sent} bytes: {str(e)}", exc_info=True)
+        raise
+
+@router.get("/weather-file-stream/{file_name:path}")
+async def stream_weather_file(file_name: str, request: Request):
+    """
+    Stream a stored weather file without parsing it
+    
+    The object body goes straight from storage to the response in chunks.
+    Supports ETag / If-None-Match (304), single byte ranges (206 / 416) and
+    If-Range. Compressed objects are passed through with Content-Encoding
+    when the client accepts it, and decompressed while streaming otherwise.
+    """
+    try:
+        storage_client = get_storage_client()
+        head = await storage_client.head_file(file_name)
+        
+        if head is None:
+            logger.warning(f"File not found: {file_name}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={"status": "error", "message": f"File '{file_name}' not found in storage"}
+            )
+        
+        stored_encoding = head.get("content_encoding")
+        if not stored_encoding and head.get("metadata", {}).get("format") in FORMATS:
+            stored_encoding = FORMATS[head["metadata"]["format"]].content_encoding
+        passthrough = not stored_encoding or _accepts(request.headers.get("accept-encoding"), stored_encoding)
+        
+        # The decoded body is a different representation, so it gets its own ETag
+        etag = f'"{head["etag"]}"' if passthrough else f'"{head["etag"]}-identity"'
+        headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+        if head.get("last_modified") is not None:
+            headers["Last-Modified"] = email.utils.format_datetime(head["last_modified"].astimezone(timezone.utc), usegmt=True)
+        
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        media_type = head.get("content_type") or "application/json"
+        if not passthrough:
+            logger.info(f"Streaming {file_name} decoded from {stored_encoding}")
+            headers["Accept-Ranges"] = "none"
+            return StreamingResponse(
+                _stream_object(file_name, content_encoding=stored_encoding),
+                media_type=media_type,
+                headers=headers
+            )
+        
+        size = head["size"]
+        headers["Accept-Ranges"] = "bytes"
+        if stored_encoding:
+            headers["Content-Encoding"] = stored_encoding
+        
+        byte_range = None
+        if_range = request.headers.get("if-range")
+        if if_range is None or _etag_matches(if_range, etag):
+            try:
+                byte_range = _parse_range(request.headers.get("range"), size)
+            except _RangeNotSatisfiable:
+                return Response(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers={**headers, "Content-Range": f"bytes */{size}"}
+                )
+        
+        if byte_range is None:
+            headers["Content-Length"] = str(size)
+            if size == 0:
+                return Response(content=b"", media_type=media_type, headers=headers)
+            logger.info(f"Streaming {file_name} ({size} bytes)")
+            return StreamingResponse(
+                _stream_object(file_name, 0, size - 1),
+                media_type=media_type,
+                headers=headers
+            )
+        
+        start, end = byte_range
+        headers["Content-Length"] = str(end - start + 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        logger.info(f"Streaming {file_name} bytes {start}-{end}/{size}")
+        return StreamingResponse(
+            _stream_object(file_name, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming file '{file_name}': {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"status": "error", "message": f"Failed to stream file '{file_name}': {str(e)}"}
+        )
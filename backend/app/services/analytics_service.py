@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.storage.serialization import FORMAT_COLUMNAR, columnar_parts, deserialize, detect_format
+from app.storage.storage_client import StorageClient, get_storage_client
+
+logger = logging.getLogger(__name__)
+
+# Derived max - min series, reported when both source variables are requested
+DAILY_RANGES = {
+    "temperature_2m_range": ("temperature_2m_max", "temperature_2m_min"),
+    "apparent_temperature_range": ("apparent_temperature_max", "apparent_temperature_min")
+}
+
+# (days as datetime64[D], variable -> float64 array with NaN for missing values)
+DailyColumns = Tuple[np.ndarray, Dict[str, np.ndarray]]
+
+
+def load_daily_columns(content: bytes, variables: Sequence[str]) -> DailyColumns:
+    """
+    Turn a stored weather object into NumPy arrays of its daily columns.
+
+    Columnar objects are read in place: numeric columns become float64
+    views over the stored bytes. JSON objects are decoded once and each
+    column is converted in a single array construction (None -> NaN).
+    """
+    if detect_format(content) == FORMAT_COLUMNAR:
+        header, body = columnar_parts(content)
+        days = None
+        columns: Dict[str, np.ndarray] = {}
+        for column in header["daily"]:
+            name = column["name"]
+            if name == "time":
+                if "days" in column:
+                    start = np.datetime64(column["days"]["start"], "D")
+                    days = start + np.arange(column["days"]["count"])
+                else:
+                    days = np.array(column["values"], dtype="datetime64[D]")
+            elif name in variables:
+                if "values" in column:
+                    columns[name] = np.array(column["values"], dtype=np.float64)
+                else:
+                    columns[name] = np.frombuffer(body, dtype="<f8", count=column["length"], offset=column["offset"])
+    else:
+        daily = deserialize(content).get("daily") or {}
+        days = np.array(daily["time"], dtype="datetime64[D]") if "time" in daily else None
+        columns = {name: np.array(daily[name], dtype=np.float64) for name in variables if name in daily}
+
+    if days is None:
+        raise ValueError("File has no daily time column")
+    for name, values in columns.items():
+        if len(values) != len(days):
+            raise ValueError(f"Column '{name}' has {len(values)} values for {len(days)} days")
+    return days, columns
+
+
+def _round(value: float) -> Optional[float]:
+    return None if not np.isfinite(value) else round(float(value), 3)
+
+
+def _percentile_label(percentile: float) -> str:
+    return f"p{percentile:g}"
+
+
+def _summary(values: np.ndarray, percentiles: Sequence[float]) -> Dict[str, Any]:
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return {
+            "count": 0,
+            "min": None,
+            "max": None,
+            "mean": None,
+            "std": None,
+            "percentiles": {_percentile_label(p): None for p in percentiles}
+        }
+    points = np.percentile(finite, percentiles) if percentiles else []
+    return {
+        "count": int(finite.size),
+        "min": _round(finite.min()),
+        "max": _round(finite.max()),
+        "mean": _round(finite.mean()),
+        "std": _round(finite.std()),
+        "percentiles": {_percentile_label(p): _round(v) for p, v in zip(percentiles, points)}
+    }
+
+
+def _daily_mean(index: np.ndarray, values: np.ndarray, length: int) -> np.ndarray:
+    """Mean across files for each day, ignoring NaN"""
+    finite = np.isfinite(values)
+    sums = np.bincount(index[finite], weights=values[finite], minlength=length)
+    counts = np.bincount(index[finite], minlength=length)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def _rolling_mean(series: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` days, ignoring NaN; the first window - 1 days are NaN"""
+    result = np.full(series.shape, np.nan)
+    if window > len(series):
+        return result
+    finite = np.isfinite(series)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(finite, series, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(finite)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result[window - 1:] = (sums[window:] - sums[:-window]) / (counts[window:] - counts[:-window])
+    return result
+
+
+def _as_list(values: np.ndarray) -> List[Optional[float]]:
+    rounded = np.round(values, 3)
+    return [None if np.isnan(v) else v for v in rounded.tolist()]
+
+
+def compute_weather_statistics(
+    datasets: List[DailyColumns],
+    variables: Sequence[str],
+    percentiles: Sequence[float],
+    rolling_window: int = 7,
+    include_series: bool = True,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Aggregate daily columns from many files.
+
+    Summary statistics cover every value in the window across all files.
+    The optional series is the per-day mean across files plus its trailing
+    rolling mean, so the response stays small however many files went in.
+    """
+    names = list(variables) + [
+        name for name, (high, low) in DAILY_RANGES.items() if high in variables and low in variables
+    ]
+    lower = np.datetime64(start_date, "D") if start_date else None
+    upper = np.datetime64(end_date, "D") if end_date else None
+
+    day_parts: List[np.ndarray] = []
+    value_parts: Dict[str, List[np.ndarray]] = {name: [] for name in names}
+    for days, columns in datasets:
+        keep = np.ones(len(days), dtype=bool)
+        if lower is not None:
+            keep &= days >= lower
+        if upper is not None:
+            keep &= days <= upper
+        if not keep.any():
+            continue
+        day_parts.append(days[keep])
+        missing = np.full(int(keep.sum()), np.nan)
+        for name in names:
+            if name in DAILY_RANGES:
+                high, low = DAILY_RANGES[name]
+                if high in columns and low in columns:
+                    value_parts[name].append(columns[high][keep] - columns[low][keep])
+                    continue
+            value_parts[name].append(columns[name][keep] if name in columns else missing)
+
+    if not day_parts:
+        return {"start_date": None, "end_date": None, "days": 0, "variables": {}, "series": None}
+
+    all_days = np.concatenate(day_parts)
+    first, last = all_days.min(), all_days.max()
+    merged = {name: np.concatenate(parts) for name, parts in value_parts.items()}
+
+    result: Dict[str, Any] = {
+        "start_date": str(first),
+        "end_date": str(last),
+        "days": int((last - first).astype(int)) + 1,
+        "variables": {name: _summary(values, percentiles) for name, values in merged.items()},
+        "series": None
+    }
+    if include_series:
+        index = (all_days - first).astype(np.int64)
+        length = result["days"]
+        series: Dict[str, Any] = {"time": np.datetime_as_string(first + np.arange(length)).tolist()}
+        for name, values in merged.items():
+            mean = _daily_mean(index, values, length)
+            series[name] = {
+                "mean": _as_list(mean),
+                "rolling_mean": _as_list(_rolling_mean(mean, rolling_window))
+            }
+        result["series"] = series
+    return result
+
+
+async def load_weather_files(
+    file_names: Sequence[str],
+    variables: Sequence[str],
+    storage_client: Optional[StorageClient] = None,
+    concurrency: Optional[int] = None
+) -> Tuple[List[DailyColumns], List[Dict[str, str]]]:
+    """Fetch and convert files concurrently; returns (datasets, skipped files with reasons)"""
+    storage_client = storage_client or get_storage_client()
+    semaphore = asyncio.Semaphore(concurrency or settings.ANALYTICS_FETCH_CONCURRENCY)
+
+    async def load(file_name: str) -> Tuple[str, Optional[DailyColumns], Optional[str]]:
+        async with semaphore:
+            content = await storage_client.get_file_content(file_name)
+        if content is None:
+            return file_name, None, "not found"
+        try:
+            return file_name, await asyncio.to_thread(load_daily_columns, content, variables), None
+        except Exception as e:
+            return file_name, None, f"unreadable: {str(e)}"
+
+    datasets: List[DailyColumns] = []
+    skipped: List[Dict[str, str]] = []
+    for file_name, dataset, reason in await asyncio.gather(*(load(name) for name in file_names)):
+        if dataset is None:
+            logger.warning(f"Skipping '{file_name}' in analytics: {reason}")
+            skipped.append({"file": file_name, "reason": reason})
+        else:
+            datasets.append(dataset)
+    return datasets, skipped
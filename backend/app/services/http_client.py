@@ -0,0 +1,143 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 support in httpx requires the optional 'h2' package"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class UpstreamHTTPClient:
+    """
+    Long-lived, pooled httpx client shared by every upstream call.
+
+    Keeps connections to Open-Meteo alive between requests and tracks
+    in-flight usage so the pool can be sized from real traffic.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_connections = settings.HTTP_MAX_CONNECTIONS
+        self.max_keepalive_connections = settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+
+        http2 = settings.HTTP2_ENABLED
+        if http2 and not _http2_available():
+            logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed; falling back to HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        )
+        timeout = httpx.Timeout(
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+            read=settings.HTTP_READ_TIMEOUT,
+            write=settings.HTTP_WRITE_TIMEOUT,
+            pool=settings.HTTP_POOL_TIMEOUT
+        )
+        self.client = httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=self.http2,
+            transport=transport
+        )
+
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._total_requests = 0
+        self._pool_timeouts = 0
+        self._total_request_seconds = 0.0
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """Issue a GET through the shared pool, recording saturation stats"""
+        async with self._track():
+            return await self.client.get(url, **kwargs)
+
+    @asynccontextmanager
+    async def _track(self):
+        self._in_flight += 1
+        self._total_requests += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        started = time.perf_counter()
+        try:
+            yield
+        except httpx.PoolTimeout:
+            self._pool_timeouts += 1
+            raise
+        finally:
+            self._total_request_seconds += time.perf_counter() - started
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Pool saturation snapshot used to size HTTP_MAX_CONNECTIONS.
+
+        Only the configured limits and counters kept by this class are
+        reported; httpx does not expose its pool state publicly.
+        """
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "utilization": round(self._in_flight / self.max_connections, 3) if self.max_connections else None,
+            "peak_utilization": round(self._peak_in_flight / self.max_connections, 3) if self.max_connections else None,
+            "total_requests": self._total_requests,
+            "pool_timeouts": self._pool_timeouts,
+            "avg_request_seconds": round(self._total_request_seconds / self._total_requests, 4) if self._total_requests else None
+        }
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_http_client: Optional[UpstreamHTTPClient] = None
+
+
+def get_http_client() -> UpstreamHTTPClient:
+    """
+    Return the process-wide upstream client, creating it on first use.
+
+    The app lifespan normally creates it at startup; lazy creation covers
+    entry points that run without lifespan events (e.g. Mangum).
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = UpstreamHTTPClient()
+    return _http_client
+
+
+async def init_http_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> UpstreamHTTPClient:
+    """Create the shared upstream client (called from the app lifespan)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = UpstreamHTTPClient(transport=transport)
+    logger.info(
+        f"Upstream HTTP client ready (max_connections={_http_client.max_connections}, "
+        f"keepalive={_http_client.max_keepalive_connections}, http2={_http_client.http2})"
+    )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared upstream client and release pooled connections"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("Upstream HTTP client closed")
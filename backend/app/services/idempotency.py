@@ -0,0 +1,92 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idempotency_keys_created ON idempotency_keys (created_at);
+"""
+
+
+class IdempotencyStore:
+    """
+    Saved responses of store requests, by Idempotency-Key header.
+
+    A retried request with the same key and body gets the saved response
+    without a new fetch, upload or job; the same key with a different body
+    is rejected. Only successful responses are saved, so a failed request
+    can be retried under its key. Entries expire after
+    IDEMPOTENCY_KEY_TTL_SECONDS. Methods are synchronous and thread-safe.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The saved response for key (fingerprint, status_code, body), or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, status_code, body FROM idempotency_keys WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"fingerprint": row["fingerprint"], "status_code": row["status_code"], "body": json.loads(row["body"])}
+
+    def put(self, key: str, fingerprint: str, status_code: int, body: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            # Expired keys go on write, so the table stays bounded without a background task
+            self._conn.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, status_code, body, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, fingerprint, status_code, json.dumps(body), now)
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_idempotency_store: Optional[IdempotencyStore] = None
+_idempotency_store_lock = threading.Lock()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Return the process-wide store, opening its SQLite file on first use"""
+    global _idempotency_store
+    if _idempotency_store is None:
+        with _idempotency_store_lock:
+            if _idempotency_store is None:
+                _idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_STORE_PATH, settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+    return _idempotency_store
+
+
+def close_idempotency_store() -> None:
+    global _idempotency_store
+    with _idempotency_store_lock:
+        if _idempotency_store is not None:
+            _idempotency_store.close()
+            _idempotency_store = None
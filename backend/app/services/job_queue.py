@@ -0,0 +1,341 @@
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    callback_url TEXT,
+    callback_status TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    available_at REAL NOT NULL,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+"""
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat() if timestamp is not None else None
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """The job as returned by the API and posted to callbacks"""
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"],
+        "callback_status": job["callback_status"],
+        "created_at": _iso(job["created_at"]),
+        "started_at": _iso(job["started_at"]),
+        "finished_at": _iso(job["finished_at"])
+    }
+
+
+class JobQueue(ABC):
+    """
+    Queue of background jobs and their results.
+
+    Methods are synchronous and thread-safe; the worker pool calls them
+    through asyncio.to_thread. A claimed job is leased to its worker; if the
+    lease runs out (the process died mid-job) the job is claimed again.
+    """
+
+    @staticmethod
+    def _new_job(kind: str, payload: Dict[str, Any], callback_url: Optional[str]) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": JOB_QUEUED,
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "callback_url": callback_url,
+            "callback_status": None,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "available_at": now,
+            "lease_expires_at": None
+        }
+
+    @abstractmethod
+    def submit(self, kind: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def claim(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Mark the next ready job running and return it, or None if none is ready"""
+        pass
+
+    @abstractmethod
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def fail(self, job_id: str, error: str, retry_in: Optional[float] = None) -> None:
+        """Record a failure; with retry_in the job is queued again after that delay"""
+        pass
+
+    @abstractmethod
+    def release(self, job_id: str) -> None:
+        """Put a running job back in the queue without counting the attempt (shutdown)"""
+        pass
+
+    @abstractmethod
+    def set_callback_status(self, job_id: str, callback_status: str) -> None:
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        pass
+
+    @abstractmethod
+    def prune(self, finished_before: float) -> int:
+        """Delete finished jobs older than the cutoff; returns how many"""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryJobQueue(JobQueue):
+    """In-process queue; jobs are lost on restart"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # (available_at, sequence, job_id) of queued jobs
+        self._ready: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _push(self, job: Dict[str, Any]) -> None:
+        heapq.heappush(self._ready, (job["available_at"], next(self._sequence), job["id"]))
+
+    def submit(self, kind: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> Dict[str, Any]:
+        job = self._new_job(kind, payload, callback_url)
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._push(job)
+        return dict(job)
+
+    def claim(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            while self._ready and self._ready[0][0] <= now:
+                _, _, job_id = heapq.heappop(self._ready)
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] != JOB_QUEUED:
+                    continue
+                job.update(status=JOB_RUNNING, attempts=job["attempts"] + 1, started_at=now, lease_expires_at=now + lease_seconds)
+                return dict(job)
+        return None
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=JOB_SUCCEEDED, result=result, error=None, finished_at=time.time(), lease_expires_at=None)
+
+    def fail(self, job_id: str, error: str, retry_in: Optional[float] = None) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if retry_in is None:
+                job.update(status=JOB_FAILED, error=error, finished_at=time.time(), lease_expires_at=None)
+            else:
+                job.update(status=JOB_QUEUED, error=error, available_at=time.time() + retry_in, lease_expires_at=None)
+                self._push(job)
+
+    def release(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] == JOB_RUNNING:
+                job.update(status=JOB_QUEUED, attempts=job["attempts"] - 1, available_at=time.time(), lease_expires_at=None)
+                self._push(job)
+
+    def set_callback_status(self, job_id: str, callback_status: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["callback_status"] = callback_status
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        return counts
+
+    def prune(self, finished_before: float) -> int:
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job["finished_at"] is not None and job["finished_at"] < finished_before
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Queue in a local SQLite file. Jobs survive restarts, and several worker
+    processes on one host can share the file: claims are single UPDATE
+    statements, so each job goes to exactly one worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def submit(self, kind: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> Dict[str, Any]:
+        job = self._new_job(kind, payload, callback_url)
+        self._execute(
+            """
+            INSERT INTO jobs (id, kind, status, payload, attempts, callback_url, created_at, available_at)
+            VALUES (?, ?, ?, ?, 0, ?, ?, ?)
+            """,
+            (job["id"], kind, JOB_QUEUED, json.dumps(payload), callback_url, job["created_at"], job["available_at"])
+        )
+        return job
+
+    def claim(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                UPDATE jobs
+                SET status = ?, attempts = attempts + 1, started_at = ?, lease_expires_at = ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?)
+                    ORDER BY available_at
+                    LIMIT 1
+                )
+                RETURNING *
+                """,
+                (JOB_RUNNING, now, now + lease_seconds, JOB_QUEUED, now, JOB_RUNNING, now)
+            ).fetchone()
+            self._conn.commit()
+        return self._job(row) if row is not None else None
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, finished_at = ?, lease_expires_at = NULL WHERE id = ?",
+            (JOB_SUCCEEDED, json.dumps(result), time.time(), job_id)
+        )
+
+    def fail(self, job_id: str, error: str, retry_in: Optional[float] = None) -> None:
+        if retry_in is None:
+            self._execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL WHERE id = ?",
+                (JOB_FAILED, error, time.time(), job_id)
+            )
+        else:
+            self._execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_expires_at = NULL WHERE id = ?",
+                (JOB_QUEUED, error, time.time() + retry_in, job_id)
+            )
+
+    def release(self, job_id: str) -> None:
+        self._execute(
+            """
+            UPDATE jobs SET status = ?, attempts = attempts - 1, available_at = ?, lease_expires_at = NULL
+            WHERE id = ? AND status = ?
+            """,
+            (JOB_QUEUED, time.time(), job_id, JOB_RUNNING)
+        )
+
+    def set_callback_status(self, job_id: str, callback_status: str) -> None:
+        self._execute("UPDATE jobs SET callback_status = ? WHERE id = ?", (callback_status, job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)}
+        with self._lock:
+            for row in self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+                counts[row[0]] = row[1]
+        return counts
+
+    def prune(self, finished_before: float) -> int:
+        return self._execute("DELETE FROM jobs WHERE finished_at < ?", (finished_before,)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_queue() -> JobQueue:
+    backend = settings.JOB_QUEUE_BACKEND.lower()
+    if backend == "sqlite":
+        return SQLiteJobQueue(settings.JOB_QUEUE_PATH)
+    elif backend == "memory":
+        return MemoryJobQueue()
+    else:
+        raise ValueError(f"Unsupported job queue backend: {settings.JOB_QUEUE_BACKEND}")
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.services.job_queue import JOB_SUCCEEDED, JobQueue, create_job_queue, public_job
+from app.utils.metrics import JOB_DURATION, JOB_QUEUE_WAIT, JOBS_FINISHED, JOBS_RUNNING
+from app.utils.validation import validate_callback_url
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+# How often finished jobs past JOB_RESULT_TTL_SECONDS are deleted
+_PRUNE_INTERVAL_SECONDS = 60.0
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (e.g. the upstream rejected the request)"""
+
+
+def register_job_handler(kind: str, handler: JobHandler) -> None:
+    """Register the coroutine that runs jobs of this kind; it returns the job result"""
+    _handlers[kind] = handler
+
+
+class JobWorkerPool:
+    """
+    Bounded pool of asyncio workers draining a JobQueue.
+
+    Workers wake as soon as a job is submitted in this process, and poll
+    every JOB_POLL_INTERVAL_SECONDS for jobs that became ready otherwise
+    (retries, expired leases, other processes sharing a SQLite queue).
+    Failed attempts are retried with linear backoff up to JOB_MAX_ATTEMPTS.
+    Finished jobs with a callback URL are POSTed there.
+    """
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.workers = settings.JOB_WORKERS
+        self._tasks: List[asyncio.Task] = []
+        self._prune_task: Optional[asyncio.Task] = None
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+        self._callback_client: Optional[httpx.AsyncClient] = None
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.callbacks_delivered = 0
+        self.callbacks_failed = 0
+
+    def start(self) -> None:
+        """Start the workers on the running loop (idempotent)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and not self._stopping:
+            return
+        self._loop = loop
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+        self._prune_task = loop.create_task(self._prune_loop())
+        logger.info(f"Job worker pool started ({self.workers} workers, {type(self.queue).__name__})")
+
+    async def stop(self, timeout: float) -> None:
+        """Stop claiming jobs, give running ones up to timeout seconds, then requeue the rest"""
+        if self._loop is not asyncio.get_running_loop():
+            return
+        self._stopping = True
+        self._wake.set()
+        self._prune_task.cancel()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout) if self._tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(self._prune_task, *pending, return_exceptions=True)
+        for job_id in list(self._running):
+            await asyncio.to_thread(self.queue.release, job_id)
+            logger.info(f"Job {job_id} interrupted by shutdown; requeued")
+        self._running.clear()
+        self._tasks = []
+        self._prune_task = None
+        self._loop = None
+        if self._callback_client is not None:
+            await self._callback_client.aclose()
+            self._callback_client = None
+
+    async def submit(self, kind: str, payload: Dict[str, Any], callback_url: Optional[str] = None) -> Dict[str, Any]:
+        # Entry points without lifespan events (Mangum) start the pool on first use
+        self.start()
+        job = await asyncio.to_thread(self.queue.submit, kind, payload, callback_url)
+        self._wake.set()
+        return job
+
+    async def _work(self) -> None:
+        while not self._stopping:
+            try:
+                job = await asyncio.to_thread(self.queue.claim, settings.JOB_LEASE_SECONDS)
+                if job is not None:
+                    await self._run(job)
+                    continue
+            except Exception as e:
+                # Queue errors (e.g. a locked SQLite file) must not kill the worker
+                logger.error(f"Job worker error: {str(e)}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            if not self._stopping:
+                self._wake.clear()
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        kind = job["kind"]
+        if job["attempts"] == 1:
+            JOB_QUEUE_WAIT.labels(kind).observe(max(0.0, job["started_at"] - job["created_at"]))
+        handler = _handlers.get(kind)
+        if handler is None:
+            await asyncio.to_thread(self.queue.fail, job["id"], f"No handler for job kind '{kind}'")
+            return
+
+        self._running[job["id"]] = job
+        started = time.perf_counter()
+        try:
+            with JOBS_RUNNING.track_in_progress():
+                result = await handler(job["payload"])
+        except asyncio.CancelledError:
+            # Shutdown: stop() requeues the jobs still in _running
+            raise
+        except PermanentJobError as e:
+            await self._finish_failed(job, str(e))
+        except Exception as e:
+            if job["attempts"] < settings.JOB_MAX_ATTEMPTS:
+                delay = settings.JOB_RETRY_BACKOFF_SECONDS * job["attempts"]
+                logger.warning(f"Job {job['id']} attempt {job['attempts']} failed, retrying in {delay:g}s: {str(e)}")
+                self.retried += 1
+                JOBS_FINISHED.labels(kind, "retried").inc()
+                await asyncio.to_thread(self.queue.fail, job["id"], str(e), delay)
+            else:
+                await self._finish_failed(job, str(e))
+        else:
+            self.succeeded += 1
+            JOBS_FINISHED.labels(kind, JOB_SUCCEEDED).inc()
+            await asyncio.to_thread(self.queue.complete, job["id"], result)
+            logger.info(f"Job {job['id']} ({kind}) succeeded")
+        JOB_DURATION.labels(kind).observe(time.perf_counter() - started)
+        self._running.pop(job["id"], None)
+        await self._notify(job["id"])
+
+    async def _finish_failed(self, job: Dict[str, Any], error: str) -> None:
+        self.failed += 1
+        JOBS_FINISHED.labels(job["kind"], "failed").inc()
+        logger.error(f"Job {job['id']} ({job['kind']}) failed after {job['attempts']} attempt(s): {error}")
+        await asyncio.to_thread(self.queue.fail, job["id"], error)
+
+    async def _notify(self, job_id: str) -> None:
+        """POST a finished job to its callback URL, if it has one"""
+        job = await asyncio.to_thread(self.queue.get, job_id)
+        if job is None or not job["callback_url"] or job["finished_at"] is None:
+            return
+        # Checked again at delivery: the allow-list may have changed since the job was queued
+        is_valid, error_message = validate_callback_url(job["callback_url"], settings.job_callback_allowed_hosts_list)
+        if not is_valid:
+            logger.warning(f"Not calling back for job {job_id}: {error_message}")
+            self.callbacks_failed += 1
+            await asyncio.to_thread(self.queue.set_callback_status, job_id, "failed")
+            return
+        if self._callback_client is None:
+            self._callback_client = httpx.AsyncClient(timeout=settings.JOB_CALLBACK_TIMEOUT_SECONDS)
+        body = public_job(job)
+        for attempt in range(1, settings.JOB_CALLBACK_MAX_ATTEMPTS + 1):
+            try:
+                response = await self._callback_client.post(job["callback_url"], json=body)
+                if response.status_code < 400:
+                    self.callbacks_delivered += 1
+                    await asyncio.to_thread(self.queue.set_callback_status, job_id, "delivered")
+                    return
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+            logger.warning(f"Callback for job {job_id} failed (attempt {attempt}): {error}")
+            if attempt < settings.JOB_CALLBACK_MAX_ATTEMPTS:
+                await asyncio.sleep(2 ** (attempt - 1))
+        self.callbacks_failed += 1
+        await asyncio.to_thread(self.queue.set_callback_status, job_id, "failed")
+
+    async def _prune_loop(self) -> None:
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.queue.prune, time.time() - settings.JOB_RESULT_TTL_SECONDS)
+                if removed:
+                    logger.info(f"Pruned {removed} finished job(s)")
+            except Exception as e:
+                logger.warning(f"Job prune failed: {str(e)}")
+            await asyncio.sleep(_PRUNE_INTERVAL_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue": type(self.queue).__name__,
+            "workers": self.workers,
+            "running": len(self._running),
+            "jobs": self.queue.counts(),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "callbacks_delivered": self.callbacks_delivered,
+            "callbacks_failed": self.callbacks_failed
+        }
+
+
+_job_pool: Optional[JobWorkerPool] = None
+
+
+def get_job_pool() -> JobWorkerPool:
+    """Return the process-wide job pool, creating its queue on first use"""
+    global _job_pool
+    if _job_pool is None:
+        _job_pool = JobWorkerPool(create_job_queue())
+    return _job_pool
+
+
+async def close_job_pool(timeout: float) -> None:
+    """Stop the workers and close the queue (called from the app lifespan)"""
+    global _job_pool
+    if _job_pool is not None:
+        await _job_pool.stop(timeout)
+        _job_pool.queue.close()
+        _job_pool = None
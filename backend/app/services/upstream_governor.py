@@ -0,0 +1,370 @@
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+from app.utils.metrics import (
+    UPSTREAM_CIRCUIT_STATE,
+    UPSTREAM_CONCURRENCY_LIMIT,
+    UPSTREAM_REJECTED,
+    UPSTREAM_RETRIES,
+    UPSTREAM_THROTTLE_WAIT
+)
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+_CIRCUIT_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_OPEN: 2}
+
+# Successful calls needed before the latency baseline is trusted for spike detection
+_LATENCY_MIN_SAMPLES = 20
+_LATENCY_EWMA_ALPHA = 0.1
+
+
+class UpstreamUnavailableError(Exception):
+    """The upstream is throttling us or failing; callers should answer 503"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds from now (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class TokenBucket:
+    """
+    Token bucket without a lock: each caller reserves a token, letting the
+    balance go negative, and sleeps until its token would have arrived.
+    Callers are therefore served in arrival order at `rate` per second.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for at least this long (upstream sent Retry-After)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens -= 1
+        wait = max(-self._tokens / self.rate, self._paused_until - now, 0.0)
+        if wait > 0:
+            self.waited_seconds += wait
+            UPSTREAM_THROTTLE_WAIT.observe(wait)
+            await asyncio.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "waited_seconds": round(self.waited_seconds, 3)
+        }
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit: grows by about one slot per window of successful
+    calls and halves on a 429, a 5xx, a timeout or a latency spike (a call
+    slower than UPSTREAM_LATENCY_SPIKE_FACTOR times the smoothed latency).
+    At most one decrease per smoothed round trip, so a burst of failures
+    from one overload cuts the limit once.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, spike_factor: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.spike_factor = spike_factor
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self.samples = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        UPSTREAM_CONCURRENCY_LIMIT.set(int(self.limit))
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Conditions belong to one event loop; rebuild if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self.in_flight = 0
+        return self._condition
+
+    async def acquire(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        spike = (
+            self.samples >= _LATENCY_MIN_SAMPLES
+            and self.latency_ewma is not None
+            and latency > self.latency_ewma * self.spike_factor
+        )
+        # The baseline always moves, so a lasting shift in latency stops counting as a spike
+        self.samples += 1
+        self.latency_ewma = latency if self.latency_ewma is None else (
+            _LATENCY_EWMA_ALPHA * latency + (1 - _LATENCY_EWMA_ALPHA) * self.latency_ewma
+        )
+        if spike:
+            self.on_overload("latency_spike")
+            return
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        UPSTREAM_CONCURRENCY_LIMIT.set(int(self.limit))
+
+    def on_overload(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < max(self.latency_ewma or 0.0, 0.1):
+            return
+        self._last_decrease = now
+        previous = int(self.limit)
+        self.limit = max(float(self.minimum), self.limit / 2)
+        self.decreases += 1
+        UPSTREAM_CONCURRENCY_LIMIT.set(int(self.limit))
+        logger.warning(f"Upstream concurrency limit {previous} -> {int(self.limit)} ({reason})")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "in_flight": self.in_flight,
+            "latency_ewma_seconds": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "decreases": self.decreases
+        }
+
+
+class CircuitBreaker:
+    """
+    Opens after UPSTREAM_CIRCUIT_FAILURE_THRESHOLD consecutive failures
+    (5xx, timeouts, connection errors) and rejects calls for
+    UPSTREAM_CIRCUIT_OPEN_SECONDS. Then a single probe is let through:
+    success closes the circuit, failure opens it again, and a probe that
+    ends without either (cancelled, throttled) lets the next call probe.
+    """
+
+    def __init__(self, failure_threshold: int, open_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"Upstream circuit {self.state} -> {state}")
+            self.state = state
+            UPSTREAM_CIRCUIT_STATE.set(_CIRCUIT_STATE_VALUES[state])
+
+    def allow(self) -> bool:
+        if self.state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._set_state(CIRCUIT_HALF_OPEN)
+            self._probe_in_flight = False
+        if self.state == CIRCUIT_HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+        return self.state == CIRCUIT_CLOSED
+
+    def retry_after(self) -> float:
+        return max(1.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def release_probe(self) -> None:
+        """End a half-open probe without an outcome; the state is unchanged"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self._set_state(CIRCUIT_CLOSED)
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != CIRCUIT_OPEN:
+                self.opened += 1
+            self._set_state(CIRCUIT_OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "opened": self.opened,
+            "retry_after_seconds": round(self.retry_after(), 1) if self.state == CIRCUIT_OPEN else None
+        }
+
+
+class UpstreamGovernor:
+    """
+    Gate for every Open-Meteo call: circuit breaker, then token bucket,
+    then adaptive concurrency slot. Idempotent calls are retried on 429,
+    5xx, timeouts and connection errors with full-jitter exponential
+    backoff, honouring Retry-After. Other responses are returned as they are.
+    """
+
+    def __init__(self):
+        self.bucket = TokenBucket(settings.UPSTREAM_RATE_LIMIT_PER_SECOND, settings.UPSTREAM_RATE_LIMIT_BURST)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            settings.UPSTREAM_INITIAL_CONCURRENCY,
+            settings.UPSTREAM_MIN_CONCURRENCY,
+            settings.UPSTREAM_MAX_CONCURRENCY,
+            settings.UPSTREAM_LATENCY_SPIKE_FACTOR
+        )
+        self.breaker = CircuitBreaker(settings.UPSTREAM_CIRCUIT_FAILURE_THRESHOLD, settings.UPSTREAM_CIRCUIT_OPEN_SECONDS)
+        self.max_attempts = max(1, settings.UPSTREAM_MAX_ATTEMPTS)
+        self.base_delay = settings.UPSTREAM_RETRY_BASE_DELAY_SECONDS
+        self.max_delay = settings.UPSTREAM_RETRY_MAX_DELAY_SECONDS
+        self.retries = 0
+        self.rejected = 0
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spreads retries from many callers across the window
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def _retry(self, attempt: int, reason: str, delay: float) -> None:
+        self.retries += 1
+        UPSTREAM_RETRIES.labels(reason).inc()
+        logger.warning(f"Retrying upstream call after {reason} (attempt {attempt + 1}/{self.max_attempts}) in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+    async def _send(self, send: Callable[[], Awaitable[httpx.Response]]) -> Tuple[httpx.Response, float]:
+        await self.bucket.acquire()
+        await self.limiter.acquire()
+        started = time.monotonic()
+        try:
+            response = await send()
+        finally:
+            await self.limiter.release()
+        return response, time.monotonic() - started
+
+    async def call(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Run an idempotent upstream request under the governor; returns the final response"""
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.breaker.allow():
+                self.rejected += 1
+                UPSTREAM_REJECTED.inc()
+                raise UpstreamUnavailableError("Open-Meteo API is unavailable (circuit open)", self.breaker.retry_after())
+            # In the half-open state, the call allow() just let through is the probe
+            probe = self.breaker.state == CIRCUIT_HALF_OPEN
+            failure: Optional[httpx.TransportError] = None
+            try:
+                response, latency = await self._send(send)
+            except httpx.PoolTimeout:
+                # Our own connection pool is saturated; says nothing about the upstream
+                raise
+            except httpx.TransportError as e:
+                failure = e
+            finally:
+                if probe:
+                    # Cleared on every exit (cancellation included) so the circuit
+                    # cannot stay half-open with a probe that never reports back;
+                    # the outcome below is recorded without an await in between
+                    self.breaker.release_probe()
+
+            if failure is not None:
+                reason = "timeout" if isinstance(failure, httpx.TimeoutException) else "connection_error"
+                self.breaker.record_failure()
+                self.limiter.on_overload(reason)
+                if attempt == self.max_attempts:
+                    raise failure
+                await self._retry(attempt, reason, self._backoff(attempt))
+                continue
+
+            status_code = response.status_code
+            if status_code == 429:
+                # Throttled, not broken: back off without counting towards the
+                # circuit, and without closing it when this was the probe
+                self.limiter.on_overload("http_429")
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    self.bucket.pause(min(retry_after, self.max_delay))
+                if attempt == self.max_attempts or (retry_after is not None and retry_after > self.max_delay):
+                    return response
+                await self._retry(attempt, "http_429", max(retry_after or 0.0, self._backoff(attempt)))
+                continue
+            if status_code >= 500:
+                self.breaker.record_failure()
+                self.limiter.on_overload("http_5xx")
+                if attempt == self.max_attempts:
+                    return response
+                await self._retry(attempt, "http_5xx", self._backoff(attempt))
+                continue
+
+            self.breaker.record_success()
+            if status_code < 400:
+                self.limiter.on_success(latency)
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.stats(),
+            "concurrency": self.limiter.stats(),
+            "rate_limit": self.bucket.stats(),
+            "retries": self.retries,
+            "rejected": self.rejected
+        }
+
+
+_governor: Optional[UpstreamGovernor] = None
+
+
+def get_upstream_governor() -> UpstreamGovernor:
+    """Return the process-wide governor shared by every Open-Meteo call"""
+    global _governor
+    if _governor is None:
+        _governor = UpstreamGovernor()
+    return _governor
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.config import settings
+from app.utils.cache import ByteLRUCache, DiskCache
+
+logger = logging.getLogger(__name__)
+
+# Per-request cache outcomes reported back to callers
+CACHE_HIT_MEMORY = "hit-memory"
+CACHE_HIT_DISK = "hit-disk"
+CACHE_MISS = "miss"
+CACHE_BYPASS = "bypass"
+
+
+def _normalize_coordinate(value: float, precision: int) -> str:
+    # Adding 0.0 turns -0.0 into 0.0 so both spellings share a key
+    return f"{round(value, precision) + 0.0:.{precision}f}"
+
+
+def make_cache_key(
+    latitude: float,
+    longitude: float,
+    start_date: str,
+    end_date: str,
+    daily: Iterable[str]
+) -> str:
+    """Canonical key for an archive request: fixed coordinate precision, sorted variables"""
+    precision = settings.WEATHER_CACHE_COORD_PRECISION
+    return "|".join([
+        _normalize_coordinate(latitude, precision),
+        _normalize_coordinate(longitude, precision),
+        start_date,
+        end_date,
+        ",".join(sorted(set(daily)))
+    ])
+
+
+def is_cacheable_range(end_date: str) -> bool:
+    """Archive data is only immutable once it is a few days in the past"""
+    try:
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        return False
+    return end <= date.today() - timedelta(days=settings.WEATHER_CACHE_FRESHNESS_DAYS)
+
+
+class WeatherCache:
+    """Two-tier cache of archive responses: in-memory LRU in front of a disk tier"""
+
+    def __init__(self):
+        self.memory = ByteLRUCache(settings.WEATHER_CACHE_MEMORY_MAX_BYTES)
+        self.disk: Optional[DiskCache] = None
+        if settings.WEATHER_CACHE_DISK_DIR:
+            self.disk = DiskCache(settings.WEATHER_CACHE_DISK_DIR, settings.WEATHER_CACHE_DISK_MAX_BYTES)
+
+    async def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Look up a response; returns (data, outcome)"""
+        raw = self.memory.get(key)
+        if raw is not None:
+            return json.loads(raw), CACHE_HIT_MEMORY
+        if self.disk is not None:
+            raw = await asyncio.to_thread(self.disk.get, key)
+            if raw is not None:
+                self.memory.set(key, raw)
+                return json.loads(raw), CACHE_HIT_DISK
+        return None, CACHE_MISS
+
+    async def set(self, key: str, data: Dict[str, Any]) -> None:
+        raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self.memory.set(key, raw)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, raw)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None
+        }
+
+
+_weather_cache: Optional[WeatherCache] = None
+
+
+def get_weather_cache() -> Optional[WeatherCache]:
+    """Return the process-wide archive cache, or None when caching is disabled"""
+    global _weather_cache
+    if not settings.WEATHER_CACHE_ENABLED:
+        return None
+    if _weather_cache is None:
+        _weather_cache = WeatherCache()
+    return _weather_cache
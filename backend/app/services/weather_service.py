@@ -1,55 +1,373 @@
+import asyncio
 import httpx
 import json
 import logging
-from datetime import datetime
-from typing import Dict, Any
+import time
+from collections import deque
+from datetime import date, datetime
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple, Union
 from app.config import settings
+from app.services.http_client import UpstreamHTTPClient, get_http_client
+from app.services.upstream_governor import UpstreamUnavailableError, get_upstream_governor, parse_retry_after
+from app.services.weather_cache import (
+    CACHE_BYPASS,
+    get_weather_cache,
+    is_cacheable_range,
+    make_cache_key
+)
+from app.services.weather_tiles import get_weather_tiles
+from app.utils.metrics import UPSTREAM_BYTES, UPSTREAM_DURATION, UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS, WEATHER_FETCHES
+from app.utils.singleflight import get_singleflight
 
 logger = logging.getLogger(__name__)
 
+DAILY_VARIABLES = [
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "apparent_temperature_max",
+    "apparent_temperature_min"
+]
+
+def split_date_range(start_date: str, end_date: str) -> List[Tuple[str, str]]:
+    """
+    Split a date range into calendar-year chunks.
+    
+    Chunk boundaries are fixed to years rather than to the request, so
+    overlapping long-range requests reuse the same cached chunks.
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(date(chunk_start.year, 12, 31), end)
+        chunks.append((chunk_start.isoformat(), chunk_end.isoformat()))
+        chunk_start = date(chunk_start.year + 1, 1, 1)
+    return chunks
+
 class WeatherService:
-    def __init__(self):
+    def __init__(self, http_client: Optional[UpstreamHTTPClient] = None):
         self.base_url = settings.OPEN_METEO_BASE_URL
+        # None means "use the shared pooled client", resolved per call so the
+        # lifespan can replace it without rebuilding the service
+        self._http_client = http_client
+    
+    @property
+    def http_client(self) -> UpstreamHTTPClient:
+        return self._http_client or get_http_client()
     
     async def fetch_weather_data(
         self, 
         latitude: float, 
         longitude: float, 
         start_date: str, 
-        end_date: str
+        end_date: str,
+        bypass_cache: bool = False
     ) -> Dict[str, Any]:
         """
         Fetch historical weather data from Open-Meteo API
         """
+        data, _ = await self.fetch_weather_data_with_cache_status(
+            latitude, longitude, start_date, end_date, bypass_cache=bypass_cache
+        )
+        return data
+    
+    async def fetch_weather_data_with_cache_status(
+        self,
+        latitude: float,
+        longitude: float,
+        start_date: str,
+        end_date: str,
+        bypass_cache: bool = False
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Fetch weather data through the archive cache.
+        
+        Returns (data, cache_status). Ranges ending within the last
+        WEATHER_CACHE_FRESHNESS_DAYS are never cached; bypass_cache forces an
+        upstream fetch and refreshes the cached copy. With month tiles
+        enabled, a cache miss is assembled from tiles (see WeatherTileStore).
+        """
+        cache = get_weather_cache()
+        cacheable = cache is not None and is_cacheable_range(end_date)
+        key = make_cache_key(latitude, longitude, start_date, end_date, DAILY_VARIABLES)
+        
+        if cacheable and not bypass_cache:
+            data, cache_status = await cache.get(key)
+            if data is not None:
+                logger.info(f"Weather cache {cache_status} for lat={latitude}, lon={longitude}, dates={start_date} to {end_date}")
+                WEATHER_FETCHES.labels(cache_status).inc()
+                return data, cache_status
+        else:
+            cache_status = CACHE_BYPASS
+        
+        tiles = get_weather_tiles()
+        
+        async def fetch_and_cache() -> Tuple[Dict[str, Any], str]:
+            if tiles is not None and not bypass_cache:
+                data, status = await tiles.fetch(latitude, longitude, start_date, end_date, self._fetch_upstream)
+            else:
+                data, status = await self._fetch_upstream(latitude, longitude, start_date, end_date), cache_status
+            if cacheable:
+                await cache.set(key, data)
+            return data, status
+        
+        # Identical concurrent requests share one upstream call. bypass_cache is
+        # part of the key, so a bypass never joins a fetch that may come from the cache
+        (data, cache_status), shared = await get_singleflight("weather-fetch").do((key, bypass_cache), fetch_and_cache)
+        if shared:
+            logger.info(f"Coalesced weather fetch for lat={latitude}, lon={longitude}, dates={start_date} to {end_date}")
+        WEATHER_FETCHES.labels(cache_status).inc()
+        return data, cache_status
+    
+    async def iter_weather_chunks(
+        self,
+        latitude: float,
+        longitude: float,
+        start_date: str,
+        end_date: str,
+        bypass_cache: bool = False
+    ) -> AsyncIterator[Tuple[str, str, Dict[str, Any], str]]:
+        """
+        Fetch a long range as calendar-year chunks, yielding
+        (chunk_start, chunk_end, data, cache_status) in date order.
+        
+        Up to LONG_RANGE_CONCURRENCY chunks are fetched ahead of the consumer,
+        so memory stays bounded by the window rather than the whole range.
+        """
+        chunks = iter(split_date_range(start_date, end_date))
+        window: "deque[Tuple[Tuple[str, str], asyncio.Task]]" = deque()
+        
+        def schedule() -> None:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                task = asyncio.ensure_future(self.fetch_weather_data_with_cache_status(
+                    latitude, longitude, chunk[0], chunk[1], bypass_cache=bypass_cache
+                ))
+                window.append((chunk, task))
+        
+        for _ in range(settings.LONG_RANGE_CONCURRENCY):
+            schedule()
+        try:
+            while window:
+                (chunk_start, chunk_end), task = window.popleft()
+                data, cache_status = await task
+                # Keep the window full while the consumer handles this chunk
+                schedule()
+                yield chunk_start, chunk_end, data, cache_status
+        finally:
+            for _, task in window:
+                task.cancel()
+    
+    async def fetch_weather_data_long_range(
+        self,
+        latitude: float,
+        longitude: float,
+        start_date: str,
+        end_date: str,
+        bypass_cache: bool = False
+    ) -> Tuple[Dict[str, Any], str, int]:
+        """
+        Fetch a long range chunk by chunk and merge the daily arrays in order.
+        
+        Returns (data, cache_status, chunk_count). cache_status is shared by
+        all chunks, or "partial" when chunks differ. The whole series is held
+        in memory, so callers cap the range (LONG_RANGE_SINGLE_MAX_DAYS) and
+        use iter_weather_chunks beyond it.
+        """
+        merged: Optional[Dict[str, Any]] = None
+        statuses = set()
+        chunk_count = 0
+        async for _, _, data, cache_status in self.iter_weather_chunks(
+            latitude, longitude, start_date, end_date, bypass_cache=bypass_cache
+        ):
+            chunk_count += 1
+            statuses.add(cache_status)
+            if merged is None:
+                # Chunk results may be shared with coalesced callers; copy before extending
+                merged = dict(data)
+                merged["daily"] = {name: list(values) for name, values in data.get("daily", {}).items()}
+            else:
+                for name, values in data.get("daily", {}).items():
+                    merged["daily"].setdefault(name, []).extend(values)
+        cache_status = statuses.pop() if len(statuses) == 1 else "partial"
+        logger.info(f"Merged {chunk_count} chunks for lat={latitude}, lon={longitude}, dates={start_date} to {end_date}")
+        return merged or {}, cache_status, chunk_count
+    
+    async def fetch_weather_data_batch(
+        self,
+        items: List[Tuple[float, float, str, str, bool]]
+    ) -> List[Union[Tuple[Dict[str, Any], str], Exception]]:
+        """
+        Fetch many (latitude, longitude, start_date, end_date, bypass_cache)
+        items at once.
+        
+        Cache hits are served locally; misses that share a date range are
+        grouped into multi-coordinate Open-Meteo calls of up to
+        BATCH_COORDS_PER_REQUEST locations, run concurrently. With month
+        tiles enabled, each item goes through the single-item path instead,
+        so misses are assembled from stored tiles and coalesced with
+        identical fetches in flight. Returns one entry per item, in order:
+        (data, cache_status) or the Exception that item failed with.
+        """
+        if get_weather_tiles() is not None:
+            return await self._fetch_batch_items(items)
+        
+        cache = get_weather_cache()
+        results: List[Union[Tuple[Dict[str, Any], str], Exception, None]] = [None] * len(items)
+        # (start_date, end_date) -> canonical location key -> item indexes,
+        # so duplicate locations in one batch are only requested once
+        pending: Dict[Tuple[str, str], Dict[str, List[int]]] = {}
+        statuses: Dict[int, str] = {}
+        
+        for index, (latitude, longitude, start_date, end_date, bypass_cache) in enumerate(items):
+            key = make_cache_key(latitude, longitude, start_date, end_date, DAILY_VARIABLES)
+            cacheable = cache is not None and is_cacheable_range(end_date)
+            if cacheable and not bypass_cache:
+                data, cache_status = await cache.get(key)
+                if data is not None:
+                    results[index] = (data, cache_status)
+                    continue
+            else:
+                cache_status = CACHE_BYPASS
+            statuses[index] = cache_status
+            pending.setdefault((start_date, end_date), {}).setdefault(key, []).append(index)
+        
+        groups = []
+        for (start_date, end_date), locations in pending.items():
+            location_indexes = list(locations.values())
+            for offset in range(0, len(location_indexes), settings.BATCH_COORDS_PER_REQUEST):
+                groups.append((start_date, end_date, location_indexes[offset:offset + settings.BATCH_COORDS_PER_REQUEST]))
+        
+        semaphore = asyncio.Semaphore(settings.BATCH_FETCH_CONCURRENCY)
+        
+        async def fetch_group(start_date: str, end_date: str, location_indexes: List[List[int]]) -> None:
+            coordinates = [(items[indexes[0]][0], items[indexes[0]][1]) for indexes in location_indexes]
+            async with semaphore:
+                try:
+                    locations = await self._fetch_upstream_locations(coordinates, start_date, end_date)
+                except Exception as e:
+                    for indexes in location_indexes:
+                        for i in indexes:
+                            results[i] = e
+                    return
+            for (latitude, longitude), indexes, data in zip(coordinates, location_indexes, locations):
+                if cache is not None and is_cacheable_range(end_date):
+                    await cache.set(make_cache_key(latitude, longitude, start_date, end_date, DAILY_VARIABLES), data)
+                for i in indexes:
+                    results[i] = (data, statuses[i])
+        
+        await asyncio.gather(*(fetch_group(*group) for group in groups))
+        for result in results:
+            if isinstance(result, tuple):
+                WEATHER_FETCHES.labels(result[1]).inc()
+        logger.info(f"Batch fetch: {len(items)} items, {len(items) - len(statuses)} cache hits, {len(groups)} upstream calls")
+        return results
+    
+    async def _fetch_batch_items(
+        self,
+        items: List[Tuple[float, float, str, str, bool]]
+    ) -> List[Union[Tuple[Dict[str, Any], str], Exception]]:
+        """Fetch each batch item through fetch_weather_data_with_cache_status, BATCH_FETCH_CONCURRENCY at a time"""
+        semaphore = asyncio.Semaphore(settings.BATCH_FETCH_CONCURRENCY)
+        
+        async def fetch_item(
+            latitude: float, longitude: float, start_date: str, end_date: str, bypass_cache: bool
+        ) -> Union[Tuple[Dict[str, Any], str], Exception]:
+            async with semaphore:
+                try:
+                    return await self.fetch_weather_data_with_cache_status(
+                        latitude, longitude, start_date, end_date, bypass_cache=bypass_cache
+                    )
+                except Exception as e:
+                    return e
+        
+        results = await asyncio.gather(*(fetch_item(*item) for item in items))
+        logger.info(f"Batch fetch: {len(items)} items through month tiles")
+        return list(results)
+    
+    async def _fetch_upstream(
+        self,
+        latitude: float,
+        longitude: float,
+        start_date: str,
+        end_date: str
+    ) -> Dict[str, Any]:
+        locations = await self._fetch_upstream_locations([(latitude, longitude)], start_date, end_date)
+        return locations[0]
+    
+    async def _fetch_upstream_locations(
+        self,
+        coordinates: List[Tuple[float, float]],
+        start_date: str,
+        end_date: str
+    ) -> List[Dict[str, Any]]:
+        """Fetch one date range for one or more coordinates in a single Open-Meteo call"""
+        latitude = ",".join(str(lat) for lat, _ in coordinates)
+        longitude = ",".join(str(lon) for _, lon in coordinates)
         params = {
             "latitude": latitude,
             "longitude": longitude,
             "start_date": start_date,
             "end_date": end_date,
-            "daily": [
-                "temperature_2m_max",
-                "temperature_2m_min",
-                "apparent_temperature_max",
-                "apparent_temperature_min"
-            ],
+            "daily": DAILY_VARIABLES,
             "timezone": "auto"
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async def attempt() -> httpx.Response:
+            # One upstream request; the governor may call this several times
+            started = time.perf_counter()
+            outcome = "error"
+            in_flight = UPSTREAM_IN_FLIGHT.labels()
+            in_flight.inc()
             try:
-                logger.info(f"Fetching weather data for lat={latitude}, lon={longitude}, dates={start_date} to {end_date}")
-                response = await client.get(self.base_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                logger.info(f"Successfully fetched weather data: {len(data.get('daily', {}).get('time', []))} days")
-                return data
-            except httpx.HTTPStatusError as e:
-                logger.error(f"Open-Meteo API returned error {e.response.status_code} for lat={latitude}, lon={longitude}: {e.response.text}")
-                raise Exception(f"Open-Meteo API error: {e.response.status_code} - {e.response.text[:100]}")
+                response = await self.http_client.get(self.base_url, params=params)
+                UPSTREAM_BYTES.inc(len(response.content))
+                outcome = "ok" if response.status_code < 400 else f"http_{response.status_code}"
+                return response
             except httpx.TimeoutException:
-                logger.error(f"Timeout while fetching weather data from Open-Meteo API for lat={latitude}, lon={longitude}")
-                raise Exception("Request timeout: Open-Meteo API did not respond in time")
-            except Exception as e:
-                logger.error(f"Failed to fetch weather data for lat={latitude}, lon={longitude}: {str(e)}", exc_info=True)
-                raise Exception(f"Failed to fetch weather data: {str(e)}")
+                outcome = "timeout"
+                raise
+            finally:
+                in_flight.dec()
+                UPSTREAM_DURATION.labels(outcome).observe(time.perf_counter() - started)
+                UPSTREAM_REQUESTS.labels(outcome).inc()
+        
+        try:
+            logger.info(f"Fetching weather data for lat={latitude}, lon={longitude}, dates={start_date} to {end_date}")
+            if settings.UPSTREAM_GOVERNOR_ENABLED:
+                response = await get_upstream_governor().call(attempt)
+            else:
+                response = await attempt()
+            if response.status_code == 429:
+                raise UpstreamUnavailableError("Open-Meteo API rate limit exceeded", parse_retry_after(response.headers.get("Retry-After")))
+            response.raise_for_status()
+            data = response.json()
+            # Open-Meteo returns a list for multiple coordinates and an object for one
+            locations = data if isinstance(data, list) else [data]
+            if len(locations) != len(coordinates):
+                raise Exception(f"Expected {len(coordinates)} locations, got {len(locations)}")
+            logger.info(f"Successfully fetched weather data: {len(locations)} location(s), {len(locations[0].get('daily', {}).get('time', []))} days")
+            return locations
+        except UpstreamUnavailableError as e:
+            logger.error(f"Open-Meteo API unavailable for lat={latitude}, lon={longitude}: {str(e)}")
+            raise
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Open-Meteo API returned error {e.response.status_code} for lat={latitude}, lon={longitude}: {e.response.text}")
+            raise Exception(f"Open-Meteo API error: {e.response.status_code} - {e.response.text[:100]}")
+        except httpx.TimeoutException:
+            logger.error(f"Timeout while fetching weather data from Open-Meteo API for lat={latitude}, lon={longitude}")
+            raise Exception("Request timeout: Open-Meteo API did not respond in time")
+        except Exception as e:
+            logger.error(f"Failed to fetch weather data for lat={latitude}, lon={longitude}: {str(e)}", exc_info=True)
+            raise Exception(f"Failed to fetch weather data: {str(e)}")
+
+_weather_service: Optional[WeatherService] = None
+
+def get_weather_service() -> WeatherService:
+    """Return the process-wide WeatherService instance"""
+    global _weather_service
+    if _weather_service is None:
+        _weather_service = WeatherService()
+    return _weather_service
 
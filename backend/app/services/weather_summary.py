@@ -0,0 +1,83 @@
+import json
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+# Summaries larger than this are kept in the file index only; S3 caps all
+# user metadata of an object at 2 KB
+MAX_METADATA_SUMMARY_BYTES = 1024
+
+
+def _min_max(values: Iterable[Any]) -> Optional[Dict[str, float]]:
+    numbers = [
+        value for value in values
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    ]
+    if not numbers:
+        return None
+    return {"min": min(numbers), "max": max(numbers)}
+
+
+def summarize_weather_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact summary of one Open-Meteo location object.
+
+    Holds the day count, the first and last day, the coordinates and the
+    min and max of every numeric daily variable (missing values ignored).
+    Computed once at write time so listings can show it without reading
+    the object.
+    """
+    daily = data.get("daily") or {}
+    times = daily.get("time") or []
+    variables = {}
+    for name, values in daily.items():
+        if name == "time":
+            continue
+        extremes = _min_max(values or [])
+        if extremes is not None:
+            variables[name] = extremes
+    return {
+        "days": len(times),
+        "latitude": data.get("latitude"),
+        "longitude": data.get("longitude"),
+        "start_date": times[0] if times else None,
+        "end_date": times[-1] if times else None,
+        "variables": variables
+    }
+
+
+def merge_summaries(summaries: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """One summary for consecutive parts (the chunks behind a manifest), in date order"""
+    if not summaries:
+        return None
+    variables: Dict[str, Dict[str, float]] = {}
+    for summary in summaries:
+        for name, extremes in summary["variables"].items():
+            merged = variables.setdefault(name, dict(extremes))
+            merged["min"] = min(merged["min"], extremes["min"])
+            merged["max"] = max(merged["max"], extremes["max"])
+    start_dates = [summary["start_date"] for summary in summaries if summary["start_date"]]
+    end_dates = [summary["end_date"] for summary in summaries if summary["end_date"]]
+    return {
+        "days": sum(summary["days"] for summary in summaries),
+        "latitude": summaries[0]["latitude"],
+        "longitude": summaries[0]["longitude"],
+        "start_date": min(start_dates) if start_dates else None,
+        "end_date": max(end_dates) if end_dates else None,
+        "variables": variables
+    }
+
+
+def encode_summary(summary: Dict[str, Any]) -> str:
+    """Compact JSON, as stored in object metadata and the file index"""
+    return json.dumps(summary, separators=(",", ":"), sort_keys=True)
+
+
+def decode_summary(encoded: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Summary read back from object metadata; None when missing or unreadable"""
+    if not encoded:
+        return None
+    try:
+        summary = json.loads(encoded)
+    except ValueError:
+        return None
+    return summary if isinstance(summary, dict) else None
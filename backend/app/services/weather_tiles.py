@@ -0,0 +1,216 @@
+import asyncio
+import calendar
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.weather_cache import CACHE_MISS
+from app.storage.serialization import deserialize, get_format, serialize
+from app.storage.storage_client import TILE_PREFIX, get_storage_client
+from app.utils.metrics import WEATHER_TILES
+from app.utils.singleflight import get_singleflight
+
+logger = logging.getLogger(__name__)
+
+# Every month of the request came from stored tiles
+CACHE_HIT_TILE = "hit-tile"
+CACHE_PARTIAL = "partial"
+
+# (latitude, longitude, start_date, end_date) -> one Open-Meteo location object
+UpstreamFetch = Callable[[float, float, str, str], Awaitable[Dict[str, Any]]]
+
+
+def snap_to_grid(latitude: float, longitude: float, grid: float) -> Tuple[float, float]:
+    """Nearest grid point, rounded to the grid's own decimal places"""
+    decimals = max(0, -Decimal(str(grid)).as_tuple().exponent)
+    snapped_latitude = min(90.0, max(-90.0, round(round(latitude / grid) * grid, decimals)))
+    snapped_longitude = min(180.0, max(-180.0, round(round(longitude / grid) * grid, decimals)))
+    # Adding 0.0 turns -0.0 into 0.0 so both spellings share a tile
+    return snapped_latitude + 0.0, snapped_longitude + 0.0
+
+
+def month_ranges(start: date, end: date) -> List[Tuple[date, date]]:
+    """(first_day, last_day) of every calendar month overlapping [start, end]"""
+    months = []
+    first = start.replace(day=1)
+    while first <= end:
+        last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+        months.append((first, last))
+        first = last + timedelta(days=1)
+    return months
+
+
+def _slice_daily(data: Dict[str, Any], start: str, end: str) -> Dict[str, List[Any]]:
+    times = data.get("daily", {}).get("time", [])
+    # ISO dates sort as strings, and the series is in date order
+    indexes = [i for i, day in enumerate(times) if start <= day <= end]
+    if not indexes:
+        return {name: [] for name in data.get("daily", {})}
+    first, last = indexes[0], indexes[-1] + 1
+    return {name: values[first:last] for name, values in data["daily"].items()}
+
+
+class WeatherTileStore:
+    """
+    Per-cell, per-month tiles of archive data in the configured storage.
+
+    Coordinates snap to the model grid (WEATHER_TILE_GRID_DEGREES), so
+    nearby requests share a cell. A request is assembled from the month
+    tiles it overlaps; missing months are fetched in one upstream call per
+    contiguous run and stored as tiles. Months that end within the last
+    WEATHER_CACHE_FRESHNESS_DAYS may still change upstream, so they are
+    fetched for the request but never stored. Upstream traffic then grows
+    with distinct cells and months, not with requests.
+    """
+
+    def __init__(self):
+        self.grid = settings.WEATHER_TILE_GRID_DEGREES
+        self.format = get_format(settings.WEATHER_TILE_FORMAT)
+        self.requests = 0
+        self.tile_hits = 0
+        self.tiles_stored = 0
+        self.upstream_calls = 0
+
+    def tile_name(self, latitude: float, longitude: float, month: date) -> str:
+        return f"{TILE_PREFIX}{self.grid:g}/{latitude}_{longitude}/{month:%Y-%m}{self.format.extension}"
+
+    async def _load(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            content = await get_storage_client().get_file_content(name)
+            return deserialize(content) if content is not None else None
+        except Exception as e:
+            # A tile that cannot be read or decoded is fetched again
+            logger.warning(f"Failed to read weather tile '{name}': {str(e)}")
+            return None
+
+    async def _save(self, name: str, tile: Dict[str, Any]) -> None:
+        content = serialize(tile, self.format.name)
+        success = await get_storage_client().upload_file(
+            name,
+            content,
+            content_type=self.format.content_type,
+            content_encoding=self.format.content_encoding,
+            metadata={"format": self.format.name}
+        )
+        if success:
+            self.tiles_stored += 1
+            WEATHER_TILES.labels("stored").inc()
+        else:
+            # The month is refetched next time; the request itself still succeeds
+            logger.warning(f"Failed to store weather tile '{name}'")
+
+    async def _fetch_run(
+        self,
+        latitude: float,
+        longitude: float,
+        months: List[Tuple[date, date]],
+        fetch_start: date,
+        fetch_end: date,
+        cutoff: date,
+        upstream: UpstreamFetch
+    ) -> List[Dict[str, Any]]:
+        """Fetch a run of months in one upstream call; store the complete, settled ones"""
+        self.upstream_calls += 1
+        data = await upstream(latitude, longitude, fetch_start.isoformat(), fetch_end.isoformat())
+        meta = {key: value for key, value in data.items() if key != "daily"}
+        parts, saves = [], []
+        for first, last in months:
+            part = {**meta, "daily": _slice_daily(data, first.isoformat(), last.isoformat())}
+            parts.append(part)
+            complete = len(part["daily"].get("time", [])) == (last - first).days + 1
+            if last <= cutoff and complete:
+                saves.append(self._save(self.tile_name(latitude, longitude, first), part))
+        WEATHER_TILES.labels("fetched").inc(len(months))
+        await asyncio.gather(*saves)
+        return parts
+
+    async def fetch(
+        self,
+        latitude: float,
+        longitude: float,
+        start_date: str,
+        end_date: str,
+        upstream: UpstreamFetch
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Assemble [start_date, end_date] for the grid cell of (latitude, longitude).
+
+        Returns (data, cache_status): hit-tile when every month came from a
+        stored tile, miss when none did, partial otherwise.
+        """
+        self.requests += 1
+        cell_latitude, cell_longitude = snap_to_grid(latitude, longitude, self.grid)
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        cutoff = date.today() - timedelta(days=settings.WEATHER_CACHE_FRESHNESS_DAYS)
+        months = month_ranges(start, end)
+
+        async def load(first: date, last: date) -> Optional[Dict[str, Any]]:
+            if last > cutoff:
+                return None
+            return await self._load(self.tile_name(cell_latitude, cell_longitude, first))
+
+        parts: List[Optional[Dict[str, Any]]] = list(await asyncio.gather(*(load(*month) for month in months)))
+        hits = sum(1 for part in parts if part is not None)
+        self.tile_hits += hits
+        WEATHER_TILES.labels("hit").inc(hits)
+
+        # Contiguous runs of missing months, one upstream call each
+        runs: List[Tuple[int, int]] = []
+        for i, part in enumerate(parts):
+            if part is not None:
+                continue
+            if runs and runs[-1][1] == i:
+                runs[-1] = (runs[-1][0], i + 1)
+            else:
+                runs.append((i, i + 1))
+
+        async def fill(run_start: int, run_end: int) -> None:
+            run_months = months[run_start:run_end]
+            # Settled months are fetched whole so they can be stored; the
+            # unsettled tail only as far as the request needs
+            fetch_start = run_months[0][0] if run_months[0][1] <= cutoff else max(run_months[0][0], start)
+            fetch_end = run_months[-1][1] if run_months[-1][1] <= cutoff else end
+            key = (cell_latitude, cell_longitude, fetch_start, fetch_end)
+            fetched, _ = await get_singleflight("weather-tiles").do(key, lambda: self._fetch_run(
+                cell_latitude, cell_longitude, run_months, fetch_start, fetch_end, cutoff, upstream
+            ))
+            parts[run_start:run_end] = fetched
+
+        await asyncio.gather(*(fill(*run) for run in runs))
+
+        data = {key: value for key, value in parts[0].items() if key != "daily"}
+        data["daily"] = {}
+        for part in parts:
+            for name, values in _slice_daily(part, start_date, end_date).items():
+                data["daily"].setdefault(name, []).extend(values)
+        cache_status = CACHE_HIT_TILE if not runs else CACHE_MISS if hits == 0 else CACHE_PARTIAL
+        logger.info(
+            f"Assembled {len(months)} month tile(s) ({hits} stored) for cell {cell_latitude},{cell_longitude}, "
+            f"dates={start_date} to {end_date}"
+        )
+        return data, cache_status
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "grid_degrees": self.grid,
+            "format": self.format.name,
+            "requests": self.requests,
+            "tile_hits": self.tile_hits,
+            "tiles_stored": self.tiles_stored,
+            "upstream_calls": self.upstream_calls
+        }
+
+
+_weather_tiles: Optional[WeatherTileStore] = None
+
+
+def get_weather_tiles() -> Optional[WeatherTileStore]:
+    """Return the process-wide tile store, or None when tiles are disabled"""
+    global _weather_tiles
+    if not settings.WEATHER_TILES_ENABLED:
+        return None
+    if _weather_tiles is None:
+        _weather_tiles = WeatherTileStore()
+    return _weather_tiles
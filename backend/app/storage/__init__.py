@@ -1,4 +1,4 @@
-from app.storage.storage_client import StorageClient, get_storage_client
+from app.storage.storage_client import StorageClient, get_storage_client, close_storage_clients, flush_storage_clients, set_storage_client, storage_client_stats
 
-__all__ = ["StorageClient", "get_storage_client"]
+__all__ = ["StorageClient", "get_storage_client", "close_storage_clients", "flush_storage_clients", "set_storage_client", "storage_client_stats"]
 
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import mmap
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.storage.storage_client import StorageClient
+from app.utils.cache import ByteLRUCache, DiskCache
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on remembered validators; each entry is a name and a short string
+_MAX_VALIDATORS = 100_000
+
+
+def _slices(content: Any, start: int, end: Optional[int], chunk_size: int) -> Iterator[bytes]:
+    stop = len(content) if end is None else min(end + 1, len(content))
+    for offset in range(start, stop, chunk_size):
+        yield bytes(content[offset:min(offset + chunk_size, stop)])
+
+
+class CachedStorageClient(StorageClient):
+    """
+    Read-through content cache in front of another StorageClient.
+
+    Weather files are written once under timestamped names, so cached bytes
+    stay valid for as long as the backend's validator (GCS generation or S3
+    ETag) is unchanged. Entries are keyed by name and validator in a byte
+    LRU with an optional disk tier. A cached read is revalidated with a HEAD
+    once its last check is older than FILE_CONTENT_CACHE_REVALIDATE_SECONDS,
+    and uploads through this client drop the cached copy of the name.
+    """
+
+    def __init__(self, backend: StorageClient):
+        self.backend = backend
+        self.backend_name = backend.backend_name
+        self.memory = ByteLRUCache(settings.FILE_CONTENT_CACHE_MEMORY_MAX_BYTES)
+        self.disk: Optional[DiskCache] = None
+        if settings.FILE_CONTENT_CACHE_DISK_DIR:
+            self.disk = DiskCache(settings.FILE_CONTENT_CACHE_DISK_DIR, settings.FILE_CONTENT_CACHE_DISK_MAX_BYTES)
+        self.revalidate_seconds = settings.FILE_CONTENT_CACHE_REVALIDATE_SECONDS
+        # name -> (validator, monotonic time it was last confirmed)
+        self._validated: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _validator(head: Dict[str, Any]) -> str:
+        generation = head.get("generation")
+        return str(generation) if generation is not None else head["etag"]
+
+    @staticmethod
+    def _key(file_name: str, validator: str) -> str:
+        return f"{file_name}\n{validator}"
+
+    def _remember(self, file_name: str, validator: str) -> None:
+        self._validated[file_name] = (validator, time.monotonic())
+        self._validated.move_to_end(file_name)
+        while len(self._validated) > _MAX_VALIDATORS:
+            self._validated.popitem(last=False)
+
+    def _fresh_validator(self, file_name: str) -> Optional[str]:
+        entry = self._validated.get(file_name)
+        if entry is not None and time.monotonic() - entry[1] < self.revalidate_seconds:
+            return entry[0]
+        return None
+
+    async def _drop(self, file_name: str, validator: str) -> None:
+        key = self._key(file_name, validator)
+        self.memory.delete(key)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.delete, key)
+
+    async def _revalidate(self, file_name: str) -> Optional[Dict[str, Any]]:
+        """HEAD the object and record its current validator; None if it is gone"""
+        self.revalidations += 1
+        head = await self.backend.head_file(file_name)
+        previous = self._validated.get(file_name)
+        validator = self._validator(head) if head is not None else None
+        if previous is not None and previous[0] != validator:
+            self.stale += 1
+            self._validated.pop(file_name, None)
+            await self._drop(file_name, previous[0])
+        if validator is not None:
+            self._remember(file_name, validator)
+        return head
+
+    async def _lookup(self, key: str) -> Optional[bytes]:
+        content = self.memory.get(key)
+        if content is not None:
+            self.hits_memory += 1
+            return content
+        if self.disk is not None:
+            content = await asyncio.to_thread(self.disk.get, key)
+            if content is not None:
+                self.hits_disk += 1
+                self.memory.set(key, content)
+                return content
+        return None
+
+    async def upload_file(
+        self,
+        file_name: str,
+        content: bytes,
+        content_type: str = "application/json",
+        content_encoding: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> bool:
+        success = await self.backend.upload_file(file_name, content, content_type, content_encoding, metadata)
+        previous = self._validated.pop(file_name, None)
+        if previous is not None:
+            self.invalidations += 1
+            await self._drop(file_name, previous[0])
+        return success
+
+    async def list_files(self) -> List[Dict]:
+        return await self.backend.list_files()
+
+    async def _list_batch(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        max_keys: int
+    ) -> Tuple[List[Dict], bool]:
+        return await self.backend._list_batch(prefix, start_after, max_keys)
+
+    async def get_file_content(self, file_name: str) -> Optional[bytes]:
+        """Serve from cache when the validator still matches, else download and cache"""
+        validator = self._fresh_validator(file_name)
+        if validator is None:
+            try:
+                head = await self._revalidate(file_name)
+            except Exception as e:
+                logger.warning(f"Revalidation of '{file_name}' failed, reading through: {str(e)}")
+                self.misses += 1
+                return await self.backend.get_file_content(file_name)
+            if head is None:
+                return None
+            validator = self._validator(head)
+
+        key = self._key(file_name, validator)
+        content = await self._lookup(key)
+        if content is not None:
+            return content
+
+        self.misses += 1
+        content, downloaded = await self.backend.get_file_content_with_validator(file_name)
+        if content is None or downloaded is None:
+            return content
+        if downloaded != validator:
+            # Overwritten between the HEAD and the GET: the bytes belong to
+            # the validator that came with them, not the one checked first
+            self.stale += 1
+            self._remember(file_name, downloaded)
+            key = self._key(file_name, downloaded)
+        self.memory.set(key, content)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, content)
+        return content
+
+    async def head_file(self, file_name: str) -> Optional[Dict[str, Any]]:
+        # A HEAD is a revalidation, so the next cached read can skip its own
+        return await self._revalidate(file_name)
+
+    def _map(self, key: str) -> Optional[mmap.mmap]:
+        path = self.disk.path_for(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # ValueError: empty files cannot be mapped
+            return None
+
+    async def iter_file_content(
+        self,
+        file_name: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        """
+        Serve ranges of cached objects without a backend call.
+
+        Memory hits are sliced directly; disk hits are memory-mapped so only
+        the requested range is paged in. Anything else streams from the
+        backend without being cached.
+        """
+        validator = self._fresh_validator(file_name)
+        if validator is not None:
+            key = self._key(file_name, validator)
+            content = self.memory.get(key)
+            if content is not None:
+                self.hits_memory += 1
+                for chunk in _slices(content, start, end, chunk_size):
+                    yield chunk
+                return
+            mapped = await asyncio.to_thread(self._map, key) if self.disk is not None else None
+            if mapped is not None:
+                self.hits_disk += 1
+                try:
+                    for chunk in _slices(mapped, start, end, chunk_size):
+                        yield chunk
+                finally:
+                    mapped.close()
+                return
+
+        self.misses += 1
+        async for chunk in self.backend.iter_file_content(file_name, start, end, chunk_size):
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.hits_memory + self.hits_disk
+        served = hits + self.misses
+        return {
+            **self.backend.stats(),
+            "content_cache": {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": round(hits / served, 4) if served else None,
+                "revalidations": self.revalidations,
+                "stale": self.stale,
+                "invalidations": self.invalidations,
+                "memory": self.memory.stats(),
+                "disk": self.disk.stats() if self.disk is not None else None
+            }
+        }
+
+    async def flush(self) -> None:
+        await self.backend.flush()
+
+    def close(self) -> None:
+        self.backend.close()
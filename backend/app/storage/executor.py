@@ -0,0 +1,40 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_storage_executor() -> ThreadPoolExecutor:
+    """
+    Return the bounded thread pool used to run blocking storage SDK calls.
+    
+    boto3 and google-cloud-storage are synchronous; running them here keeps
+    the event loop free while a bucket call is in flight.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.STORAGE_MAX_WORKERS,
+                    thread_name_prefix="storage"
+                )
+                logger.info(f"Storage executor started with {settings.STORAGE_MAX_WORKERS} workers")
+    return _executor
+
+
+def shutdown_storage_executor(wait: bool = True) -> None:
+    """Stop the storage thread pool (called from the app lifespan)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+            logger.info("Storage executor stopped")
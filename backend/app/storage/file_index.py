@@ -0,0 +1,391 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import settings
+from app.storage.storage_client import StorageClient, get_storage_client
+
+logger = logging.getLogger(__name__)
+
+# weather_{lat}_{lon}_{start}_{end}_{suffix}{extension}, as written by store_weather_data
+_WEATHER_FILE_RE = re.compile(
+    r"^weather_(?P<latitude>[^_]+)_(?P<longitude>[^_]+)_"
+    r"(?P<start_date>\d{4}-\d{2}-\d{2})_(?P<end_date>\d{4}-\d{2}-\d{2})_"
+    r"(?P<suffix>[^.]+)(?P<extension>\..+)$"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    latitude REAL,
+    longitude REAL,
+    start_date TEXT,
+    end_date TEXT,
+    size INTEGER,
+    created_at TEXT,
+    content_hash TEXT,
+    summary TEXT,
+    indexed_at REAL NOT NULL,
+    last_seen_run INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_location ON files (latitude, longitude);
+CREATE INDEX IF NOT EXISTS files_dates ON files (start_date, end_date);
+CREATE INDEX IF NOT EXISTS files_created ON files (created_at);
+"""
+
+_COLUMNS = ["name", "latitude", "longitude", "start_date", "end_date", "size", "created_at", "content_hash", "summary"]
+
+# Columns added after the first release, created on open for older index files
+_ADDED_COLUMNS = {"summary": "TEXT"}
+
+# Names per IN (...) lookup, under SQLite's default bound-parameter limit
+_LOOKUP_BATCH = 500
+
+
+def parse_weather_file_name(name: str) -> Optional[Dict[str, Any]]:
+    """Extract coordinates and date range from a stored weather file name"""
+    match = _WEATHER_FILE_RE.match(name)
+    if not match:
+        return None
+    try:
+        return {
+            "latitude": float(match.group("latitude")),
+            "longitude": float(match.group("longitude")),
+            "start_date": match.group("start_date"),
+            "end_date": match.group("end_date")
+        }
+    except ValueError:
+        return None
+
+
+def _decode_row(row: sqlite3.Row) -> Dict[str, Any]:
+    entry = dict(row)
+    if entry.get("summary") is not None:
+        entry["summary"] = json.loads(entry["summary"])
+    return entry
+
+
+def _utc_iso(value: datetime) -> str:
+    value = value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+class FileIndex:
+    """
+    Local SQLite index of stored objects.
+    
+    Answers listing and location/date queries without a bucket listing.
+    store_weather_data keeps it current on write; reconcile() catches up
+    with anything written or deleted out of band, one slice of the bucket
+    per call.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(files)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE files ADD COLUMN {column} {column_type}")
+            self._conn.commit()
+        self.last_reconcile: Optional[Dict[str, Any]] = None
+        # Key the next reconcile resumes after; None starts a new pass
+        self._reconcile_cursor: Optional[str] = None
+    
+    @staticmethod
+    def _row(entry: Dict[str, Any], run: int) -> tuple:
+        parsed = parse_weather_file_name(entry["name"]) or {}
+        created_at = entry.get("created_at")
+        if created_at:
+            created_at = _utc_iso(datetime.fromisoformat(created_at))
+        summary = entry.get("summary")
+        if summary is not None and not isinstance(summary, str):
+            summary = json.dumps(summary, separators=(",", ":"), sort_keys=True)
+        return (
+            entry["name"],
+            parsed.get("latitude"),
+            parsed.get("longitude"),
+            parsed.get("start_date"),
+            parsed.get("end_date"),
+            entry.get("size"),
+            created_at,
+            entry.get("content_hash"),
+            summary,
+            time.time(),
+            run
+        )
+    
+    def upsert_many(self, entries: Iterable[Dict[str, Any]], run: int = 0) -> int:
+        """Insert or update entries (name, size, created_at, optional content_hash and summary)"""
+        rows = [self._row(entry, run) for entry in entries]
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO files (name, latitude, longitude, start_date, end_date, size,
+                                   created_at, content_hash, summary, indexed_at, last_seen_run)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    size = excluded.size,
+                    created_at = COALESCE(excluded.created_at, files.created_at),
+                    content_hash = COALESCE(excluded.content_hash, files.content_hash),
+                    summary = COALESCE(excluded.summary, files.summary),
+                    indexed_at = excluded.indexed_at,
+                    last_seen_run = MAX(excluded.last_seen_run, files.last_seen_run)
+                """,
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+    
+    def upsert(self, entry: Dict[str, Any]) -> None:
+        self.upsert_many([entry])
+    
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE name = ?", (name,))
+            self._conn.commit()
+    
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM files WHERE name = ?", (name,)
+            ).fetchone()
+        return _decode_row(row) if row else None
+    
+    def summaries(self, names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored summaries by name for the given names; names without one are left out"""
+        names = list(names)
+        found: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(names), _LOOKUP_BATCH):
+            batch = names[i:i + _LOOKUP_BATCH]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT name, summary FROM files WHERE summary IS NOT NULL AND name IN ({', '.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+            found.update((row["name"], json.loads(row["summary"])) for row in rows)
+        return found
+    
+    def list(
+        self,
+        prefix: str = "",
+        start_after: Optional[str] = None,
+        limit: Optional[int] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Entries in name order, mirroring StorageClient.list_files_page filters"""
+        clauses, params = [], []
+        if prefix:
+            # Range scan on the primary key instead of LIKE, which would need escaping
+            clauses.append("name >= ? AND name < ?")
+            params += [prefix, prefix + "\U0010ffff"]
+        if start_after:
+            clauses.append("name > ?")
+            params.append(start_after)
+        if created_after is not None:
+            clauses.append("created_at >= ?")
+            params.append(_utc_iso(created_after))
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(_utc_iso(created_before))
+        return self._query(clauses, params, "name", limit)
+    
+    def search(
+        self,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        tolerance: float = 0.01,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Weather files near a location whose date range overlaps [start_date, end_date]"""
+        clauses, params = ["latitude IS NOT NULL"], []
+        if latitude is not None:
+            clauses.append("latitude BETWEEN ? AND ?")
+            params += [latitude - tolerance, latitude + tolerance]
+        if longitude is not None:
+            clauses.append("longitude BETWEEN ? AND ?")
+            params += [longitude - tolerance, longitude + tolerance]
+        if start_date is not None:
+            clauses.append("end_date >= ?")
+            params.append(start_date)
+        if end_date is not None:
+            clauses.append("start_date <= ?")
+            params.append(end_date)
+        return self._query(clauses, params, "created_at DESC, name", limit)
+    
+    def _query(self, clauses: List[str], params: List[Any], order_by: str, limit: Optional[int]) -> List[Dict[str, Any]]:
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = params + [limit]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_decode_row(row) for row in rows]
+    
+    def _next_run(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(MAX(last_seen_run), 0) FROM files").fetchone()
+        return row[0] + 1
+    
+    def _sweep(self, run: int, started_at: float, after: Optional[str], through: Optional[str]) -> int:
+        # Rows in (after, through] that this listing passed over, and that were
+        # not written since it began, are gone from the bucket. through=None
+        # means the listing provably reached the end of the bucket
+        clauses, params = ["last_seen_run < ?", "indexed_at < ?"], [run, started_at]
+        if after is not None:
+            clauses.append("name > ?")
+            params.append(after)
+        if through is not None:
+            clauses.append("name <= ?")
+            params.append(through)
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM files WHERE {' AND '.join(clauses)}", params)
+            self._conn.commit()
+        return cursor.rowcount
+    
+    async def reconcile(
+        self,
+        storage_client: StorageClient,
+        batch_size: int = 1000,
+        max_objects: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Bring the next slice of the index in line with the bucket.
+        
+        Each call lists up to max_objects objects (default
+        FILE_INDEX_RECONCILE_MAX_OBJECTS, 0 for no limit), resuming after
+        the key where the previous call stopped, so a large bucket is
+        covered over several calls with bounded work each. Listed objects
+        are upserted in batches and stamped with this run's number. Rows
+        in the listed key range that were not seen are removed. Rows past
+        the last listed key are only removed after a second listing finds
+        nothing after it, so a listing that ends early can never empty the
+        index. A listing that returns nothing at all removes nothing: some
+        backends answer a failed listing with an empty one.
+        """
+        if max_objects is None:
+            max_objects = settings.FILE_INDEX_RECONCILE_MAX_OBJECTS
+        started_at = time.time()
+        run = await asyncio.to_thread(self._next_run)
+        start_after = self._reconcile_cursor
+        last_name = start_after
+        seen = 0
+        limited = False
+        batch: List[Dict[str, Any]] = []
+        async for entry in storage_client.iter_files(start_after=start_after, batch_size=batch_size):
+            batch.append(entry)
+            last_name = entry["name"]
+            if len(batch) >= batch_size:
+                seen += await asyncio.to_thread(self.upsert_many, batch, run)
+                batch = []
+            if max_objects and seen + len(batch) >= max_objects:
+                limited = True
+                break
+        if batch:
+            seen += await asyncio.to_thread(self.upsert_many, batch, run)
+        
+        reached_end = False
+        if not limited:
+            reached_end = True
+            if last_name != start_after:
+                # Confirm there is nothing after the last key before sweeping the rest of the index
+                async for _ in storage_client.iter_files(start_after=last_name, batch_size=1):
+                    reached_end = False
+                    break
+            if not reached_end:
+                logger.warning(
+                    f"File index reconcile: the listing ended at '{last_name}' but more objects follow; "
+                    "not removing index entries past it"
+                )
+        if last_name == start_after and await asyncio.to_thread(self.list, start_after=start_after, limit=1):
+            logger.warning(
+                f"File index reconcile: the bucket listing after '{start_after or ''}' was empty but the index is not; "
+                "not removing index entries"
+            )
+            removed = 0
+        else:
+            removed = await asyncio.to_thread(self._sweep, run, started_at, start_after, None if reached_end else last_name)
+        # A complete pass starts over from the beginning next time
+        self._reconcile_cursor = None if reached_end else last_name
+        self.last_reconcile = {
+            "run": run,
+            "start_after": start_after,
+            "seen": seen,
+            "removed": removed,
+            "complete": reached_end,
+            "next_start_after": self._reconcile_cursor,
+            "seconds": round(time.time() - started_at, 3),
+            "finished_at": datetime.now(timezone.utc).isoformat()
+        }
+        logger.info(
+            f"File index reconciled after '{start_after or ''}': {seen} objects seen, {removed} removed "
+            f"in {self.last_reconcile['seconds']}s ({'pass complete' if reached_end else f'resumes after {last_name}'})"
+        )
+        return self.last_reconcile
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        return {"path": self.path, "files": count, "last_reconcile": self.last_reconcile}
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_file_index: Optional[FileIndex] = None
+_file_index_lock = threading.Lock()
+
+
+def get_file_index() -> Optional[FileIndex]:
+    """Return the process-wide file index, or None when it is disabled"""
+    global _file_index
+    if not settings.FILE_INDEX_ENABLED:
+        return None
+    if _file_index is None:
+        with _file_index_lock:
+            if _file_index is None:
+                _file_index = FileIndex(settings.FILE_INDEX_PATH)
+    return _file_index
+
+
+def close_file_index() -> None:
+    global _file_index
+    with _file_index_lock:
+        if _file_index is not None:
+            _file_index.close()
+            _file_index = None
+
+
+async def run_reconcile_loop(interval_seconds: float) -> None:
+    """Reconcile the index with the bucket every interval (runs as a lifespan task)"""
+    while True:
+        try:
+            index = get_file_index()
+            if index is not None:
+                await index.reconcile(get_storage_client())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"File index reconcile failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(interval_seconds)
@@ -1,7 +1,11 @@
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple
 from datetime import datetime
 import logging
+from requests.adapters import HTTPAdapter
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
 from google.cloud import storage
+from google.oauth2 import service_account
 from google.cloud.exceptions import NotFound
 from app.config import settings
 from app.storage.storage_client import StorageClient
@@ -9,22 +13,55 @@ from app.storage.storage_client import StorageClient
 logger = logging.getLogger(__name__)
 
 class GCSClient(StorageClient):
+    backend_name = "gcs"
+    
     def __init__(self):
+        self.max_concurrency = settings.GCS_MAX_CONCURRENCY
         if settings.GOOGLE_APPLICATION_CREDENTIALS:
-            self.client = storage.Client.from_service_account_json(
-                settings.GOOGLE_APPLICATION_CREDENTIALS
+            credentials = service_account.Credentials.from_service_account_file(
+                settings.GOOGLE_APPLICATION_CREDENTIALS,
+                scopes=storage.Client.SCOPE
             )
+            project = credentials.project_id
         else:
             # Try default credentials
-            self.client = storage.Client()
+            credentials, project = google.auth.default(scopes=storage.Client.SCOPE)
+        # Size the requests pool to match our call concurrency; the session is
+        # handed to the client through its constructor
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(
+            pool_connections=settings.GCS_MAX_POOL_CONNECTIONS,
+            pool_maxsize=settings.GCS_MAX_POOL_CONNECTIONS
+        )
+        session.mount("https://", adapter)
+        client_kwargs: Dict[str, Any] = {"credentials": credentials, "_http": session}
+        if project:
+            # Otherwise the client infers the project from the environment
+            client_kwargs["project"] = project
+        self.client = storage.Client(**client_kwargs)
         self.bucket_name = settings.GCS_BUCKET_NAME
         self.bucket = self.client.bucket(self.bucket_name)
     
-    async def upload_file(self, file_name: str, content: bytes) -> bool:
+    def close(self) -> None:
+        """Close the authorized HTTP session"""
+        self.client.close()
+    
+    async def upload_file(
+        self,
+        file_name: str,
+        content: bytes,
+        content_type: str = "application/json",
+        content_encoding: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> bool:
         """Upload a file to GCS bucket"""
         try:
             blob = self.bucket.blob(file_name)
-            blob.upload_from_string(content, content_type="application/json")
+            if content_encoding:
+                blob.content_encoding = content_encoding
+            if metadata:
+                blob.metadata = metadata
+            await self._run_blocking(blob.upload_from_string, content, content_type=content_type)
             return True
         except Exception as e:
             logger.error(f"Failed to upload file '{file_name}' to GCS bucket '{self.bucket_name}': {str(e)}", exc_info=True)
@@ -33,30 +70,130 @@ class GCSClient(StorageClient):
     async def list_files(self) -> List[Dict]:
         """List all files in the bucket"""
         try:
-            blobs = self.bucket.list_blobs()
+            def list_all() -> List[Dict]:
+                # Iterating the listing issues paged HTTP calls, so walk it in the worker thread
+                files = []
+                for blob in self.bucket.list_blobs():
+                    files.append({
+                        "name": blob.name,
+                        "size": blob.size,
+                        "created_at": blob.time_created.isoformat() if blob.time_created else None,
+                        "metadata": blob.metadata or {}
+                    })
+                return files
+            
+            return await self._run_blocking(list_all)
+        except Exception as e:
+            logger.error(f"Failed to list files from GCS bucket '{self.bucket_name}': {str(e)}", exc_info=True)
+            return []
+    
+    async def _list_batch(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        max_keys: int
+    ) -> Tuple[List[Dict], bool]:
+        """One bounded list_blobs call starting after the cursor key"""
+        def list_page() -> List[Dict]:
+            # One extra entry tells whether more remain. start_offset is
+            # inclusive, so a cursor key may come back too: ask for one more
+            # and drop it
+            blobs = self.client.list_blobs(
+                self.bucket_name,
+                prefix=prefix or None,
+                start_offset=start_after,
+                max_results=max_keys + 2 if start_after else max_keys + 1
+            )
             files = []
             for blob in blobs:
+                if blob.name == start_after:
+                    continue
                 files.append({
                     "name": blob.name,
                     "size": blob.size,
-                    "created_at": blob.time_created.isoformat() if blob.time_created else None
+                    "created_at": blob.time_created.isoformat() if blob.time_created else None,
+                    "metadata": blob.metadata or {}
                 })
             return files
-        except Exception as e:
-            logger.error(f"Failed to list files from GCS bucket '{self.bucket_name}': {str(e)}", exc_info=True)
-            return []
+        
+        files = await self._run_blocking(list_page)
+        return files[:max_keys], len(files) > max_keys
     
     async def get_file_content(self, file_name: str) -> Optional[bytes]:
         """Get file content from GCS bucket"""
         try:
-            blob = self.bucket.blob(file_name)
-            if not blob.exists():
-                return None
-            return blob.download_as_bytes()
+            def download() -> Optional[bytes]:
+                blob = self.bucket.blob(file_name)
+                if not blob.exists():
+                    return None
+                # raw_download returns the stored bytes without gzip transcoding
+                return blob.download_as_bytes(raw_download=True)
+            
+            return await self._run_blocking(download)
         except NotFound:
             logger.info(f"File '{file_name}' not found in GCS bucket '{self.bucket_name}'")
             return None
         except Exception as e:
             logger.error(f"Failed to get file '{file_name}' from GCS bucket '{self.bucket_name}': {str(e)}", exc_info=True)
             return None
-
+    
+    async def get_file_content_with_validator(self, file_name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """Download the blob; the generation comes from the same response"""
+        def download() -> Tuple[bytes, Optional[str]]:
+            blob = self.bucket.blob(file_name)
+            content = blob.download_as_bytes(raw_download=True)
+            return content, str(blob.generation) if blob.generation is not None else blob.etag
+        
+        try:
+            return await self._run_blocking(download)
+        except NotFound:
+            logger.info(f"File '{file_name}' not found in GCS bucket '{self.bucket_name}'")
+            return None, None
+        except Exception as e:
+            logger.error(f"Failed to get file '{file_name}' from GCS bucket '{self.bucket_name}': {str(e)}", exc_info=True)
+            return None, None
+    
+    async def head_file(self, file_name: str) -> Optional[Dict[str, Any]]:
+        """Fetch blob metadata; None if it does not exist"""
+        blob = await self._run_blocking(self.bucket.get_blob, file_name)
+        if blob is None:
+            return None
+        return {
+            "name": file_name,
+            "size": blob.size,
+            "etag": blob.etag,
+            "content_type": blob.content_type,
+            "content_encoding": blob.content_encoding,
+            "last_modified": blob.updated,
+            "metadata": blob.metadata or {},
+            "generation": blob.generation
+        }
+    
+    async def iter_file_content(
+        self,
+        file_name: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Stream the blob as a series of ranged raw downloads"""
+        if end is None:
+            head = await self.head_file(file_name)
+            if head is None:
+                return
+            end = head["size"] - 1
+        blob = self.bucket.blob(file_name)
+        offset = start
+        while offset <= end:
+            chunk_end = min(offset + chunk_size - 1, end)
+            # raw_download keeps gzip-encoded objects as stored
+            chunk = await self._run_blocking(
+                blob.download_as_bytes,
+                start=offset,
+                end=chunk_end,
+                raw_download=True
+            )
+            if not chunk:
+                break
+            yield chunk
+            offset += len(chunk)
@@ -0,0 +1,120 @@
+import time
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple, TypeVar
+
+from app.storage.storage_client import StorageClient
+from app.utils.metrics import STORAGE_BYTES, STORAGE_DURATION, STORAGE_IN_FLIGHT, STORAGE_OPERATIONS
+
+T = TypeVar("T")
+
+
+def _outcome(result: Any) -> str:
+    # Backends report failures as False (uploads) and missing objects as None
+    # ((None, None) from get_file_content_with_validator)
+    if result is None or result == (None, None):
+        return "not_found"
+    if result is False:
+        return "error"
+    return "ok"
+
+
+class InstrumentedStorageClient(StorageClient):
+    """
+    Records latency, outcome, bytes and in-flight calls for every
+    StorageClient method of the wrapped backend.
+    """
+
+    def __init__(self, backend: StorageClient):
+        self.backend = backend
+        self.backend_name = backend.backend_name
+
+    async def _observe(self, operation: str, call: Awaitable[T]) -> T:
+        in_flight = STORAGE_IN_FLIGHT.labels(self.backend_name, operation)
+        in_flight.inc()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await call
+            outcome = _outcome(result)
+            return result
+        finally:
+            in_flight.dec()
+            STORAGE_DURATION.labels(self.backend_name, operation).observe(time.perf_counter() - started)
+            STORAGE_OPERATIONS.labels(self.backend_name, operation, outcome).inc()
+
+    async def upload_file(
+        self,
+        file_name: str,
+        content: bytes,
+        content_type: str = "application/json",
+        content_encoding: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> bool:
+        success = await self._observe(
+            "upload_file",
+            self.backend.upload_file(file_name, content, content_type, content_encoding, metadata)
+        )
+        if success:
+            STORAGE_BYTES.labels(self.backend_name, "upload").inc(len(content))
+        return success
+
+    async def list_files(self) -> List[Dict]:
+        return await self._observe("list_files", self.backend.list_files())
+
+    async def _list_batch(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        max_keys: int
+    ) -> Tuple[List[Dict], bool]:
+        return await self._observe("list_batch", self.backend._list_batch(prefix, start_after, max_keys))
+
+    async def get_file_content(self, file_name: str) -> Optional[bytes]:
+        content = await self._observe("get_file_content", self.backend.get_file_content(file_name))
+        if content is not None:
+            STORAGE_BYTES.labels(self.backend_name, "download").inc(len(content))
+        return content
+
+    async def get_file_content_with_validator(self, file_name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        content, validator = await self._observe(
+            "get_file_content",
+            self.backend.get_file_content_with_validator(file_name)
+        )
+        if content is not None:
+            STORAGE_BYTES.labels(self.backend_name, "download").inc(len(content))
+        return content, validator
+
+    async def head_file(self, file_name: str) -> Optional[Dict[str, Any]]:
+        return await self._observe("head_file", self.backend.head_file(file_name))
+
+    async def iter_file_content(
+        self,
+        file_name: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Stream from the backend; the duration covers the whole stream"""
+        in_flight = STORAGE_IN_FLIGHT.labels(self.backend_name, "iter_file_content")
+        in_flight.inc()
+        started = time.perf_counter()
+        outcome = "error"
+        sent = 0
+        try:
+            async for chunk in self.backend.iter_file_content(file_name, start, end, chunk_size):
+                sent += len(chunk)
+                yield chunk
+            outcome = "ok"
+        finally:
+            in_flight.dec()
+            STORAGE_DURATION.labels(self.backend_name, "iter_file_content").observe(time.perf_counter() - started)
+            STORAGE_OPERATIONS.labels(self.backend_name, "iter_file_content", outcome).inc()
+            STORAGE_BYTES.labels(self.backend_name, "download").inc(sent)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+    async def flush(self) -> None:
+        await self.backend.flush()
+
+    def close(self) -> None:
+        self.backend.close()
@@ -0,0 +1,321 @@
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.storage.storage_client import StorageClient
+
+logger = logging.getLogger(__name__)
+
+# Per-object metadata (content type, encoding, ETag, user metadata) lives in
+# sidecar files under this hidden directory; dot-entries are never listed
+_META_DIR = ".meta"
+
+
+def _write_atomic(path: str, content: bytes) -> None:
+    """Write to a temp file in the same directory, fsync, then rename over path"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class LocalStorageClient(StorageClient):
+    """
+    StorageClient backed by a local directory.
+
+    Object names map to paths under the root; writes are atomic (temp file +
+    rename), so readers never see a partial object. Ranged reads memory-map
+    the file and copy out only the requested chunks.
+
+    Listings page through a sorted snapshot of the names. Writes and deletes
+    through this client keep it current; a listing that starts from the
+    beginning rebuilds it, so files placed in the directory by other means
+    show up on the next pass.
+    """
+
+    backend_name = "local"
+
+    def __init__(self, directory: Optional[str] = None):
+        self.max_concurrency = settings.LOCAL_MAX_CONCURRENCY
+        self.root = os.path.abspath(directory or settings.LOCAL_STORAGE_DIR)
+        os.makedirs(self.root, exist_ok=True)
+        # Replaced, never mutated in place, so readers can use it without the lock
+        self._sorted_names: Optional[List[str]] = None
+        self._names_lock = threading.Lock()
+
+    def _path(self, file_name: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, file_name))
+        if not path.startswith(self.root + os.sep) or any(part.startswith(".") for part in file_name.split("/")):
+            raise ValueError(f"Invalid object name: {file_name}")
+        return path
+
+    def _meta_path(self, file_name: str) -> str:
+        return os.path.join(self.root, _META_DIR, file_name + ".json")
+
+    def _read_meta(self, file_name: str) -> Dict[str, Any]:
+        try:
+            with open(self._meta_path(file_name), "rb") as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return {}
+
+    def _walk_names(self) -> List[str]:
+        names = []
+        for directory, subdirectories, files in os.walk(self.root):
+            # Skip hidden directories (metadata, temp files) in place
+            subdirectories[:] = [d for d in subdirectories if not d.startswith(".")]
+            relative = os.path.relpath(directory, self.root)
+            for name in files:
+                if name.startswith("."):
+                    continue
+                names.append(name if relative == "." else f"{relative.replace(os.sep, '/')}/{name}")
+        names.sort()
+        return names
+
+    def _names(self, refresh: bool = False) -> List[str]:
+        names = self._sorted_names
+        if names is None or refresh:
+            names = self._walk_names()
+            with self._names_lock:
+                self._sorted_names = names
+        return names
+
+    def _add_name(self, file_name: str) -> None:
+        with self._names_lock:
+            if self._sorted_names is None:
+                return
+            position = bisect.bisect_left(self._sorted_names, file_name)
+            if position < len(self._sorted_names) and self._sorted_names[position] == file_name:
+                return
+            self._sorted_names = self._sorted_names[:position] + [file_name] + self._sorted_names[position:]
+
+    def _remove_name(self, file_name: str) -> None:
+        with self._names_lock:
+            if self._sorted_names is None:
+                return
+            position = bisect.bisect_left(self._sorted_names, file_name)
+            if position < len(self._sorted_names) and self._sorted_names[position] == file_name:
+                self._sorted_names = self._sorted_names[:position] + self._sorted_names[position + 1:]
+
+    def _entry(self, file_name: str) -> Optional[Dict]:
+        try:
+            stat = os.stat(os.path.join(self.root, file_name))
+        except OSError:
+            return None
+        return {
+            "name": file_name,
+            "size": stat.st_size,
+            "created_at": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat(),
+            "metadata": self._read_meta(file_name).get("metadata", {})
+        }
+
+    async def upload_file(
+        self,
+        file_name: str,
+        content: bytes,
+        content_type: str = "application/json",
+        content_encoding: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> bool:
+        """Write a file atomically under the storage directory"""
+        try:
+            path = self._path(file_name)
+            digest = hashlib.md5(content).hexdigest()
+            meta = {
+                "content_type": content_type,
+                "content_encoding": content_encoding,
+                "etag": digest,
+                "md5": digest,
+                "metadata": metadata or {}
+            }
+
+            def write() -> None:
+                _write_atomic(path, content)
+                _write_atomic(self._meta_path(file_name), json.dumps(meta).encode("utf-8"))
+                self._add_name(file_name)
+
+            await self._run_blocking(write)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write file '{file_name}' to '{self.root}': {str(e)}", exc_info=True)
+            return False
+
+    async def list_files(self) -> List[Dict]:
+        """List all files under the storage directory"""
+        try:
+            def list_all() -> List[Dict]:
+                return [entry for entry in map(self._entry, self._names(refresh=True)) if entry is not None]
+
+            return await self._run_blocking(list_all)
+        except Exception as e:
+            logger.error(f"Failed to list files in '{self.root}': {str(e)}", exc_info=True)
+            return []
+
+    async def _list_batch(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        max_keys: int
+    ) -> Tuple[List[Dict], bool]:
+        def list_page() -> Tuple[List[Dict], bool]:
+            names = self._names(refresh=start_after is None)
+            position = bisect.bisect_left(names, prefix)
+            if start_after:
+                position = max(position, bisect.bisect_right(names, start_after))
+            files = []
+            for name in names[position:]:
+                if not name.startswith(prefix) or len(files) == max_keys:
+                    break
+                entry = self._entry(name)
+                if entry is not None:
+                    files.append(entry)
+            more = position + len(files) < len(names) and names[position + len(files)].startswith(prefix)
+            return files, more
+
+        return await self._run_blocking(list_page)
+
+    async def get_file_content(self, file_name: str) -> Optional[bytes]:
+        """Read a file from the storage directory"""
+        try:
+            path = self._path(file_name)
+
+            def read() -> Optional[bytes]:
+                try:
+                    with open(path, "rb") as f:
+                        return f.read()
+                except FileNotFoundError:
+                    return None
+
+            content = await self._run_blocking(read)
+            if content is None:
+                # Debug only: misses are routine when this is the hot tier
+                logger.debug(f"File '{file_name}' not found in '{self.root}'")
+            return content
+        except Exception as e:
+            logger.error(f"Failed to read file '{file_name}' from '{self.root}': {str(e)}", exc_info=True)
+            return None
+
+    async def get_file_content_with_validator(self, file_name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """Read a file; the validator is derived from the bytes and the stat of the same open file"""
+        try:
+            path = self._path(file_name)
+
+            def read() -> Tuple[Optional[bytes], Optional[str]]:
+                try:
+                    with open(path, "rb") as f:
+                        stat = os.fstat(f.fileno())
+                        content = f.read()
+                except FileNotFoundError:
+                    return None, None
+                meta = self._read_meta(file_name)
+                if not meta:
+                    return content, f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+                digest = hashlib.md5(content).hexdigest()
+                if meta.get("md5", meta.get("etag")) != digest:
+                    # The sidecar describes another version (a write in progress)
+                    return content, digest
+                # Same validator head_file reports for these bytes
+                generation = meta.get("generation")
+                return content, str(generation) if generation is not None else meta["etag"]
+
+            return await self._run_blocking(read)
+        except Exception as e:
+            logger.error(f"Failed to read file '{file_name}' from '{self.root}': {str(e)}", exc_info=True)
+            return None, None
+
+    async def head_file(self, file_name: str) -> Optional[Dict[str, Any]]:
+        def head() -> Optional[Dict[str, Any]]:
+            try:
+                stat = os.stat(self._path(file_name))
+            except (OSError, ValueError):
+                return None
+            meta = self._read_meta(file_name)
+            return {
+                "name": file_name,
+                "size": stat.st_size,
+                "etag": meta.get("etag") or f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+                "content_type": meta.get("content_type"),
+                "content_encoding": meta.get("content_encoding"),
+                "last_modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                "metadata": meta.get("metadata", {}),
+                "generation": meta.get("generation")
+            }
+
+        return await self._run_blocking(head)
+
+    async def record_remote_validator(self, file_name: str, md5: str, etag: str, generation: Optional[Any] = None) -> bool:
+        """
+        Report a remote copy's ETag (and GCS generation) for this file from
+        now on, provided the local bytes are still the ones with this MD5.
+
+        Used by the hot tier, so a file keeps one validator whether it is
+        served locally or, after eviction, from the remote.
+        """
+        def record() -> bool:
+            meta = self._read_meta(file_name)
+            if not meta or meta.get("md5", meta.get("etag")) != md5:
+                return False
+            meta.update({"etag": etag, "md5": md5})
+            if generation is not None:
+                meta["generation"] = generation
+            _write_atomic(self._meta_path(file_name), json.dumps(meta).encode("utf-8"))
+            return True
+
+        return await self._run_blocking(record)
+
+    async def iter_file_content(
+        self,
+        file_name: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Map the file and copy out one chunk at a time in the worker pool"""
+        def open_mapped() -> Optional[mmap.mmap]:
+            try:
+                with open(self._path(file_name), "rb") as f:
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # ValueError: empty files cannot be mapped
+                return None
+
+        mapped = await self._run_blocking(open_mapped)
+        if mapped is None:
+            return
+        try:
+            stop = len(mapped) if end is None else min(end + 1, len(mapped))
+            for offset in range(start, stop, chunk_size):
+                yield await self._run_blocking(mapped.__getitem__, slice(offset, min(offset + chunk_size, stop)))
+        finally:
+            mapped.close()
+
+    async def delete_file(self, file_name: str) -> None:
+        """Remove a file and its metadata (used by the hot tier to evict)"""
+        def delete() -> None:
+            for path in (self._path(file_name), self._meta_path(file_name)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._remove_name(file_name)
+
+        await self._run_blocking(delete)
@@ -1,7 +1,8 @@
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple
 from datetime import datetime
 import boto3
 import logging
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from app.config import settings
 from app.storage.storage_client import StorageClient
@@ -9,24 +10,44 @@ from app.storage.storage_client import StorageClient
 logger = logging.getLogger(__name__)
 
 class S3Client(StorageClient):
+    backend_name = "s3"
+    
     def __init__(self):
+        self.max_concurrency = settings.S3_MAX_CONCURRENCY
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
+            region_name=settings.AWS_REGION,
+            config=Config(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS)
         )
         self.bucket_name = settings.S3_BUCKET_NAME
     
-    async def upload_file(self, file_name: str, content: bytes) -> bool:
+    def close(self) -> None:
+        """Close the boto3 connection pool"""
+        self.s3_client.close()
+    
+    async def upload_file(
+        self,
+        file_name: str,
+        content: bytes,
+        content_type: str = "application/json",
+        content_encoding: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> bool:
         """Upload a file to S3 bucket"""
         try:
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=file_name,
-                Body=content,
-                ContentType="application/json"
-            )
+            params = {
+                "Bucket": self.bucket_name,
+                "Key": file_name,
+                "Body": content,
+                "ContentType": content_type
+            }
+            if content_encoding:
+                params["ContentEncoding"] = content_encoding
+            if metadata:
+                params["Metadata"] = metadata
+            await self._run_blocking(self.s3_client.put_object, **params)
             return True
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', 'Unknown')
@@ -37,18 +58,9 @@ class S3Client(StorageClient):
             return False
     
     async def list_files(self) -> List[Dict]:
-        """List all files in the bucket"""
+        """List all files in the bucket, following continuation past 1000 keys"""
         try:
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket_name)
-            files = []
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    files.append({
-                        "name": obj['Key'],
-                        "size": obj['Size'],
-                        "created_at": obj['LastModified'].isoformat() if 'LastModified' in obj else None
-                    })
-            return files
+            return [entry async for entry in self.iter_files()]
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', 'Unknown')
             logger.error(f"Failed to list files from S3 bucket '{self.bucket_name}': {error_code} - {str(e)}")
@@ -57,14 +69,40 @@ class S3Client(StorageClient):
             logger.error(f"Unexpected error listing files from S3 bucket '{self.bucket_name}': {str(e)}", exc_info=True)
             return []
     
+    async def _list_batch(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        max_keys: int
+    ) -> Tuple[List[Dict], bool]:
+        """One list_objects_v2 page; StartAfter doubles as our pagination cursor"""
+        params = {"Bucket": self.bucket_name, "MaxKeys": max_keys}
+        if prefix:
+            params["Prefix"] = prefix
+        if start_after:
+            params["StartAfter"] = start_after
+        response = await self._run_blocking(self.s3_client.list_objects_v2, **params)
+        files = []
+        for obj in response.get('Contents', []):
+            files.append({
+                "name": obj['Key'],
+                "size": obj['Size'],
+                "created_at": obj['LastModified'].isoformat() if 'LastModified' in obj else None
+            })
+        return files, response.get('IsTruncated', False)
+    
     async def get_file_content(self, file_name: str) -> Optional[bytes]:
         """Get file content from S3 bucket"""
         try:
-            response = self.s3_client.get_object(
-                Bucket=self.bucket_name,
-                Key=file_name
-            )
-            return response['Body'].read()
+            def download() -> bytes:
+                # Streaming body reads block too, so read inside the worker thread
+                response = self.s3_client.get_object(
+                    Bucket=self.bucket_name,
+                    Key=file_name
+                )
+                return response['Body'].read()
+            
+            return await self._run_blocking(download)
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', 'Unknown')
             if error_code == 'NoSuchKey':
@@ -75,4 +113,70 @@ class S3Client(StorageClient):
         except Exception as e:
             logger.error(f"Unexpected error getting file '{file_name}' from S3: {str(e)}", exc_info=True)
             return None
-
+    
+    async def get_file_content_with_validator(self, file_name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """GetObject; the ETag comes from the same response"""
+        try:
+            def download() -> Tuple[bytes, Optional[str]]:
+                response = self.s3_client.get_object(
+                    Bucket=self.bucket_name,
+                    Key=file_name
+                )
+                return response['Body'].read(), response.get('ETag', '').strip('"') or None
+            
+            return await self._run_blocking(download)
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+            if error_code == 'NoSuchKey':
+                logger.info(f"File '{file_name}' not found in S3 bucket '{self.bucket_name}'")
+                return None, None
+            logger.error(f"Failed to get file '{file_name}' from S3 bucket '{self.bucket_name}': {error_code} - {str(e)}")
+            return None, None
+        except Exception as e:
+            logger.error(f"Unexpected error getting file '{file_name}' from S3: {str(e)}", exc_info=True)
+            return None, None
+    
+    async def head_file(self, file_name: str) -> Optional[Dict[str, Any]]:
+        """HEAD the object; None if it does not exist"""
+        try:
+            response = await self._run_blocking(
+                self.s3_client.head_object,
+                Bucket=self.bucket_name,
+                Key=file_name
+            )
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+            if error_code in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {
+            "name": file_name,
+            "size": response['ContentLength'],
+            "etag": response.get('ETag', '').strip('"'),
+            "content_type": response.get('ContentType'),
+            "content_encoding": response.get('ContentEncoding'),
+            "last_modified": response.get('LastModified'),
+            "metadata": response.get('Metadata', {})
+        }
+    
+    async def iter_file_content(
+        self,
+        file_name: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Ranged GetObject, reading the body stream chunk by chunk in the worker pool"""
+        params = {"Bucket": self.bucket_name, "Key": file_name}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end}"
+        response = await self._run_blocking(self.s3_client.get_object, **params)
+        body = response['Body']
+        try:
+            while True:
+                chunk = await self._run_blocking(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
@@ -0,0 +1,184 @@
+import gzip
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+from datetime import date, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Storage formats for weather objects. The format is recorded in object
+# metadata on write, but reads identify it from the content itself so
+# objects written before this layer existed (plain .json) stay readable.
+FORMAT_JSON = "json"
+FORMAT_JSON_GZIP = "json-gzip"
+FORMAT_JSON_ZSTD = "json-zstd"
+FORMAT_COLUMNAR = "columnar"
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.weather.columnar"
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_COLUMNAR_MAGIC = b"WXC1"
+
+
+class StorageFormat(NamedTuple):
+    name: str
+    extension: str
+    content_type: str
+    content_encoding: Optional[str]
+
+
+FORMATS: Dict[str, StorageFormat] = {
+    FORMAT_JSON: StorageFormat(FORMAT_JSON, ".json", "application/json", None),
+    FORMAT_JSON_GZIP: StorageFormat(FORMAT_JSON_GZIP, ".json.gz", "application/json", "gzip"),
+    FORMAT_JSON_ZSTD: StorageFormat(FORMAT_JSON_ZSTD, ".json.zst", "application/json", "zstd"),
+    FORMAT_COLUMNAR: StorageFormat(FORMAT_COLUMNAR, ".wxcol", COLUMNAR_MEDIA_TYPE, None),
+}
+
+
+def get_format(name: str) -> StorageFormat:
+    if name not in FORMATS:
+        raise ValueError(f"Unsupported storage format: {name}. Use one of: {', '.join(FORMATS)}")
+    return FORMATS[name]
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("The json-zstd format requires the 'zstandard' package")
+    return zstandard
+
+
+def detect_format(content: bytes) -> str:
+    """Identify the storage format of an object from its leading bytes"""
+    if content.startswith(_GZIP_MAGIC):
+        return FORMAT_JSON_GZIP
+    if content.startswith(_ZSTD_MAGIC):
+        return FORMAT_JSON_ZSTD
+    if content.startswith(_COLUMNAR_MAGIC):
+        return FORMAT_COLUMNAR
+    return FORMAT_JSON
+
+
+def _compact_json(data: Dict[str, Any]) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def serialize(data: Dict[str, Any], format_name: str) -> bytes:
+    """Encode weather data in the given storage format"""
+    get_format(format_name)
+    if format_name == FORMAT_JSON:
+        return _compact_json(data)
+    if format_name == FORMAT_JSON_GZIP:
+        # mtime=0 keeps output deterministic for identical payloads
+        return gzip.compress(_compact_json(data), compresslevel=6, mtime=0)
+    if format_name == FORMAT_JSON_ZSTD:
+        return _zstd().ZstdCompressor(level=10).compress(_compact_json(data))
+    return _encode_columnar(data)
+
+
+def to_json_bytes(content: bytes) -> bytes:
+    """Return the JSON document for a stored object without re-encoding plain JSON"""
+    format_name = detect_format(content)
+    if format_name == FORMAT_JSON:
+        return content
+    if format_name == FORMAT_JSON_GZIP:
+        return gzip.decompress(content)
+    if format_name == FORMAT_JSON_ZSTD:
+        return _zstd().ZstdDecompressor().decompress(content, max_output_size=256 * 1024 * 1024)
+    return _compact_json(_decode_columnar(content))
+
+
+def stream_decompressor(content_encoding: str):
+    """Incremental decoder (decompress/flush) for a stored content encoding"""
+    if content_encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if content_encoding == "zstd":
+        return _zstd().ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unsupported content encoding: {content_encoding}")
+
+
+def deserialize(content: bytes) -> Dict[str, Any]:
+    """Decode a stored object in any supported format back to weather data"""
+    if detect_format(content) == FORMAT_COLUMNAR:
+        return _decode_columnar(content)
+    return json.loads(to_json_bytes(content).decode("utf-8"))
+
+
+# Columnar layout:
+#   b"WXC1" | uint32 LE header length | header JSON | float64 LE column data
+# The header holds every non-daily field plus a description of each daily
+# column. Numeric columns are packed as float64 with NaN standing in for
+# null; a consecutive daily "time" column is stored as start + count.
+
+def _is_numeric_column(values: List[Any]) -> bool:
+    return all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in values)
+
+
+def _consecutive_days(values: List[Any]) -> Optional[Dict[str, Any]]:
+    try:
+        start = date.fromisoformat(values[0])
+        if all(values[i] == (start + timedelta(days=i)).isoformat() for i in range(len(values))):
+            return {"start": values[0], "count": len(values)}
+    except (TypeError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _encode_columnar(data: Dict[str, Any]) -> bytes:
+    meta = {key: value for key, value in data.items() if key != "daily"}
+    columns = []
+    blobs = []
+    offset = 0
+    for name, values in (data.get("daily") or {}).items():
+        days = _consecutive_days(values) if name == "time" else None
+        if days is not None:
+            columns.append({"name": name, "days": days})
+        elif isinstance(values, list) and _is_numeric_column(values):
+            packed = array("d", (math.nan if v is None else float(v) for v in values))
+            if sys.byteorder != "little":
+                packed.byteswap()
+            blob = packed.tobytes()
+            columns.append({"name": name, "offset": offset, "length": len(values)})
+            blobs.append(blob)
+            offset += len(blob)
+        else:
+            columns.append({"name": name, "values": values})
+    header = json.dumps({"meta": meta, "daily": columns}, separators=(",", ":")).encode("utf-8")
+    return b"".join([_COLUMNAR_MAGIC, struct.pack("<I", len(header)), header, *blobs])
+
+
+def columnar_parts(content: bytes) -> Tuple[Dict[str, Any], memoryview]:
+    """
+    Split a columnar object into its header and float64 column body.
+
+    Numeric columns live at body[offset:offset + length * 8] as little-endian
+    float64, so readers can map them without building Python lists.
+    """
+    (header_length,) = struct.unpack_from("<I", content, len(_COLUMNAR_MAGIC))
+    body_start = len(_COLUMNAR_MAGIC) + 4 + header_length
+    header = json.loads(content[len(_COLUMNAR_MAGIC) + 4:body_start].decode("utf-8"))
+    return header, memoryview(content)[body_start:]
+
+
+def _decode_columnar(content: bytes) -> Dict[str, Any]:
+    header, body = columnar_parts(content)
+    daily: Dict[str, Any] = {}
+    for column in header["daily"]:
+        if "days" in column:
+            start = date.fromisoformat(column["days"]["start"])
+            daily[column["name"]] = [(start + timedelta(days=i)).isoformat() for i in range(column["days"]["count"])]
+        elif "values" in column:
+            daily[column["name"]] = column["values"]
+        else:
+            packed = array("d")
+            packed.frombytes(body[column["offset"]:column["offset"] + column["length"] * 8])
+            if sys.byteorder != "little":
+                packed.byteswap()
+            daily[column["name"]] = [None if math.isnan(v) else v for v in packed]
+    data = dict(header["meta"])
+    data["daily"] = daily
+    return data
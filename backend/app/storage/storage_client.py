@@ -1,11 +1,103 @@
+import asyncio
+import base64
+import binascii
+import functools
+import hashlib
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional, Tuple, TypeVar
+from datetime import datetime, timezone
 from app.config import settings
+from app.storage.executor import get_storage_executor
+from app.storage.serialization import FORMATS, detect_format
+from app.utils.metrics import STORAGE_POOL_WAIT
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+def encode_cursor(key: str) -> str:
+    """Opaque pagination cursor: the last key already returned"""
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid pagination cursor")
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+def _created_in_range(entry: Dict, created_after: Optional[datetime], created_before: Optional[datetime]) -> bool:
+    if created_after is None and created_before is None:
+        return True
+    if not entry.get("created_at"):
+        return False
+    created = _as_utc(datetime.fromisoformat(entry["created_at"]))
+    if created_after is not None and created < _as_utc(created_after):
+        return False
+    if created_before is not None and created >= _as_utc(created_before):
+        return False
+    return True
+
+# Objects the app keeps for itself (grid month tiles, see weather_tiles).
+# Listings skip them unless the prefix asks for them explicitly
+TILE_PREFIX = "tiles/"
+HIDDEN_PREFIXES = (TILE_PREFIX,)
+
+def is_hidden_object(name: str) -> bool:
+    return name.startswith(HIDDEN_PREFIXES)
+
+def _skip_hidden(name: str, prefix: str) -> Optional[str]:
+    """For a hidden object outside the listed prefix, the key to resume the listing after"""
+    for hidden in HIDDEN_PREFIXES:
+        if name.startswith(hidden) and not prefix.startswith(hidden):
+            # Jump past the whole hidden range instead of paging through it
+            return hidden + "\U0010ffff"
+    return None
 
 class StorageClient(ABC):
+    # Max blocking SDK calls this backend may run at once; subclasses set
+    # it from settings in __init__, so later overrides are honoured
+    max_concurrency: int = 8
+    
+    # Label used for this backend in metrics
+    backend_name: str = "storage"
+    
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; rebuild if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+    
+    async def _run_blocking(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking SDK call in the storage thread pool without stalling the event loop"""
+        queued = time.perf_counter()
+        async with self._get_semaphore():
+            STORAGE_POOL_WAIT.labels(self.backend_name).observe(time.perf_counter() - queued)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                get_storage_executor(),
+                functools.partial(func, *args, **kwargs)
+            )
+    
     @abstractmethod
-    async def upload_file(self, file_name: str, content: bytes) -> bool:
+    async def upload_file(
+        self,
+        file_name: str,
+        content: bytes,
+        content_type: str = "application/json",
+        content_encoding: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> bool:
         pass
     
     @abstractmethod
@@ -15,16 +107,244 @@ class StorageClient(ABC):
     @abstractmethod
     async def get_file_content(self, file_name: str) -> Optional[bytes]:
         pass
+    
+    async def head_file(self, file_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Return object metadata without the body, or None if it does not exist.
+        
+        Keys: name, size, etag, content_type, content_encoding, last_modified,
+        metadata. Backends override this with a native HEAD; the default
+        reads the object and derives the ETag and encoding from its bytes.
+        """
+        content = await self.get_file_content(file_name)
+        if content is None:
+            return None
+        stored_format = FORMATS[detect_format(content)]
+        return {
+            "name": file_name,
+            "size": len(content),
+            "etag": hashlib.md5(content).hexdigest(),
+            "content_type": stored_format.content_type,
+            "content_encoding": stored_format.content_encoding,
+            "last_modified": None,
+            "metadata": {}
+        }
+    
+    async def get_file_content_with_validator(self, file_name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Return (content, validator) from a single read; (None, None) if the
+        object does not exist.
+        
+        The validator identifies the bytes returned, as head_file would
+        report it: the GCS generation, else the ETag. Backends override this
+        to take it from the download response; the default derives the MD5
+        ETag from the bytes, like the default head_file.
+        """
+        content = await self.get_file_content(file_name)
+        if content is None:
+            return None, None
+        return content, hashlib.md5(content).hexdigest()
+    
+    async def iter_file_content(
+        self,
+        file_name: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream the stored bytes of an object from start to end (inclusive).
+        
+        Bytes are yielded as stored, with no decoding. Backends override this
+        with a ranged streaming read; the default slices get_file_content().
+        """
+        content = await self.get_file_content(file_name)
+        if content is None:
+            return
+        stop = len(content) if end is None else min(end + 1, len(content))
+        for offset in range(start, stop, chunk_size):
+            yield content[offset:min(offset + chunk_size, stop)]
+    
+    async def _list_batch(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        max_keys: int
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Return up to max_keys entries whose names start with prefix and sort
+        after start_after, in lexicographic order, plus whether more remain.
+        Entries carry the object's user metadata as "metadata" when the
+        backend listing returns it (GCS, local), so callers need no HEAD.
+        
+        Backends override this with a native paged listing; the default
+        falls back to a full list_files() call. list_files() reports errors
+        as an empty list, which FileIndex.reconcile never sweeps on.
+        """
+        files = sorted(
+            (f for f in await self.list_files()
+             if f["name"].startswith(prefix) and (start_after is None or f["name"] > start_after)),
+            key=lambda f: f["name"]
+        )
+        return files[:max_keys], len(files) > max_keys
+    
+    async def iter_files(
+        self,
+        prefix: str = "",
+        start_after: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[Dict]:
+        """Stream matching entries one backend page at a time, skipping hidden objects"""
+        while True:
+            batch, truncated = await self._list_batch(prefix, start_after, batch_size)
+            skip_to = None
+            for entry in batch:
+                skip_to = _skip_hidden(entry["name"], prefix)
+                if skip_to is not None:
+                    break
+                if _created_in_range(entry, created_after, created_before):
+                    yield entry
+            if skip_to is not None:
+                start_after = skip_to
+                continue
+            if not truncated or not batch:
+                return
+            start_after = batch[-1]["name"]
+    
+    async def list_files_page(
+        self,
+        prefix: str = "",
+        page_size: int = 100,
+        cursor: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Return one page of matching entries and a cursor for the next page.
+        
+        Prefix filtering runs in the backend listing call; date filters are
+        applied to each backend page as it arrives, so the page is filled
+        without materializing the bucket. Hidden objects (tiles/) are skipped
+        unless the prefix is inside their range.
+        """
+        start_after = decode_cursor(cursor) if cursor else None
+        files: List[Dict] = []
+        while True:
+            batch, truncated = await self._list_batch(prefix, start_after, page_size)
+            skip_to = None
+            for entry in batch:
+                skip_to = _skip_hidden(entry["name"], prefix)
+                if skip_to is not None:
+                    start_after = skip_to
+                    break
+                start_after = entry["name"]
+                if _created_in_range(entry, created_after, created_before):
+                    files.append(entry)
+                    if len(files) == page_size:
+                        more = truncated or entry is not batch[-1]
+                        return {"files": files, "next_cursor": encode_cursor(start_after) if more else None}
+            if skip_to is not None:
+                continue
+            if not truncated or not batch:
+                return {"files": files, "next_cursor": None}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+    
+    async def flush(self) -> None:
+        """Wait for buffered writes to reach the backend; write-behind layers override"""
+        pass
+    
+    def close(self) -> None:
+        """Release SDK connections; backends override when they hold a pool"""
+        pass
 
-def get_storage_client() -> StorageClient:
-    """Factory function to get the appropriate storage client"""
+_clients: Dict[str, StorageClient] = {}
+_clients_lock = threading.Lock()
+
+def _create_storage_client(storage_type: str) -> StorageClient:
     # Import here to avoid circular import
-    if settings.STORAGE_TYPE.lower() == "gcs":
+    if storage_type == "gcs":
         from app.storage.gcs_client import GCSClient
         return GCSClient()
-    elif settings.STORAGE_TYPE.lower() == "s3":
+    elif storage_type == "s3":
         from app.storage.s3_client import S3Client
         return S3Client()
+    elif storage_type == "local":
+        from app.storage.local_client import LocalStorageClient
+        return LocalStorageClient()
     else:
         raise ValueError(f"Unsupported storage type: {settings.STORAGE_TYPE}")
 
+def get_storage_client() -> StorageClient:
+    """
+    Return the process-wide client for the configured storage type.
+    
+    The client is built on first use and reused afterwards, so credential
+    resolution and connection pools are paid for once per process.
+    """
+    storage_type = settings.STORAGE_TYPE.lower()
+    client = _clients.get(storage_type)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(storage_type)
+            if client is None:
+                client = _wrap_storage_client(_create_storage_client(storage_type))
+                _clients[storage_type] = client
+                logger.info(f"Initialized {storage_type} storage client")
+    return client
+
+def _wrap_storage_client(client: StorageClient) -> StorageClient:
+    # Metrics wrap the backend itself, so cache hits show up as calls avoided
+    if settings.METRICS_ENABLED:
+        from app.storage.instrumented_client import InstrumentedStorageClient
+        client = InstrumentedStorageClient(client)
+    # The hot tier is itself local, so it only sits in front of remote backends.
+    # Serverless instances never run the shutdown flush, so write-behind is off there
+    if settings.STORAGE_HOT_TIER_ENABLED and client.backend_name != "local" and not settings.SERVERLESS_MODE:
+        from app.storage.local_client import LocalStorageClient
+        from app.storage.tiered_client import TieredStorageClient
+        client = TieredStorageClient(LocalStorageClient(settings.STORAGE_HOT_TIER_DIR), client)
+    if settings.FILE_CONTENT_CACHE_ENABLED:
+        from app.storage.cached_client import CachedStorageClient
+        client = CachedStorageClient(client)
+    return client
+
+def set_storage_client(client: StorageClient) -> StorageClient:
+    """
+    Install a client for the configured storage type, with the same metrics,
+    hot tier and cache layers get_storage_client() would add. Used by benchmarks and
+    tools that run the app against a stand-in backend.
+    """
+    storage_type = settings.STORAGE_TYPE.lower()
+    wrapped = _wrap_storage_client(client)
+    with _clients_lock:
+        _clients[storage_type] = wrapped
+    return wrapped
+
+async def flush_storage_clients(timeout: float) -> None:
+    """Give write-behind uploads up to timeout seconds to finish (called before close)"""
+    for storage_type, client in list(_clients.items()):
+        try:
+            await asyncio.wait_for(client.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out flushing {storage_type} storage client; unsynced writes resume on next start")
+        except Exception as e:
+            logger.warning(f"Failed to flush {storage_type} storage client: {str(e)}")
+
+def close_storage_clients() -> None:
+    """Close every cached storage client (called from the app lifespan)"""
+    with _clients_lock:
+        for storage_type, client in _clients.items():
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close {storage_type} storage client: {str(e)}")
+        _clients.clear()
+
+def storage_client_stats() -> Dict[str, Any]:
+    """Statistics of every storage client created so far"""
+    return {storage_type: client.stats() for storage_type, client in _clients.items()}
+
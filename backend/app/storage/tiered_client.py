@@ -0,0 +1,341 @@
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.storage.local_client import LocalStorageClient, _write_atomic
+from app.storage.storage_client import StorageClient
+
+logger = logging.getLogger(__name__)
+
+# Journal of names written locally but not yet uploaded, one marker file per
+# name, so a restart resumes the sync instead of losing writes
+_PENDING_DIR = ".pending"
+
+# Eviction trims the hot tier to this fraction of its budget, so it does not
+# run again on the very next sync
+_EVICT_TO_FRACTION = 0.9
+
+
+class TieredStorageClient(StorageClient):
+    """
+    Local hot tier in front of a remote StorageClient (GCS or S3).
+
+    Uploads are written to the local directory and acknowledged at disk
+    speed; background workers then copy them to the remote (write-behind),
+    retrying with capped exponential backoff. Reads check the local tier
+    first, so recently written files never pay an object-store round trip.
+    Once synced, the local copy reports the remote object's ETag, so
+    conditional requests keep matching after it is evicted.
+    Files not yet synced are merged into listings. Once the hot tier grows
+    past STORAGE_HOT_TIER_MAX_BYTES, the oldest synced files are evicted.
+    """
+
+    def __init__(self, hot: LocalStorageClient, cold: StorageClient):
+        self.hot = hot
+        self.cold = cold
+        self.backend_name = cold.backend_name
+        self.journal_dir = os.path.join(hot.root, _PENDING_DIR)
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self.max_bytes = settings.STORAGE_HOT_TIER_MAX_BYTES
+        self.sync_concurrency = settings.STORAGE_HOT_TIER_SYNC_CONCURRENCY
+        self.retry_max_seconds = settings.STORAGE_HOT_TIER_SYNC_RETRY_MAX_SECONDS
+        # name -> write version; a sync only clears the name if no newer write landed meanwhile
+        self._pending: Dict[str, int] = self._load_journal()
+        self._attempts: Dict[str, int] = {}
+        self._queued: Set[str] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._version = 0
+        self._hot_bytes: Optional[int] = None
+        self._evicting = False
+        self.hot_hits = 0
+        self.cold_reads = 0
+        self.synced = 0
+        self.sync_failures = 0
+        self.evicted = 0
+        if self._pending:
+            logger.info(f"Resuming write-behind sync of {len(self._pending)} file(s) from '{hot.root}'")
+
+    def _marker_path(self, file_name: str) -> str:
+        return os.path.join(self.journal_dir, hashlib.sha1(file_name.encode("utf-8")).hexdigest())
+
+    def _load_journal(self) -> Dict[str, int]:
+        pending = {}
+        for marker in os.listdir(self.journal_dir):
+            if marker.startswith("."):
+                continue
+            try:
+                with open(os.path.join(self.journal_dir, marker), "rb") as f:
+                    pending[f.read().decode("utf-8")] = 0
+            except (OSError, UnicodeError):
+                continue
+        return pending
+
+    def _ensure_workers(self) -> None:
+        # Queues and tasks belong to one event loop; rebuild if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._queued.clear()
+        self._workers = [loop.create_task(self._sync_worker()) for _ in range(self.sync_concurrency)]
+        for file_name in self._pending:
+            self._enqueue(file_name)
+
+    def _enqueue(self, file_name: str) -> None:
+        # The worker uploads whatever is on disk when it runs, so one queued
+        # entry per name covers any number of writes before it
+        if file_name in self._pending and file_name not in self._queued and self._queue is not None:
+            self._queued.add(file_name)
+            self._queue.put_nowait(file_name)
+
+    async def _sync_worker(self) -> None:
+        while True:
+            file_name = await self._queue.get()
+            self._queued.discard(file_name)
+            try:
+                await self._sync(file_name)
+            except Exception as e:
+                logger.error(f"Write-behind sync of '{file_name}' failed: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _sync(self, file_name: str) -> None:
+        version = self._pending.get(file_name)
+        if version is None:
+            return
+        head = await self.hot.head_file(file_name)
+        content = await self.hot.get_file_content(file_name) if head is not None else None
+        if content is None:
+            # The local write never completed (crash between marker and file)
+            await self._forget(file_name, version)
+            return
+
+        try:
+            success = await self.cold.upload_file(
+                file_name,
+                content,
+                head["content_type"] or "application/octet-stream",
+                head["content_encoding"],
+                head["metadata"]
+            )
+        except Exception as e:
+            logger.warning(f"Write-behind upload of '{file_name}' raised: {str(e)}")
+            success = False
+
+        if success:
+            self.synced += 1
+            await self._adopt_cold_validator(file_name, content)
+            await self._forget(file_name, version)
+            await self._evict()
+            return
+
+        self.sync_failures += 1
+        attempts = self._attempts.get(file_name, 0) + 1
+        self._attempts[file_name] = attempts
+        delay = min(2 ** attempts, self.retry_max_seconds)
+        logger.warning(f"Write-behind upload of '{file_name}' failed (attempt {attempts}), retrying in {delay:g}s")
+        asyncio.get_running_loop().call_later(delay, self._enqueue, file_name)
+
+    async def _adopt_cold_validator(self, file_name: str, content: bytes) -> None:
+        """Serve the synced hot copy under the remote ETag, so it does not change on eviction"""
+        try:
+            head = await self.cold.head_file(file_name)
+            if head is not None:
+                # Skipped if a newer local write landed during the sync
+                await self.hot.record_remote_validator(
+                    file_name, hashlib.md5(content).hexdigest(), head["etag"], head.get("generation")
+                )
+        except Exception as e:
+            logger.warning(f"Failed to record the remote validator of '{file_name}': {str(e)}")
+
+    async def _forget(self, file_name: str, version: int) -> None:
+        """Clear the pending entry and marker, unless a newer write arrived meanwhile"""
+        if self._pending.get(file_name) != version:
+            return
+        del self._pending[file_name]
+        self._attempts.pop(file_name, None)
+
+        def remove_marker() -> None:
+            try:
+                os.remove(self._marker_path(file_name))
+            except FileNotFoundError:
+                pass
+
+        await self.hot._run_blocking(remove_marker)
+
+    async def _evict(self) -> None:
+        """Drop the oldest synced files once the hot tier is over budget"""
+        if self._evicting or (self._hot_bytes is not None and self._hot_bytes <= self.max_bytes):
+            return
+        self._evicting = True
+        try:
+            files = await self.hot.list_files()
+            total = sum(f["size"] for f in files)
+            target = int(self.max_bytes * _EVICT_TO_FRACTION) if total > self.max_bytes else total
+            for entry in sorted(files, key=lambda f: f["created_at"]):
+                if total <= target:
+                    break
+                if entry["name"] in self._pending:
+                    continue
+                await self.hot.delete_file(entry["name"])
+                total -= entry["size"]
+                self.evicted += 1
+            self._hot_bytes = total
+        finally:
+            self._evicting = False
+
+    async def upload_file(
+        self,
+        file_name: str,
+        content: bytes,
+        content_type: str = "application/json",
+        content_encoding: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> bool:
+        """Write locally and queue the remote upload; write through if the local write fails"""
+        self._ensure_workers()
+        self._version += 1
+        version = self._version
+        # Mark pending before writing, so eviction never removes an unsynced file
+        self._pending[file_name] = version
+        try:
+            await self.hot._run_blocking(_write_atomic, self._marker_path(file_name), file_name.encode("utf-8"))
+            written = await self.hot.upload_file(file_name, content, content_type, content_encoding, metadata)
+        except Exception as e:
+            logger.warning(f"Hot tier write of '{file_name}' failed: {str(e)}")
+            written = False
+        if not written:
+            await self._forget(file_name, version)
+            return await self.cold.upload_file(file_name, content, content_type, content_encoding, metadata)
+
+        if self._hot_bytes is not None:
+            self._hot_bytes += len(content)
+        self._enqueue(file_name)
+        return True
+
+    async def _pending_entry(self, file_name: str) -> Optional[Dict]:
+        head = await self.hot.head_file(file_name)
+        if head is None:
+            return None
+        return {
+            "name": file_name,
+            "size": head["size"],
+            "created_at": head["last_modified"].isoformat(),
+            "metadata": head["metadata"]
+        }
+
+    async def list_files(self) -> List[Dict]:
+        self._ensure_workers()
+        files = await self.cold.list_files()
+        listed = {f["name"] for f in files}
+        for file_name in sorted(set(self._pending) - listed):
+            entry = await self._pending_entry(file_name)
+            if entry is not None:
+                files.append(entry)
+        return files
+
+    async def _list_batch(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        max_keys: int
+    ) -> Tuple[List[Dict], bool]:
+        """Merge a remote page with unsynced local files that sort into it"""
+        self._ensure_workers()
+        files, truncated = await self.cold._list_batch(prefix, start_after, max_keys)
+        boundary = files[-1]["name"] if truncated and files else None
+        listed = {f["name"] for f in files}
+        pending = sorted(
+            name for name in self._pending
+            if name.startswith(prefix) and name not in listed
+            and (start_after is None or name > start_after)
+            and (boundary is None or name < boundary)
+        )
+        if not pending:
+            return files, truncated
+
+        for file_name in pending[:max_keys]:
+            entry = await self._pending_entry(file_name)
+            if entry is not None:
+                files.append(entry)
+        files.sort(key=lambda f: f["name"])
+        # Anything cut here sorts after the last name returned, so the next page finds it
+        return files[:max_keys], truncated or len(files) > max_keys or len(pending) > max_keys
+
+    async def get_file_content(self, file_name: str) -> Optional[bytes]:
+        self._ensure_workers()
+        content = await self.hot.get_file_content(file_name)
+        if content is not None:
+            self.hot_hits += 1
+            return content
+        self.cold_reads += 1
+        return await self.cold.get_file_content(file_name)
+
+    async def get_file_content_with_validator(self, file_name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        self._ensure_workers()
+        content, validator = await self.hot.get_file_content_with_validator(file_name)
+        if content is not None:
+            self.hot_hits += 1
+            return content, validator
+        self.cold_reads += 1
+        return await self.cold.get_file_content_with_validator(file_name)
+
+    async def head_file(self, file_name: str) -> Optional[Dict[str, Any]]:
+        head = await self.hot.head_file(file_name)
+        if head is not None:
+            return head
+        return await self.cold.head_file(file_name)
+
+    async def iter_file_content(
+        self,
+        file_name: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        self._ensure_workers()
+        if await self.hot.head_file(file_name) is not None:
+            self.hot_hits += 1
+            source = self.hot.iter_file_content(file_name, start, end, chunk_size)
+        else:
+            self.cold_reads += 1
+            source = self.cold.iter_file_content(file_name, start, end, chunk_size)
+        async for chunk in source:
+            yield chunk
+
+    async def flush(self) -> None:
+        """Wait until every queued upload has been attempted"""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.cold.stats(),
+            "hot_tier": {
+                "directory": self.hot.root,
+                "pending": len(self._pending),
+                "queued": len(self._queued),
+                "synced": self.synced,
+                "sync_failures": self.sync_failures,
+                "evicted": self.evicted,
+                "hot_hits": self.hot_hits,
+                "cold_reads": self.cold_reads,
+                "bytes": self._hot_bytes,
+                "max_bytes": self.max_bytes
+            }
+        }
+
+    def close(self) -> None:
+        # Unsynced files stay journaled on disk and resume on the next start
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        self._loop = None
+        self.hot.close()
+        self.cold.close()
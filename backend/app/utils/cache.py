@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ByteLRUCache:
+    """Thread-safe in-memory LRU of bytes values, bounded by total byte size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        # Values larger than the whole budget would just flush everything else
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class DiskCache:
+    """
+    Size-bounded on-disk cache of bytes values that survives restarts.
+
+    Entries are files named by the SHA-256 of their key, written atomically.
+    Eviction is least-recently-used, tracked in memory and seeded from file
+    modification times when the directory is first scanned.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        # Called with the lock held; rebuild the LRU order from disk once
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.startswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, name, stat.st_size))
+        for _, digest, size in sorted(found):
+            self._entries[digest] = size
+            self._size += size
+        self._loaded = True
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            digest, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+
+    def path_for(self, key: str) -> Optional[str]:
+        """Return the file path holding `key`, marking it recently used"""
+        digest = self._digest(key)
+        with self._lock:
+            self._load()
+            if digest not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+        path = self._path(digest)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                size = self._entries.pop(digest, 0)
+                self._size -= size
+            return None
+        return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        digest = self._digest(key)
+        path = self._path(digest)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write disk cache entry in '{self.directory}': {str(e)}")
+            # Don't leave partial temp files behind (e.g. on a full disk)
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return
+        with self._lock:
+            self._load()
+            previous = self._entries.pop(digest, None)
+            if previous is not None:
+                self._size -= previous
+            self._entries[digest] = len(value)
+            self._size += len(value)
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        digest = self._digest(key)
+        with self._lock:
+            size = self._entries.pop(digest, None)
+            if size is None:
+                return
+            self._size -= size
+        try:
+            os.remove(self._path(digest))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
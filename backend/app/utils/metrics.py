@@ -0,0 +1,319 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Sequence, Tuple
+
+# Prometheus text exposition format 0.0.4 (Starlette appends the utf-8 charset)
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Latency buckets in seconds, from cache hits to slow upstream calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Child for one combination of label values (created on first use)"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    @contextmanager
+    def track_in_progress(self, *values: str) -> Iterator[None]:
+        child = self.labels(*values)
+        child.inc()
+        try:
+            yield
+        finally:
+            child.dec()
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    """Metrics rendered by /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        if not metric.labelnames:
+            # Unlabelled metrics are exported from the start, even at zero
+            metric.labels()
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in list(self._metrics.values())) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# HTTP server
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests handled", ["method", "route", "status"])
+HTTP_REQUEST_DURATION = histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"])
+HTTP_RESPONSE_BYTES = counter("http_response_bytes_total", "HTTP response body bytes sent", ["method", "route"])
+HTTP_IN_FLIGHT = gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
+# Open-Meteo upstream
+UPSTREAM_REQUESTS = counter("upstream_requests_total", "Open-Meteo requests by outcome", ["outcome"])
+UPSTREAM_DURATION = histogram("upstream_request_duration_seconds", "Open-Meteo request latency", ["outcome"])
+UPSTREAM_BYTES = counter("upstream_response_bytes_total", "Open-Meteo response body bytes received")
+UPSTREAM_IN_FLIGHT = gauge("upstream_requests_in_flight", "Open-Meteo requests currently in flight")
+UPSTREAM_RETRIES = counter("upstream_retries_total", "Open-Meteo requests retried, by reason", ["reason"])
+UPSTREAM_REJECTED = counter("upstream_rejected_total", "Open-Meteo calls failed fast by the open circuit")
+UPSTREAM_THROTTLE_WAIT = histogram("upstream_throttle_wait_seconds", "Time calls waited for a rate-limit token")
+UPSTREAM_CONCURRENCY_LIMIT = gauge("upstream_concurrency_limit", "Current adaptive limit on concurrent Open-Meteo calls")
+UPSTREAM_CIRCUIT_STATE = gauge("upstream_circuit_state", "Open-Meteo circuit breaker: 0 closed, 1 half-open, 2 open")
+WEATHER_FETCHES = counter("weather_fetches_total", "Weather fetches by archive cache outcome", ["cache"])
+WEATHER_TILES = counter("weather_tiles_total", "Grid month tiles by outcome (hit, fetched or stored)", ["outcome"])
+
+# Storage backends
+STORAGE_OPERATIONS = counter("storage_operations_total", "Storage calls by outcome", ["backend", "operation", "outcome"])
+STORAGE_DURATION = histogram("storage_operation_duration_seconds", "Storage call latency", ["backend", "operation"])
+STORAGE_BYTES = counter("storage_bytes_total", "Bytes moved to or from storage", ["backend", "direction"])
+STORAGE_IN_FLIGHT = gauge("storage_operations_in_flight", "Storage calls currently in flight", ["backend", "operation"])
+STORAGE_POOL_WAIT = histogram(
+    "storage_pool_wait_seconds",
+    "Time blocking SDK calls wait for a concurrency slot",
+    ["backend"]
+)
+
+# Background jobs
+JOBS_FINISHED = counter("jobs_finished_total", "Background job attempts by outcome", ["kind", "outcome"])
+JOB_DURATION = histogram("job_duration_seconds", "Background job run time per attempt", ["kind"])
+JOB_QUEUE_WAIT = histogram("job_queue_wait_seconds", "Time from job submission to its first attempt", ["kind"])
+JOBS_RUNNING = gauge("jobs_running", "Background jobs currently running")
+
+# Idempotent stores
+STORE_DEDUP = counter("store_dedup_total", "Content-addressed uploads by outcome (index, head or uploaded)", ["outcome"])
+IDEMPOTENCY_REPLAYS = counter("idempotency_replays_total", "Store requests answered from a saved Idempotency-Key response")
+
+# Serialization
+SERIALIZATION_DURATION = histogram(
+    "serialization_duration_seconds",
+    "Time spent encoding or decoding stored objects",
+    ["operation", "format"]
+)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request count, latency, response bytes and
+    in-flight requests.
+
+    Requests are labelled by route template ("/api/weather-file-content/{file_name:path}")
+    rather than raw path, so label cardinality stays bounded. Written as plain
+    ASGI rather than BaseHTTPMiddleware to keep per-request overhead small and
+    leave streaming responses untouched.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+        self._route_paths: Dict[Any, str] = {}
+
+    def _route_label(self, scope: Dict[str, Any]) -> str:
+        # The router stores the matched endpoint in the (shared) scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            for route in getattr(scope.get("app"), "routes", []):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            path = self._route_paths[endpoint] = path or "unmatched"
+        return path
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        response = {"status": 500, "bytes": 0}
+        
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+        
+        in_flight = HTTP_IN_FLIGHT.labels()
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            method = scope["method"]
+            route = self._route_label(scope)
+            HTTP_REQUESTS.labels(method, route, response["status"]).inc()
+            HTTP_REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_RESPONSE_BYTES.labels(method, route).inc(response["bytes"])
+
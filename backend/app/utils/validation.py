@@ -1,5 +1,6 @@
 from datetime import datetime, date
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
+from urllib.parse import urlparse
 
 def validate_coordinates(latitude: float, longitude: float) -> Tuple[bool, Optional[str]]:
     """Validate latitude and longitude ranges"""
@@ -9,7 +10,7 @@ def validate_coordinates(latitude: float, longitude: float) -> Tuple[bool, Optio
         return False, "Longitude must be between -180 and 180"
     return True, None
 
-def validate_date_range(start_date: str, end_date: str) -> Tuple[bool, Optional[str]]:
+def validate_date_range(start_date: str, end_date: str, max_days: int = 31) -> Tuple[bool, Optional[str]]:
     """Validate date range format and constraints"""
     try:
         start = datetime.strptime(start_date, "%Y-%m-%d").date()
@@ -25,10 +26,10 @@ def validate_date_range(start_date: str, end_date: str) -> Tuple[bool, Optional[
         if start > end:
             return False, "start_date must be less than or equal to end_date"
         
-        # Check if range is <= 31 days
+        # Check if range is <= max_days (31 unless long-range mode is used)
         days_diff = (end - start).days
-        if days_diff > 31:
-            return False, "Date range must be 31 days or less"
+        if days_diff > max_days:
+            return False, f"Date range must be {max_days} days or less"
         
         return True, None
     except ValueError:
@@ -38,7 +39,8 @@ def validate_weather_request(
     latitude: float, 
     longitude: float, 
     start_date: str, 
-    end_date: str
+    end_date: str,
+    max_days: int = 31
 ) -> Tuple[bool, Optional[str]]:
     """Validate all weather request parameters"""
     # Validate coordinates
@@ -47,9 +49,24 @@ def validate_weather_request(
         return False, coord_error
     
     # Validate dates
-    valid_dates, date_error = validate_date_range(start_date, end_date)
+    valid_dates, date_error = validate_date_range(start_date, end_date, max_days)
     if not valid_dates:
         return False, date_error
     
     return True, None
 
+def validate_callback_url(callback_url: str, allowed_hosts: List[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Validate a job callback URL against the allowed hosts.
+    
+    The worker POSTs to this URL from inside the deployment, so only hosts
+    the operator listed are accepted; an empty list accepts none.
+    """
+    parsed = urlparse(callback_url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return False, "callback_url must be an absolute http or https URL"
+    if not allowed_hosts:
+        return False, "callback_url is not accepted: no callback hosts are configured (JOB_CALLBACK_ALLOWED_HOSTS)"
+    if parsed.hostname.lower() not in allowed_hosts:
+        return False, f"callback_url host '{parsed.hostname}' is not allowed"
+    return True, None
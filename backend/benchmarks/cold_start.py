@@ -0,0 +1,159 @@
+"""
+Cold-start profile: import cost of the serverless entry point.
+
+Each run starts a fresh interpreter with `python -X importtime`, imports the
+entry module and, optionally, serves one request through the Mangum handler,
+as the first invocation of a new serverless instance would. The report gives
+the median import and first-request time and the packages that cost the most.
+
+It fails (exit status 1) when the median import time exceeds --max-ms, or when
+a module listed in --forbid is imported at startup. Heavy dependencies (NumPy,
+the storage SDKs, zstandard) must stay deferred until a request needs them.
+
+Usage (from the backend directory):
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 10 --max-ms 1500 --json cold_start.json
+    python -m benchmarks.cold_start --first-request /health
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_FORBIDDEN = ["numpy", "boto3", "botocore", "google.cloud.storage", "zstandard"]
+
+# Runs in the child interpreter; prints one JSON line of timings on stdout
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+module = __import__({module!r}, fromlist=["_"])
+imported = time.perf_counter()
+first_request_ms = None
+if {path!r}:
+    event = {{
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": {path!r},
+        "rawQueryString": "",
+        "headers": {{"host": "localhost"}},
+        "requestContext": {{"http": {{"method": "GET", "path": {path!r}, "sourceIp": "127.0.0.1"}}}},
+        "isBase64Encoded": False
+    }}
+    response = module.handler(event, None)
+    first_request_ms = (time.perf_counter() - imported) * 1000
+    if response["statusCode"] >= 500:
+        sys.exit(f"First request failed with HTTP {{response['statusCode']}}")
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": first_request_ms,
+    "modules": sorted(sys.modules)
+}}))
+"""
+
+
+def _parse_importtime(stderr: str) -> Dict[str, int]:
+    """Self time in microseconds per module from -X importtime output"""
+    self_us: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        self_us[name.strip()] = int(own)
+    return self_us
+
+
+def run_once(module: str, path: str) -> Dict[str, Any]:
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(module=module, path=path)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(errors[-20:]))
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["self_us"] = _parse_importtime(completed.stderr)
+    return result
+
+
+def _by_package(self_us: Dict[str, int]) -> Dict[str, float]:
+    packages: Dict[str, float] = defaultdict(float)
+    for name, micros in self_us.items():
+        packages[name.split(".")[0]] += micros / 1000
+    return packages
+
+
+def profile(module: str, runs: int, path: str, top: int) -> Dict[str, Any]:
+    results = [run_once(module, path) for _ in range(runs)]
+    packages: Dict[str, List[float]] = defaultdict(list)
+    for result in results:
+        for package, ms in _by_package(result["self_us"]).items():
+            packages[package].append(ms)
+    medians = {package: statistics.median(values) for package, values in packages.items()}
+    report = {
+        "module": module,
+        "runs": runs,
+        "import_ms": round(statistics.median(result["import_ms"] for result in results), 1),
+        "import_ms_min": round(min(result["import_ms"] for result in results), 1),
+        "modules_loaded": len(results[-1]["modules"]),
+        "top_packages": [
+            {"package": package, "self_ms": round(ms, 1)}
+            for package, ms in sorted(medians.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        "loaded": results[-1]["modules"]
+    }
+    if path:
+        report["first_request_path"] = path
+        report["first_request_ms"] = round(statistics.median(result["first_request_ms"] for result in results), 1)
+    return report
+
+
+def _forbidden_imports(loaded: List[str], forbidden: List[str]) -> List[str]:
+    names = set(loaded)
+    return [module for module in forbidden if module in names]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="api.index", help="Entry module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start; the median is reported")
+    parser.add_argument("--first-request", dest="path", default="", help="Also time one GET of this path through the Mangum handler")
+    parser.add_argument("--top", type=int, default=15, help="Packages listed by import self time")
+    parser.add_argument("--max-ms", type=float, default=0.0, help="Fail when the median import time exceeds this (0 = no budget)")
+    parser.add_argument("--forbid", default=",".join(DEFAULT_FORBIDDEN), help="Comma-separated modules that must not load at startup")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = profile(args.module, args.runs, args.path, args.top)
+    forbidden = [module.strip() for module in args.forbid.split(",") if module.strip()]
+    report["forbidden_loaded"] = _forbidden_imports(report["loaded"], forbidden)
+
+    print(f"module={report['module']} runs={report['runs']} modules_loaded={report['modules_loaded']}")
+    print(f"import: median {report['import_ms']} ms, min {report['import_ms_min']} ms")
+    if args.path:
+        print(f"first request {args.path}: median {report['first_request_ms']} ms")
+    print(f"{'package':>24} {'self_ms':>10}")
+    for entry in report["top_packages"]:
+        print(f"{entry['package']:>24} {entry['self_ms']:>10}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"args": vars(args), "report": report}, f, indent=2)
+
+    failures = []
+    if report["forbidden_loaded"]:
+        failures.append(f"imported at startup: {', '.join(report['forbidden_loaded'])}")
+    if args.max_ms and report["import_ms"] > args.max_ms:
+        failures.append(f"median import {report['import_ms']} ms exceeds the {args.max_ms:g} ms budget")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
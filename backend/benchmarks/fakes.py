@@ -0,0 +1,168 @@
+"""
+Local stand-ins for Open-Meteo and cloud storage, so benchmarks run offline.
+
+Both fakes are deterministic: the same request always produces the same
+payload, and injected latency is fixed unless jitter is asked for.
+"""
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.services.weather_service import DAILY_VARIABLES
+from app.storage.storage_client import StorageClient
+
+
+class FakeOpenMeteo(httpx.AsyncBaseTransport):
+    """
+    httpx transport that answers archive requests like Open-Meteo does.
+
+    Each response carries one value per day for every DAILY_VARIABLES entry,
+    plus `padding_variables` extra daily series to inflate the payload.
+    Several comma-separated coordinates return a list, one object each.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, padding_variables: int = 0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.padding_variables = padding_variables
+        self.seed = seed
+        self._random = random.Random(seed)
+        self.requests = 0
+        self.bytes_sent = 0
+
+    def payload(self, latitude: str, longitude: str, start: date, days: int) -> Dict[str, Any]:
+        """The response body for one location (also used to preload storage)"""
+        digest = hashlib.sha256(f"{self.seed}|{latitude}|{longitude}|{start}".encode()).digest()
+        rng = random.Random(digest)
+        daily: Dict[str, Any] = {"time": [(start + timedelta(days=i)).isoformat() for i in range(days)]}
+        names = list(DAILY_VARIABLES) + [f"padding_{i}" for i in range(self.padding_variables)]
+        for name in names:
+            daily[name] = [round(rng.uniform(-20, 35), 1) for _ in range(days)]
+        return {
+            "latitude": float(latitude),
+            "longitude": float(longitude),
+            "generationtime_ms": 0.1,
+            "utc_offset_seconds": 0,
+            "timezone": "GMT",
+            "timezone_abbreviation": "GMT",
+            "elevation": 38.0,
+            "daily_units": {name: "°C" for name in names},
+            "daily": daily
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        params = request.url.params
+        start = date.fromisoformat(params["start_date"])
+        days = (date.fromisoformat(params["end_date"]) - start).days + 1
+        latitudes = params["latitude"].split(",")
+        longitudes = params["longitude"].split(",")
+        locations = [self.payload(lat, lon, start, days) for lat, lon in zip(latitudes, longitudes)]
+        body = json.dumps(locations if len(locations) > 1 else locations[0]).encode("utf-8")
+        self.bytes_sent += len(body)
+        return httpx.Response(200, content=body, headers={"content-type": "application/json"}, request=request)
+
+
+class InMemoryStorageClient(StorageClient):
+    """
+    StorageClient backed by a dict, with a fixed per-call latency.
+
+    The latency is spent in a blocking sleep run through _run_blocking, the
+    same path real SDK calls take, so thread-pool and concurrency limits are
+    exercised as they would be against a bucket.
+    """
+
+    backend_name = "memory"
+
+    def __init__(self, latency: float = 0.0, max_concurrency: int = 16):
+        self.latency = latency
+        self.max_concurrency = max_concurrency
+        self._objects: Dict[str, Tuple[bytes, Dict[str, Any]]] = {}
+        self._names: List[str] = []
+        self.calls = 0
+
+    def _sdk_call(self) -> None:
+        self.calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def put(
+        self,
+        file_name: str,
+        content: bytes,
+        content_type: str = "application/json",
+        content_encoding: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Store an object immediately, without latency (for preloading)"""
+        if file_name not in self._objects:
+            bisect.insort(self._names, file_name)
+        self._objects[file_name] = (content, {
+            "name": file_name,
+            "size": len(content),
+            "etag": hashlib.md5(content).hexdigest(),
+            "content_type": content_type,
+            "content_encoding": content_encoding,
+            "last_modified": datetime.now(timezone.utc),
+            "metadata": dict(metadata or {})
+        })
+
+    async def upload_file(
+        self,
+        file_name: str,
+        content: bytes,
+        content_type: str = "application/json",
+        content_encoding: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> bool:
+        await self._run_blocking(self._sdk_call)
+        self.put(file_name, content, content_type, content_encoding, metadata)
+        return True
+
+    def _entry(self, name: str) -> Dict:
+        head = self._objects[name][1]
+        return {"name": name, "size": head["size"], "created_at": head["last_modified"].isoformat()}
+
+    async def list_files(self) -> List[Dict]:
+        await self._run_blocking(self._sdk_call)
+        return [self._entry(name) for name in self._names]
+
+    async def _list_batch(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        max_keys: int
+    ) -> Tuple[List[Dict], bool]:
+        await self._run_blocking(self._sdk_call)
+        position = bisect.bisect_left(self._names, prefix)
+        if start_after:
+            position = max(position, bisect.bisect_right(self._names, start_after))
+        names = []
+        for name in itertools.islice(self._names, position, None):
+            if not name.startswith(prefix):
+                break
+            names.append(name)
+            if len(names) > max_keys:
+                break
+        return [self._entry(name) for name in names[:max_keys]], len(names) > max_keys
+
+    async def get_file_content(self, file_name: str) -> Optional[bytes]:
+        await self._run_blocking(self._sdk_call)
+        stored = self._objects.get(file_name)
+        return stored[0] if stored else None
+
+    async def head_file(self, file_name: str) -> Optional[Dict[str, Any]]:
+        await self._run_blocking(self._sdk_call)
+        stored = self._objects.get(file_name)
+        return dict(stored[1]) if stored else None
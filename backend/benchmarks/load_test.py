@@ -0,0 +1,277 @@
+"""
+Load test: drive the API in-process against local stand-ins, with no network.
+
+The FastAPI app is called through httpx's ASGI transport. Open-Meteo is
+replaced by FakeOpenMeteo and storage by InMemoryStorageClient, each with
+injected latency. Each scenario runs a fixed number of requests with a
+fixed number of concurrent clients, then reports throughput, latency
+percentiles and memory.
+
+Scenarios:
+    store    POST /api/store-weather-data, one location per request
+    list     GET  /api/list-weather-files, walking pages with the cursor
+    content  GET  /api/weather-file-content/{file}
+    stream   GET  /api/weather-file-stream/{file}
+    mixed    70% content, 20% list, 10% store
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --scenario store --requests 500 --concurrency 32
+    python -m benchmarks.load_test --scenario all --json results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+
+from app.config import settings
+
+SCENARIOS = ["store", "list", "content", "stream", "mixed"]
+
+# Fixed, cacheable window well in the past; --days sets its length
+_FIRST_DAY = date(2023, 1, 1)
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = max(0, math.ceil(percentile / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _configure(args: argparse.Namespace) -> None:
+    """Point every cache and index at memory so runs leave nothing on disk"""
+    settings.FILE_INDEX_PATH = ":memory:"
+    settings.WEATHER_CACHE_DISK_DIR = ""
+    settings.FILE_CONTENT_CACHE_DISK_DIR = ""
+    settings.WEATHER_CACHE_ENABLED = not args.no_weather_cache
+    settings.FILE_CONTENT_CACHE_ENABLED = not args.no_content_cache
+    settings.STORAGE_FORMAT = args.format
+    settings.LONG_RANGE_MAX_DAYS = max(settings.LONG_RANGE_MAX_DAYS, args.days)
+    # The fake upstream has no provider limit; only throttle when asked to
+    settings.UPSTREAM_RATE_LIMIT_PER_SECOND = args.upstream_rate_limit
+    settings.WEATHER_TILES_ENABLED = args.tiles
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        from benchmarks.fakes import FakeOpenMeteo, InMemoryStorageClient
+
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.upstream = FakeOpenMeteo(
+            latency=args.upstream_latency_ms / 1000,
+            jitter=args.upstream_jitter_ms / 1000,
+            padding_variables=args.padding_variables,
+            seed=args.seed
+        )
+        self.storage = InMemoryStorageClient(latency=args.storage_latency_ms / 1000, max_concurrency=args.storage_concurrency)
+        self.files: List[str] = []
+        self.store_counter = 0
+
+    async def setup(self) -> None:
+        from app.services.http_client import init_http_client
+        from app.storage.serialization import get_format, serialize
+        from app.storage.storage_client import set_storage_client
+
+        await init_http_client(transport=self.upstream)
+        set_storage_client(self.storage)
+
+        # Preload stored files for the read scenarios, bypassing injected latency
+        object_format = get_format(self.args.format)
+        end = _FIRST_DAY + timedelta(days=self.args.days - 1)
+        for i in range(self.args.files):
+            latitude, longitude = self._location(i)
+            payload = self.upstream.payload(str(latitude), str(longitude), _FIRST_DAY, self.args.days)
+            name = f"weather_{latitude}_{longitude}_{_FIRST_DAY}_{end}_20240101_{i:06d}{object_format.extension}"
+            self.storage.put(
+                name,
+                serialize(payload, object_format.name),
+                content_type=object_format.content_type,
+                content_encoding=object_format.content_encoding,
+                metadata={"format": object_format.name}
+            )
+            self.files.append(name)
+
+    def _location(self, i: int) -> Tuple[float, float]:
+        # Deterministic, spread-out coordinates; --locations caps the distinct set
+        i = i % self.args.locations if self.args.locations else i
+        return round(-60 + (i * 7.919) % 120, 4), round(-180 + (i * 13.37) % 360, 4)
+
+    async def _store(self, client: httpx.AsyncClient) -> httpx.Response:
+        latitude, longitude = self._location(self.store_counter + self.args.files)
+        self.store_counter += 1
+        end = _FIRST_DAY + timedelta(days=self.args.days - 1)
+        body = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "start_date": _FIRST_DAY.isoformat(),
+            "end_date": end.isoformat(),
+            "long_range": self.args.days > 31
+        }
+        return await client.post("/api/store-weather-data", json=body)
+
+    async def _list(self, client: httpx.AsyncClient) -> httpx.Response:
+        params: Dict[str, Any] = {"page_size": self.args.page_size}
+        response = None
+        for _ in range(self.args.list_pages):
+            response = await client.get("/api/list-weather-files", params=params)
+            cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+            if not cursor:
+                break
+            params["cursor"] = cursor
+        return response
+
+    async def _content(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(f"/api/weather-file-content/{self.random.choice(self.files)}")
+
+    async def _stream(self, client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(f"/api/weather-file-stream/{self.random.choice(self.files)}")
+
+    async def _mixed(self, client: httpx.AsyncClient) -> httpx.Response:
+        roll = self.random.random()
+        if roll < 0.7:
+            return await self._content(client)
+        if roll < 0.9:
+            return await self._list(client)
+        return await self._store(client)
+
+    async def run_scenario(self, name: str) -> Dict[str, Any]:
+        from app.main import app
+
+        operation: Callable[[httpx.AsyncClient], Awaitable[httpx.Response]] = getattr(self, f"_{name}")
+        latencies: List[float] = []
+        errors = 0
+        remaining = iter(range(self.args.requests))
+        upstream_before, storage_before = self.upstream.requests, self.storage.calls
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            async def worker() -> None:
+                nonlocal errors
+                for _ in remaining:
+                    started = time.perf_counter()
+                    try:
+                        response = await operation(client)
+                        if response.status_code >= 400:
+                            errors += 1
+                    except Exception:
+                        errors += 1
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            "scenario": name,
+            "requests": len(latencies),
+            "concurrency": self.args.concurrency,
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "upstream_calls": self.upstream.requests - upstream_before,
+            "storage_calls": self.storage.calls - storage_before,
+            "peak_rss_mb": round(_peak_rss_mb(), 1)
+        }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    from app.services.http_client import close_http_client
+    from app.storage.executor import shutdown_storage_executor
+    from app.storage.file_index import close_file_index
+    from app.storage.storage_client import close_storage_clients, flush_storage_clients
+
+    scenarios = SCENARIOS if args.scenario == "all" else [args.scenario]
+    load_test = LoadTest(args)
+    await load_test.setup()
+    results = []
+    try:
+        for name in scenarios:
+            if args.trace_memory:
+                tracemalloc.start()
+            result = await load_test.run_scenario(name)
+            if args.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                result["traced_peak_mb"] = round(peak / (1024 * 1024), 1)
+            results.append(result)
+    finally:
+        close_file_index()
+        await close_http_client()
+        await flush_storage_clients(settings.STORAGE_HOT_TIER_FLUSH_TIMEOUT_SECONDS)
+        close_storage_clients()
+        shutdown_storage_executor()
+    return results
+
+
+def _print_table(results: List[Dict[str, Any]]) -> None:
+    columns = ["scenario", "requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "upstream_calls", "storage_calls", "peak_rss_mb"]
+    if any("traced_peak_mb" in result for result in results):
+        columns.append("traced_peak_mb")
+    print(" ".join(f"{column:>14}" for column in columns))
+    for result in results:
+        print(" ".join(f"{str(result.get(column, '')):>14}" for column in columns))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS + ["all"], default="all")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0, help="Fake Open-Meteo latency")
+    parser.add_argument("--upstream-jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on upstream latency")
+    parser.add_argument("--upstream-rate-limit", type=float, default=0.0, help="Upstream governor token rate per second (0 = off)")
+    parser.add_argument("--storage-latency-ms", type=float, default=20.0, help="Fake storage latency per call")
+    parser.add_argument("--storage-concurrency", type=int, default=16, help="Concurrent storage calls allowed")
+    parser.add_argument("--days", type=int, default=31, help="Days per stored file / store request (payload size)")
+    parser.add_argument("--padding-variables", type=int, default=0, help="Extra daily series per upstream response")
+    parser.add_argument("--files", type=int, default=200, help="Files preloaded for the read scenarios")
+    parser.add_argument("--locations", type=int, default=0, help="Distinct store locations (0 = every request unique)")
+    parser.add_argument("--page-size", type=int, default=100, help="Page size for the list scenario")
+    parser.add_argument("--list-pages", type=int, default=1, help="Pages walked per list request")
+    parser.add_argument("--format", default="json", help="Storage format for stored and preloaded files")
+    parser.add_argument("--no-weather-cache", action="store_true", help="Disable the archive response cache")
+    parser.add_argument("--no-content-cache", action="store_true", help="Disable the file content cache")
+    parser.add_argument("--tiles", action="store_true", help="Assemble fetches from grid month tiles")
+    parser.add_argument("--trace-memory", action="store_true", help="Report tracemalloc peak (slows the run)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    _configure(args)
+    logging.disable(logging.INFO)
+    print(
+        f"requests={args.requests} concurrency={args.concurrency} upstream={args.upstream_latency_ms}ms "
+        f"storage={args.storage_latency_ms}ms days={args.days} format={args.format}"
+    )
+    results = asyncio.run(run(args))
+    _print_table(results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
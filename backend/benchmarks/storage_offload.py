@@ -0,0 +1,96 @@
+"""
+Benchmark: concurrent storage throughput with and without thread-pool offload.
+
+Simulates a storage SDK whose calls block for a fixed latency, then drives
+N concurrent uploads through two StorageClient implementations:
+
+- blocking:  calls the SDK directly inside the coroutine (the old behaviour)
+- offloaded: calls the SDK through StorageClient._run_blocking
+
+Usage (from the backend directory):
+    python -m benchmarks.storage_offload --latency-ms 50 --requests 200
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from app.storage.executor import shutdown_storage_executor
+from app.storage.storage_client import StorageClient
+
+
+class _SlowSDK:
+    """Stand-in for a synchronous storage SDK with fixed per-call latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.objects: Dict[str, bytes] = {}
+
+    def put_object(self, key: str, body: bytes) -> None:
+        time.sleep(self.latency)
+        self.objects[key] = body
+
+
+class BlockingClient(StorageClient):
+    def __init__(self, sdk: _SlowSDK):
+        self.sdk = sdk
+
+    async def upload_file(self, file_name: str, content: bytes, *args, **kwargs) -> bool:
+        self.sdk.put_object(file_name, content)
+        return True
+
+    async def list_files(self) -> List[Dict]:
+        return []
+
+    async def get_file_content(self, file_name: str) -> Optional[bytes]:
+        return self.sdk.objects.get(file_name)
+
+
+class OffloadedClient(BlockingClient):
+    def __init__(self, sdk: _SlowSDK, max_concurrency: int):
+        super().__init__(sdk)
+        self.max_concurrency = max_concurrency
+
+    async def upload_file(self, file_name: str, content: bytes, *args, **kwargs) -> bool:
+        await self._run_blocking(self.sdk.put_object, file_name, content)
+        return True
+
+
+async def _drive(client: StorageClient, requests: int, concurrency: int) -> float:
+    """Run `requests` uploads with at most `concurrency` in flight; return req/s"""
+    semaphore = asyncio.Semaphore(concurrency)
+    payload = b"x" * 1024
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await client.upload_file(f"bench_{i}.json", payload)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def run(latency_ms: float, requests: int, levels: List[int], max_concurrency: int) -> None:
+    latency = latency_ms / 1000
+    print(f"latency={latency_ms}ms requests={requests} backend_max_concurrency={max_concurrency}")
+    print(f"{'concurrency':>12} {'blocking req/s':>16} {'offloaded req/s':>16} {'speedup':>8}")
+    for level in levels:
+        blocking = await _drive(BlockingClient(_SlowSDK(latency)), requests, level)
+        offloaded = await _drive(OffloadedClient(_SlowSDK(latency), max_concurrency), requests, level)
+        print(f"{level:>12} {blocking:>16.1f} {offloaded:>16.1f} {offloaded / blocking:>7.1f}x")
+    shutdown_storage_executor()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated SDK call latency")
+    parser.add_argument("--requests", type=int, default=200, help="Uploads per concurrency level")
+    parser.add_argument("--levels", type=str, default="1,4,16,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="Per-backend concurrency limit")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",")]
+    asyncio.run(run(args.latency_ms, args.requests, levels, args.max_concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import tempfile
+
+# Settings are read once when app.config is first imported, so scratch paths
+# and offline-friendly defaults must be in place before any test imports the app
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="weather-tests-")
+os.environ.update({
+    "STORAGE_TYPE": "local",
+    "LOCAL_STORAGE_DIR": os.path.join(_SCRATCH_DIR, "storage"),
+    "FILE_INDEX_PATH": os.path.join(_SCRATCH_DIR, "file_index.sqlite3"),
+    "FILE_INDEX_RECONCILE_INTERVAL_SECONDS": "0",
+    "FILE_CONTENT_CACHE_DISK_DIR": "",
+    "WEATHER_CACHE_ENABLED": "false",
+    "WEATHER_CACHE_DISK_DIR": "",
+    "JOB_QUEUE_PATH": os.path.join(_SCRATCH_DIR, "jobs.sqlite3"),
+    "IDEMPOTENCY_STORE_PATH": os.path.join(_SCRATCH_DIR, "idempotency.sqlite3"),
+    "UPSTREAM_RATE_LIMIT_PER_SECOND": "0"
+})
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services.http_client import init_http_client
+from benchmarks.fakes import FakeOpenMeteo
+
+
+@pytest.fixture
+def upstream() -> FakeOpenMeteo:
+    """Offline Open-Meteo stand-in; .requests counts upstream calls"""
+    return FakeOpenMeteo(latency=0.0)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, upstream):
+    """The app against local storage and SQLite files under tmp_path, fed by the fake upstream"""
+    monkeypatch.setattr(settings, "LOCAL_STORAGE_DIR", str(tmp_path / "storage"))
+    monkeypatch.setattr(settings, "FILE_INDEX_PATH", str(tmp_path / "file_index.sqlite3"))
+    monkeypatch.setattr(settings, "JOB_QUEUE_PATH", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(settings, "IDEMPOTENCY_STORE_PATH", str(tmp_path / "idempotency.sqlite3"))
+    with TestClient(app) as test_client:
+        # The lifespan opened a real client; swap in one backed by the fake
+        test_client.portal.call(init_http_client, upstream)
+        yield test_client
@@ -0,0 +1,12 @@
+def test_weather_stats_reports_ok_status(client):
+    body = {"latitude": 35.0, "longitude": 139.0, "start_date": "2023-04-01", "end_date": "2023-04-10"}
+    stored = client.post("/api/store-weather-data", json=body).json()
+    response = client.post(
+        "/api/analytics/weather-stats",
+        json={"files": [stored["file"]], "variables": ["temperature_2m_max"], "include_series": False}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["status"] == "ok"
+    assert result["files"] == 1
+    assert result["days"] == 10
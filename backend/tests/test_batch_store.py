@@ -0,0 +1,59 @@
+import pytest
+
+from app.config import settings
+from app.services import weather_tiles
+from app.services.weather_service import WeatherService
+from app.services.weather_tiles import CACHE_HIT_TILE
+
+ITEM = {"latitude": 52.52, "longitude": 13.41, "start_date": "2023-02-01", "end_date": "2023-02-07"}
+
+
+@pytest.fixture
+def tiles_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "WEATHER_TILES_ENABLED", True)
+    monkeypatch.setattr(weather_tiles, "_weather_tiles", None)
+
+
+def test_items_sharing_a_range_are_fetched_together(client, upstream):
+    items = [ITEM, {**ITEM, "latitude": 40.71, "longitude": -74.01}]
+    response = client.post("/api/store-weather-data/batch", json={"items": items})
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 2
+    assert upstream.requests == 1
+
+
+@pytest.mark.parametrize("override, message", [
+    ({"long_range": True}, "long_range"),
+    ({"long_range_output": "manifest"}, "long_range"),
+    ({"callback_url": "https://hooks.example.com/done"}, "callback_url")
+])
+def test_unsupported_item_options_are_rejected_per_item(client, override, message):
+    response = client.post("/api/store-weather-data/batch", json={"items": [ITEM, {**ITEM, **override}]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "partial"
+    assert body["results"][0]["status"] == "ok"
+    assert body["results"][1]["status"] == "error" and message in body["results"][1]["message"]
+
+
+def test_unexpected_fetch_error_fails_items_not_the_batch(client, monkeypatch):
+    async def broken(self, items):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(WeatherService, "fetch_weather_data_batch", broken)
+    response = client.post("/api/store-weather-data/batch", json={"items": [ITEM, {**ITEM, "start_date": "2023-13-01"}]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "error" and body["failed"] == 2
+    assert "boom" in body["results"][0]["message"]
+    assert "boom" not in body["results"][1]["message"]
+
+
+def test_batch_is_served_from_month_tiles(client, upstream, tiles_enabled):
+    assert client.post("/api/store-weather-data", json=ITEM).status_code == 200
+    calls = upstream.requests
+    nearby = {**ITEM, "latitude": 52.5201, "start_date": "2023-02-10", "end_date": "2023-02-20"}
+    response = client.post("/api/store-weather-data/batch", json={"items": [nearby, nearby]})
+    assert response.status_code == 200
+    assert [result["cache"] for result in response.json()["results"]] == [CACHE_HIT_TILE, CACHE_HIT_TILE]
+    assert upstream.requests == calls
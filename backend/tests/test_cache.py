@@ -0,0 +1,81 @@
+import os
+
+from app.utils.cache import ByteLRUCache, DiskCache
+
+
+def _tmp_files(directory):
+    return [name for _, _, names in os.walk(directory) for name in names if name.startswith(".tmp")]
+
+
+def test_memory_cache_is_bounded_by_bytes_and_evicts_least_recently_used():
+    cache = ByteLRUCache(max_bytes=10)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.set("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    stats = cache.stats()
+    assert stats["bytes"] == 8 and stats["entries"] == 2 and stats["evictions"] == 1
+
+
+def test_memory_cache_skips_values_larger_than_the_budget():
+    cache = ByteLRUCache(max_bytes=4)
+    cache.set("a", b"aaaa")
+    cache.set("big", b"x" * 5)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"aaaa"
+
+
+def test_memory_cache_replacing_a_key_keeps_the_size_right():
+    cache = ByteLRUCache(max_bytes=10)
+    cache.set("a", b"aaaa")
+    cache.set("a", b"aa")
+    assert cache.stats()["bytes"] == 2
+
+
+def test_disk_cache_evicts_by_size(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.set("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.stats()["bytes"] == 8
+    assert sum(len(names) for _, _, names in os.walk(tmp_path)) == 2
+
+
+def test_disk_cache_survives_a_restart_in_recency_order(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+    cache.set("old", b"1111")
+    cache.set("new", b"2222")
+    # Recency is seeded from modification times when the directory is scanned
+    os.utime(cache._path(cache._digest("old")), (1_000_000, 1_000_000))
+    os.utime(cache._path(cache._digest("new")), (2_000_000, 2_000_000))
+
+    restarted = DiskCache(str(tmp_path), max_bytes=6)
+    assert restarted.get("new") == b"2222"
+    assert restarted.get("old") is None
+    assert restarted.stats()["evictions"] == 1
+
+
+def test_disk_cache_ignores_leftover_temp_files(tmp_path):
+    (tmp_path / "ab").mkdir()
+    (tmp_path / "ab" / ".tmpleftover").write_bytes(b"partial")
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+    cache.set("a", b"aaaa")
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 4
+
+
+def test_disk_cache_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+
+    def replace(source, destination):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "replace", replace)
+    cache.set("a", b"aaaa")
+    monkeypatch.undo()
+    assert _tmp_files(tmp_path) == []
+    assert cache.get("a") is None
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.storage.cached_client import CachedStorageClient
+from benchmarks.fakes import InMemoryStorageClient
+
+NAME = "weather_1.0_2.0_2023-01-01_2023-01-02_x.json"
+
+
+class CountingStorageClient(InMemoryStorageClient):
+    """Counts downloads, and can overwrite an object right after the next HEAD"""
+
+    def __init__(self):
+        super().__init__()
+        self.downloads = 0
+        self.overwrite_after_head = None
+
+    async def head_file(self, file_name):
+        head = await super().head_file(file_name)
+        if self.overwrite_after_head is not None:
+            self.put(file_name, self.overwrite_after_head)
+            self.overwrite_after_head = None
+        return head
+
+    async def get_file_content(self, file_name):
+        self.downloads += 1
+        return await super().get_file_content(file_name)
+
+
+@pytest.fixture
+def cache_settings(monkeypatch):
+    monkeypatch.setattr(settings, "FILE_CONTENT_CACHE_DISK_DIR", "")
+    monkeypatch.setattr(settings, "FILE_CONTENT_CACHE_REVALIDATE_SECONDS", 0.0)
+
+
+def test_reads_are_served_from_cache_while_the_validator_holds(cache_settings):
+    backend = CountingStorageClient()
+    backend.put(NAME, b"v1")
+    client = CachedStorageClient(backend)
+
+    async def run():
+        return [await client.get_file_content(NAME) for _ in range(3)]
+
+    assert asyncio.run(run()) == [b"v1"] * 3
+    assert backend.downloads == 1
+
+
+def test_overwrite_between_head_and_get_is_cached_under_the_new_validator(cache_settings):
+    backend = CountingStorageClient()
+    backend.put(NAME, b"v1")
+    backend.overwrite_after_head = b"v2"
+    client = CachedStorageClient(backend)
+
+    async def run():
+        first = await client.get_file_content(NAME)
+        # Revalidates against v2 and finds the copy cached under it
+        second = await client.get_file_content(NAME)
+        backend.put(NAME, b"v3")
+        third = await client.get_file_content(NAME)
+        return first, second, third
+
+    assert asyncio.run(run()) == (b"v2", b"v2", b"v3")
+    assert backend.downloads == 2
@@ -0,0 +1,109 @@
+import asyncio
+import sqlite3
+
+from app.storage.file_index import FileIndex
+from app.storage.storage_client import StorageClient
+from benchmarks.fakes import InMemoryStorageClient
+
+
+def _name(i):
+    return f"weather_1.0_2.0_2023-01-01_2023-01-02_{i:05d}.json"
+
+
+def _bucket(count):
+    client = InMemoryStorageClient()
+    for i in range(count):
+        client.put(_name(i), b"{}")
+    return client
+
+
+class EndsEarlyStorageClient(InMemoryStorageClient):
+    """A backend whose first listing page wrongly reports that nothing follows"""
+
+    async def _list_batch(self, prefix, start_after, max_keys):
+        files, truncated = await super()._list_batch(prefix, start_after, max_keys)
+        return files, truncated and start_after is not None
+
+
+def _names(index):
+    return [row["name"] for row in index.list()]
+
+
+def test_reconcile_adds_new_and_removes_deleted_objects(tmp_path):
+    index = FileIndex(str(tmp_path / "index.sqlite3"))
+    index.upsert_many([{"name": _name(i), "size": 2} for i in (1, 7, 12)])
+    result = asyncio.run(index.reconcile(_bucket(10), batch_size=4, max_objects=0))
+    assert _names(index) == [_name(i) for i in range(10)]
+    assert result["seen"] == 10 and result["removed"] == 1 and result["complete"]
+
+
+def test_reconcile_covers_a_large_bucket_in_bounded_slices(tmp_path):
+    index = FileIndex(str(tmp_path / "index.sqlite3"))
+    # Stale rows before, inside and after the listed keys
+    index.upsert_many([{"name": name, "size": 2} for name in ("a_stale.json", _name(1500) + ".gone", "zz_stale.json")])
+    bucket = _bucket(2500)
+
+    first = asyncio.run(index.reconcile(bucket, batch_size=300, max_objects=1000))
+    assert first["seen"] == 1000 and not first["complete"]
+    assert first["next_start_after"] == _name(999)
+    assert first["removed"] == 1
+    assert "zz_stale.json" in _names(index)
+
+    second = asyncio.run(index.reconcile(bucket, batch_size=300, max_objects=1000))
+    assert second["start_after"] == _name(999) and second["removed"] == 1
+    assert "zz_stale.json" in _names(index)
+
+    third = asyncio.run(index.reconcile(bucket, batch_size=300, max_objects=1000))
+    assert third["seen"] == 500 and third["complete"] and third["next_start_after"] is None
+    assert _names(index) == [_name(i) for i in range(2500)]
+
+
+def test_listing_that_ends_early_does_not_sweep_the_rest(tmp_path):
+    index = FileIndex(str(tmp_path / "index.sqlite3"))
+    bucket = EndsEarlyStorageClient()
+    for i in range(3000):
+        bucket.put(_name(i), b"{}")
+    index.upsert_many([{"name": _name(i), "size": 2} for i in range(3000)])
+
+    result = asyncio.run(index.reconcile(bucket, batch_size=1000, max_objects=0))
+    assert result["seen"] == 1000
+    assert not result["complete"] and result["removed"] == 0
+    assert len(_names(index)) == 3000
+    # The next run picks up where the short listing stopped
+    assert result["next_start_after"] == _name(999)
+
+
+class FailingListStorageClient(InMemoryStorageClient):
+    """A backend without a native paged listing whose list_files() hides an error"""
+
+    _list_batch = StorageClient._list_batch
+
+    async def list_files(self):
+        return []
+
+
+def test_empty_listing_does_not_sweep_a_populated_index(tmp_path):
+    index = FileIndex(str(tmp_path / "index.sqlite3"))
+    index.upsert_many([{"name": _name(i), "size": 2} for i in range(5)])
+
+    result = asyncio.run(index.reconcile(FailingListStorageClient(), max_objects=0))
+    assert result["seen"] == 0 and result["removed"] == 0
+    assert len(_names(index)) == 5
+
+
+def test_summaries_and_migration_of_an_older_index(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE files (name TEXT PRIMARY KEY, latitude REAL, longitude REAL, start_date TEXT, end_date TEXT, "
+        "size INTEGER, created_at TEXT, content_hash TEXT, indexed_at REAL NOT NULL, last_seen_run INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.close()
+    index = FileIndex(path)
+    summary = {"days": 2, "variables": {"temperature_2m_max": {"min": 1.0, "max": 2.0}}}
+    index.upsert({"name": _name(1), "size": 2, "summary": summary})
+    # A later upsert without a summary (reconcile) keeps the stored one
+    index.upsert({"name": _name(1), "size": 3})
+    index.upsert({"name": _name(2), "size": 2})
+    assert index.summaries([_name(1), _name(2), _name(3)]) == {_name(1): summary}
+    assert index.get(_name(1))["summary"] == summary
@@ -0,0 +1,60 @@
+import time
+
+from app.services.idempotency import IdempotencyStore
+
+STORE_BODY = {"latitude": 48.85, "longitude": 2.35, "start_date": "2023-03-01", "end_date": "2023-03-07"}
+
+
+def test_store_round_trip_and_expiry(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "keys.sqlite3"), ttl_seconds=60)
+    try:
+        store.put("key-1", "fingerprint", 200, {"status": "ok", "file": "a.json"})
+        assert store.get("key-1") == {
+            "fingerprint": "fingerprint",
+            "status_code": 200,
+            "body": {"status": "ok", "file": "a.json"}
+        }
+        assert store.get("missing") is None
+        store.ttl_seconds = 0.01
+        time.sleep(0.02)
+        assert store.get("key-1") is None
+    finally:
+        store.close()
+
+
+def test_replay_returns_saved_response_without_a_second_store(client, upstream):
+    headers = {"Idempotency-Key": "replay-1"}
+    first = client.post("/api/store-weather-data", json=STORE_BODY, headers=headers)
+    assert first.status_code == 200
+    assert first.headers["Idempotent-Replayed"] == "false"
+    calls = upstream.requests
+
+    second = client.post("/api/store-weather-data", json=STORE_BODY, headers=headers)
+    assert second.status_code == 200
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+    assert upstream.requests == calls
+    files = client.get("/api/list-weather-files").json()["files"]
+    assert [file["name"] for file in files] == [first.json()["file"]]
+
+
+def test_reused_key_with_a_different_body_is_rejected(client):
+    headers = {"Idempotency-Key": "replay-2"}
+    assert client.post("/api/store-weather-data", json=STORE_BODY, headers=headers).status_code == 200
+    response = client.post("/api/store-weather-data", json={**STORE_BODY, "latitude": 40.0}, headers=headers)
+    assert response.status_code == 422
+    assert response.json()["detail"]["status"] == "error"
+
+
+def test_invalid_key_is_rejected(client):
+    response = client.post("/api/store-weather-data", json=STORE_BODY, headers={"Idempotency-Key": "x" * 256})
+    assert response.status_code == 400
+
+
+def test_failed_request_is_not_saved(client):
+    headers = {"Idempotency-Key": "replay-3"}
+    invalid = client.post("/api/store-weather-data", json={**STORE_BODY, "end_date": "2023-02-01"}, headers=headers)
+    assert invalid.status_code == 400
+    retried = client.post("/api/store-weather-data", json=STORE_BODY, headers=headers)
+    assert retried.status_code == 200
+    assert retried.headers["Idempotent-Replayed"] == "false"
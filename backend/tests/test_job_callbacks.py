@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services.job_queue import MemoryJobQueue
+from app.services.jobs import JobWorkerPool
+from app.utils.validation import validate_callback_url
+
+STORE_BODY = {"latitude": 1.0, "longitude": 2.0, "start_date": "2023-01-01", "end_date": "2023-01-02"}
+
+
+@pytest.mark.parametrize("url, allowed_hosts, valid", [
+    ("https://hooks.example.com/done", ["hooks.example.com"], True),
+    ("https://HOOKS.example.com/done", ["hooks.example.com"], True),
+    ("https://hooks.example.com/done", [], False),
+    ("http://169.254.169.254/latest/meta-data", [], False),
+    ("http://127.0.0.1:8000/internal", ["hooks.example.com"], False),
+    ("ftp://hooks.example.com/done", ["hooks.example.com"], False),
+    ("/relative/path", ["hooks.example.com"], False)
+])
+def test_validate_callback_url(url, allowed_hosts, valid):
+    assert validate_callback_url(url, allowed_hosts)[0] is valid
+
+
+def test_callback_rejected_when_no_hosts_are_allowed(client, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_CALLBACK_ALLOWED_HOSTS", "")
+    response = client.post(
+        "/api/store-weather-data",
+        params={"async": "true"},
+        json={**STORE_BODY, "callback_url": "http://10.0.0.5/hook"}
+    )
+    assert response.status_code == 400
+    assert "JOB_CALLBACK_ALLOWED_HOSTS" in response.json()["detail"]["message"]
+
+
+def test_async_mode_is_rejected_in_serverless_mode(client, upstream, monkeypatch):
+    monkeypatch.setattr(settings, "SERVERLESS_MODE", True)
+    for kwargs in ({"params": {"async": "true"}}, {"headers": {"Prefer": "respond-async"}}):
+        response = client.post("/api/store-weather-data", json=STORE_BODY, **kwargs)
+        assert response.status_code == 400
+        assert "serverless" in response.json()["detail"]["message"]
+    assert upstream.requests == 0
+    # The synchronous path still works
+    assert client.post("/api/store-weather-data", json=STORE_BODY).status_code == 200
+
+
+def _finished_job(queue, callback_url):
+    job = queue.submit("test", {}, callback_url)
+    queue.claim(60)
+    queue.complete(job["id"], {"status": "ok"})
+    return job["id"]
+
+
+def _notify(monkeypatch, allowed_hosts, callback_url):
+    monkeypatch.setattr(settings, "JOB_CALLBACK_ALLOWED_HOSTS", allowed_hosts)
+    sent = []
+
+    def handler(request):
+        sent.append(str(request.url))
+        return httpx.Response(204)
+
+    queue = MemoryJobQueue()
+    pool = JobWorkerPool(queue)
+    job_id = _finished_job(queue, callback_url)
+
+    async def run():
+        pool._callback_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            await pool._notify(job_id)
+        finally:
+            await pool._callback_client.aclose()
+
+    asyncio.run(run())
+    return sent, queue.get(job_id)["callback_status"]
+
+
+def test_delivery_rechecks_the_allowed_hosts(monkeypatch):
+    # Queued while the host was allowed, delivered after it was removed
+    sent, callback_status = _notify(monkeypatch, "", "http://hooks.example.com/done")
+    assert sent == []
+    assert callback_status == "failed"
+
+
+def test_delivery_to_an_allowed_host(monkeypatch):
+    sent, callback_status = _notify(monkeypatch, "hooks.example.com", "http://hooks.example.com/done")
+    assert sent == ["http://hooks.example.com/done"]
+    assert callback_status == "delivered"
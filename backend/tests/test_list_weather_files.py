@@ -0,0 +1,76 @@
+import json
+
+from app.config import settings
+from app.routes import weather
+from app.storage.file_index import get_file_index
+
+
+def _index_files(count):
+    names = [f"weather_1.0_2.0_2023-01-01_2023-01-02_{i:05d}.json" for i in range(count)]
+    get_file_index().upsert_many(
+        {"name": name, "size": 10, "created_at": "2024-01-01T00:00:00+00:00"} for name in names
+    )
+    return names
+
+
+def test_ndjson_from_index_streams_in_bounded_batches(client, monkeypatch):
+    names = _index_files(25)
+    monkeypatch.setattr(weather, "_INDEX_STREAM_BATCH", 10)
+    limits = []
+    file_index = get_file_index()
+    original_list = file_index.list
+
+    def recording_list(prefix, start_after, limit, *args):
+        limits.append(limit)
+        return original_list(prefix, start_after, limit, *args)
+
+    monkeypatch.setattr(file_index, "list", recording_list)
+    response = client.get("/api/list-weather-files", params={"format": "ndjson", "source": "index"})
+    assert response.status_code == 200
+    streamed = [json.loads(line)["name"] for line in response.text.splitlines()]
+    assert streamed == names
+    assert limits == [10, 10, 10]
+
+
+def test_ndjson_from_index_starts_after_cursor(client):
+    names = _index_files(5)
+    page = client.get("/api/list-weather-files", params={"source": "index", "page_size": 2}).json()
+    response = client.get(
+        "/api/list-weather-files",
+        params={"format": "ndjson", "source": "index", "cursor": page["next_cursor"]}
+    )
+    assert [json.loads(line)["name"] for line in response.text.splitlines()] == names[2:]
+
+
+def test_paged_listing_from_storage_covers_every_file(client):
+    for day in range(1, 6):
+        body = {"latitude": 1.0, "longitude": 2.0, "start_date": f"2023-01-0{day}", "end_date": f"2023-01-0{day}"}
+        assert client.post("/api/store-weather-data", json=body).status_code == 200
+    seen, cursor = [], None
+    while True:
+        params = {"page_size": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/list-weather-files", params=params).json()
+        seen += [file["name"] for file in page["files"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+
+def test_summaries_fall_back_to_object_metadata_without_the_index(client, monkeypatch):
+    body = {"latitude": 1.0, "longitude": 2.0, "start_date": "2023-01-01", "end_date": "2023-01-03"}
+    assert client.post("/api/store-weather-data", json=body).status_code == 200
+    monkeypatch.setattr(settings, "FILE_INDEX_ENABLED", False)
+    listings = [
+        client.get("/api/list-weather-files", params={"include_summary": "true"}).json()["files"],
+        client.get("/api/list-weather-files", params={"include_summary": "true", "page_size": 10}).json()["files"],
+        [json.loads(line) for line in client.get(
+            "/api/list-weather-files", params={"include_summary": "true", "format": "ndjson"}
+        ).text.splitlines()]
+    ]
+    for files in listings:
+        assert len(files) == 1
+        summary = files[0]["summary"]
+        assert summary["days"] == 3
+        assert (summary["start_date"], summary["end_date"]) == ("2023-01-01", "2023-01-03")
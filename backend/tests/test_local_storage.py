@@ -0,0 +1,61 @@
+import asyncio
+
+from app.config import settings
+from app.storage.local_client import LocalStorageClient
+
+
+def test_concurrency_limit_is_read_when_the_client_is_built(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_MAX_CONCURRENCY", 3)
+    client = LocalStorageClient(str(tmp_path))
+    assert client.max_concurrency == 3
+
+    async def semaphore_value():
+        return client._get_semaphore()._value
+
+    assert asyncio.run(semaphore_value()) == 3
+
+
+def test_read_validator_matches_head_etag(tmp_path):
+    client = LocalStorageClient(str(tmp_path))
+
+    async def run():
+        await client.upload_file("a.json", b"{}")
+        (tmp_path / "b.json").write_bytes(b"[]")
+        results = []
+        for name in ("a.json", "b.json"):
+            content, validator = await client.get_file_content_with_validator(name)
+            results.append((validator, (await client.head_file(name))["etag"]))
+        results.append(await client.get_file_content_with_validator("missing.json"))
+        return results
+
+    a, b, missing = asyncio.run(run())
+    assert a[0] == a[1] and b[0] == b[1]
+    assert missing == (None, None)
+
+
+def test_paging_walks_the_directory_once_per_pass(tmp_path, monkeypatch):
+    client = LocalStorageClient(str(tmp_path))
+    (tmp_path / "nested").mkdir()
+    for i in range(50):
+        (tmp_path / f"weather_{i:03d}.json").write_bytes(b"{}")
+    (tmp_path / "nested" / "x.json").write_bytes(b"{}")
+    walks = []
+    walk = client._walk_names
+    monkeypatch.setattr(client, "_walk_names", lambda: walks.append(1) or walk())
+
+    async def run():
+        names = [entry["name"] async for entry in client.iter_files(batch_size=7)]
+        # Written through the client: listed without another walk
+        await client.upload_file("weather_025a.json", b"{}")
+        await client.delete_file("weather_000.json")
+        page, _ = await client._list_batch("", "weather_024.json", 2)
+        return names, [entry["name"] for entry in page]
+
+    names, page = asyncio.run(run())
+    assert names == ["nested/x.json"] + [f"weather_{i:03d}.json" for i in range(50)]
+    assert page == ["weather_025.json", "weather_025a.json"]
+    assert len(walks) == 1
+    # A new pass picks up files added behind the client's back
+    (tmp_path / "added.json").write_bytes(b"{}")
+    first, _ = asyncio.run(client._list_batch("", None, 1))
+    assert first[0]["name"] == "added.json" and len(walks) == 2
@@ -0,0 +1,39 @@
+import pytest
+
+from app.config import settings
+
+LONG_RANGE = {
+    "latitude": 35.68,
+    "longitude": 139.69,
+    "start_date": "2019-06-01",
+    "end_date": "2020-06-30",
+    "long_range": True
+}
+
+
+@pytest.fixture
+def single_cap(monkeypatch):
+    monkeypatch.setattr(settings, "LONG_RANGE_SINGLE_MAX_DAYS", 400)
+
+
+def test_single_output_merges_chunks_up_to_the_cap(client, upstream, single_cap):
+    response = client.post("/api/store-weather-data", json=LONG_RANGE)
+    assert response.status_code == 200
+    assert response.json()["chunks"] == 2
+    assert upstream.requests == 2
+
+
+def test_single_output_over_the_cap_is_rejected(client, upstream, monkeypatch):
+    monkeypatch.setattr(settings, "LONG_RANGE_SINGLE_MAX_DAYS", 100)
+    response = client.post("/api/store-weather-data", json=LONG_RANGE)
+    assert response.status_code == 400
+    assert "manifest" in response.json()["detail"]["message"]
+    assert upstream.requests == 0
+
+
+def test_manifest_output_is_not_capped(client, upstream, monkeypatch):
+    monkeypatch.setattr(settings, "LONG_RANGE_SINGLE_MAX_DAYS", 100)
+    response = client.post("/api/store-weather-data", json={**LONG_RANGE, "long_range_output": "manifest"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["chunks"] == 2 and body["file"].endswith(".manifest.json")
@@ -0,0 +1,88 @@
+import re
+from collections import defaultdict
+
+from app.utils.metrics import Counter, Histogram
+
+STORE_BODY = {"latitude": 51.51, "longitude": -0.13, "start_date": "2023-04-01", "end_date": "2023-04-03"}
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def _parse(text):
+    """{family: {"type": ..., "samples": [(name, labels, value)]}} from the exposition text"""
+    families = defaultdict(lambda: {"type": None, "samples": []})
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, current, kind = line.split(" ", 3)
+            families[current]["type"] = kind
+        elif line and not line.startswith("#"):
+            name, labels, value = _SAMPLE.match(line).groups()
+            assert name.startswith(current), f"{name} outside its family {current}"
+            families[current]["samples"].append((name, dict(_LABEL.findall(labels or "")), float(value)))
+    return families
+
+
+def _value(families, family, name=None, **labels):
+    return sum(
+        value for sample_name, sample_labels, value in families[family]["samples"]
+        if sample_name == (name or family) and all(sample_labels.get(k) == v for k, v in labels.items())
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_duration_seconds", "Test latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.labels("/a").observe(value)
+    lines = histogram.render().splitlines()
+    assert lines[2:] == [
+        'test_duration_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_duration_seconds_bucket{route="/a",le="1"} 3',
+        'test_duration_seconds_bucket{route="/a",le="+Inf"} 4',
+        'test_duration_seconds_sum{route="/a"} 6.05',
+        'test_duration_seconds_count{route="/a"} 4'
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("test_total", "Test counter", ["name"])
+    counter.labels('a "quoted"\\path\nnext').inc(2)
+    assert counter.render().splitlines()[-1] == 'test_total{name="a \\"quoted\\"\\\\path\\nnext"} 2'
+
+
+def test_scrape_after_requests(client):
+    stored = client.post("/api/store-weather-data", json=STORE_BODY)
+    assert stored.status_code == 200
+    file_name = stored.json()["file"]
+    assert client.get(f"/api/weather-file-content/{file_name}").status_code == 200
+    assert client.get("/api/no-such-route").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    families = _parse(response.text)
+
+    assert families["http_requests_total"]["type"] == "counter"
+    assert families["http_request_duration_seconds"]["type"] == "histogram"
+    assert families["http_requests_in_flight"]["type"] == "gauge"
+    content_route = "/api/weather-file-content/{file_name:path}"
+    assert _value(families, "http_requests_total", method="GET", route=content_route, status="200") >= 1
+    assert _value(families, "http_requests_total", method="POST", route="/api/store-weather-data", status="200") >= 1
+    assert _value(families, "http_requests_total", method="GET", route="unmatched", status="404") >= 1
+    # Raw paths never become labels
+    assert not any(file_name in labels.get("route", "") for _, labels, _ in families["http_requests_total"]["samples"])
+
+    buckets = [
+        (labels["le"], value) for name, labels, value in families["http_request_duration_seconds"]["samples"]
+        if name.endswith("_bucket") and labels["route"] == content_route
+    ]
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts) and buckets[-1][0] == "+Inf"
+    assert buckets[-1][1] == _value(
+        families, "http_request_duration_seconds", "http_request_duration_seconds_count", route=content_route
+    )
+
+    assert _value(families, "upstream_requests_total", outcome="ok") >= 1
+    assert _value(families, "storage_operations_total", backend="local", operation="upload_file", outcome="ok") >= 1
+    assert _value(families, "storage_bytes_total", backend="local", direction="upload") > 0
@@ -0,0 +1,52 @@
+import pytest
+
+from app.storage.serialization import (
+    FORMAT_COLUMNAR,
+    FORMAT_JSON,
+    FORMAT_JSON_GZIP,
+    FORMAT_JSON_ZSTD,
+    deserialize,
+    detect_format,
+    serialize
+)
+
+WEATHER_DATA = {
+    "latitude": 52.52,
+    "longitude": 13.41,
+    "generationtime_ms": 0.1,
+    "timezone": "GMT",
+    "daily_units": {"time": "iso8601", "temperature_2m_max": "°C"},
+    "daily": {
+        "time": ["2024-02-27", "2024-02-28", "2024-02-29", "2024-03-01"],
+        "temperature_2m_max": [4.5, None, -1.25, 12.0],
+        "temperature_2m_min": [-3.0, -4.5, -7.0, 2.5],
+        "weather_code": [3, 61, 71, 0]
+    }
+}
+
+
+@pytest.mark.parametrize("format_name", [FORMAT_JSON, FORMAT_JSON_GZIP, FORMAT_COLUMNAR])
+def test_round_trip(format_name):
+    content = serialize(WEATHER_DATA, format_name)
+    assert detect_format(content) == format_name
+    assert deserialize(content) == WEATHER_DATA
+
+
+def test_zstd_round_trip():
+    pytest.importorskip("zstandard")
+    content = serialize(WEATHER_DATA, FORMAT_JSON_ZSTD)
+    assert detect_format(content) == FORMAT_JSON_ZSTD
+    assert deserialize(content) == WEATHER_DATA
+
+
+def test_columnar_keeps_irregular_time_and_text_columns():
+    data = {
+        "latitude": 1.0,
+        "daily": {
+            "time": ["2024-01-01", "2024-01-03"],
+            "label": ["a", None],
+            "value": [None, None]
+        }
+    }
+    assert deserialize(serialize(data, FORMAT_COLUMNAR)) == data
+
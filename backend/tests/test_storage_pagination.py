@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.storage.gcs_client import GCSClient
+from app.storage.storage_client import decode_cursor
+from benchmarks.fakes import InMemoryStorageClient
+
+OBJECT_COUNT = 5000
+
+
+class FakeGCS:
+    """list_blobs with the real API's paging semantics (inclusive start_offset)"""
+
+    def __init__(self, names):
+        created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.blobs = [SimpleNamespace(name=name, size=10, time_created=created, metadata=None) for name in sorted(names)]
+        self.calls = 0
+
+    def list_blobs(self, bucket_name, prefix=None, start_offset=None, max_results=None):
+        self.calls += 1
+        matching = [
+            blob for blob in self.blobs
+            if (prefix is None or blob.name.startswith(prefix)) and (start_offset is None or blob.name >= start_offset)
+        ]
+        return iter(matching[:max_results])
+
+
+def _gcs_client(names):
+    # Skip __init__, which resolves real credentials
+    client = GCSClient.__new__(GCSClient)
+    client.client = FakeGCS(names)
+    client.bucket_name = "test-bucket"
+    return client
+
+
+def _in_memory_client(names):
+    client = InMemoryStorageClient()
+    for name in names:
+        client.put(name, b"{}")
+    return client
+
+
+NAMES = [f"weather_{i:05d}.json" for i in range(OBJECT_COUNT)]
+BACKENDS = [_gcs_client, _in_memory_client]
+
+
+async def _collect(client, **kwargs):
+    return [entry["name"] async for entry in client.iter_files(**kwargs)]
+
+
+@pytest.mark.parametrize("make_client", BACKENDS)
+def test_iter_files_reads_past_several_batches(make_client):
+    client = make_client(NAMES)
+    names = asyncio.run(_collect(client, batch_size=1000))
+    assert names == NAMES
+
+
+@pytest.mark.parametrize("make_client", BACKENDS)
+def test_iter_files_resumes_after_start_after(make_client):
+    client = make_client(NAMES)
+    names = asyncio.run(_collect(client, start_after=NAMES[1499], batch_size=1000))
+    assert names == NAMES[1500:]
+
+
+@pytest.mark.parametrize("make_client", BACKENDS)
+def test_list_files_page_walks_every_page(make_client):
+    client = make_client(NAMES)
+
+    async def walk():
+        pages, cursor = [], None
+        while True:
+            page = await client.list_files_page(page_size=1000, cursor=cursor)
+            pages.append([entry["name"] for entry in page["files"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    pages = asyncio.run(walk())
+    assert [len(page) for page in pages] == [1000] * 5
+    assert [name for page in pages for name in page] == NAMES
+
+
+@pytest.mark.parametrize("make_client", BACKENDS)
+def test_last_full_page_has_no_cursor_once_exhausted(make_client):
+    client = make_client(NAMES[:2000])
+
+    async def second_page():
+        first = await client.list_files_page(page_size=1000)
+        assert decode_cursor(first["next_cursor"]) == NAMES[999]
+        return await client.list_files_page(page_size=1000, cursor=first["next_cursor"])
+
+    page = asyncio.run(second_page())
+    assert len(page["files"]) == 1000
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.parametrize("make_client", BACKENDS)
+def test_tiles_are_skipped_in_one_jump(make_client):
+    names = NAMES[:10] + [f"tiles/0.1/1.0_2.0/2023-{month:02d}.json.gz" for month in range(1, 13)] + ["zz.json"]
+    client = make_client(names)
+    assert asyncio.run(_collect(client, batch_size=5)) == NAMES[:10] + ["zz.json"]
+    assert len(asyncio.run(_collect(client, prefix="tiles/"))) == 12
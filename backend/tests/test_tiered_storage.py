@@ -0,0 +1,160 @@
+import asyncio
+import os
+
+import pytest
+
+from app.config import settings
+from app.storage.local_client import LocalStorageClient
+from app.storage.tiered_client import TieredStorageClient
+from benchmarks.fakes import InMemoryStorageClient
+
+
+class RemoteStorageClient(InMemoryStorageClient):
+    """Remote stand-in with GCS-style validators; the first `failures` uploads fail"""
+
+    backend_name = "remote"
+
+    def __init__(self, failures: int = 0):
+        super().__init__()
+        self.failures = failures
+        self.generation = 0
+
+    async def upload_file(self, file_name, content, content_type="application/json", content_encoding=None, metadata=None):
+        if self.failures:
+            self.failures -= 1
+            return False
+        await super().upload_file(file_name, content, content_type, content_encoding, metadata)
+        self.generation += 1
+        self._objects[file_name][1].update(etag=f"remote-{self.generation}", generation=self.generation)
+        return True
+
+    async def get_file_content_with_validator(self, file_name):
+        stored = self._objects.get(file_name)
+        return (stored[0], str(stored[1]["generation"])) if stored else (None, None)
+
+
+@pytest.fixture
+def hot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_HOT_TIER_SYNC_RETRY_MAX_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "STORAGE_HOT_TIER_MAX_BYTES", 1024 * 1024)
+    return str(tmp_path / "hot")
+
+
+def _tiered(hot_dir, cold):
+    return TieredStorageClient(LocalStorageClient(hot_dir), cold)
+
+
+async def _wait_synced(tiered, count):
+    for _ in range(200):
+        await tiered.flush()
+        if tiered.synced >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"only {tiered.synced} of {count} files synced")
+
+
+def test_writes_land_locally_and_sync_in_the_background(hot_dir):
+    cold = RemoteStorageClient()
+    tiered = _tiered(hot_dir, cold)
+
+    async def run():
+        assert await tiered.upload_file("a.json", b"{}")
+        assert "a.json" in tiered._pending
+        assert os.listdir(tiered.journal_dir)
+        await _wait_synced(tiered, 1)
+        return await cold.get_file_content("a.json")
+
+    try:
+        assert asyncio.run(run()) == b"{}"
+        assert not tiered._pending and not os.listdir(tiered.journal_dir)
+    finally:
+        tiered.close()
+
+
+def test_failed_uploads_are_retried(hot_dir):
+    cold = RemoteStorageClient(failures=2)
+    tiered = _tiered(hot_dir, cold)
+
+    async def run():
+        await tiered.upload_file("a.json", b"{}")
+        await _wait_synced(tiered, 1)
+
+    try:
+        asyncio.run(run())
+        assert tiered.sync_failures == 2
+        assert "a.json" in cold._objects
+    finally:
+        tiered.close()
+
+
+def test_journal_resumes_the_sync_after_a_restart(hot_dir):
+    down = _tiered(hot_dir, RemoteStorageClient(failures=1000))
+
+    async def write():
+        await down.upload_file("a.json", b"{}")
+        await down.flush()
+
+    asyncio.run(write())
+    down.close()
+
+    cold = RemoteStorageClient()
+    restarted = _tiered(hot_dir, cold)
+    assert set(restarted._pending) == {"a.json"}
+
+    async def resume():
+        # Any call starts the workers, which pick up the journal
+        assert await restarted.get_file_content("a.json") == b"{}"
+        await _wait_synced(restarted, 1)
+
+    try:
+        asyncio.run(resume())
+        assert "a.json" in cold._objects
+        assert not os.listdir(restarted.journal_dir)
+    finally:
+        restarted.close()
+
+
+def test_eviction_keeps_the_remote_validator(hot_dir, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_HOT_TIER_MAX_BYTES", 25)
+    cold = RemoteStorageClient()
+    tiered = _tiered(hot_dir, cold)
+
+    async def run():
+        await tiered.upload_file("a.json", b"0123456789")
+        await _wait_synced(tiered, 1)
+        before = await tiered.head_file("a.json")
+        validator = (await tiered.get_file_content_with_validator("a.json"))[1]
+        for i, name in enumerate(["b.json", "c.json"]):
+            await tiered.upload_file(name, b"0123456789")
+            await _wait_synced(tiered, i + 2)
+        assert await tiered.hot.head_file("a.json") is None
+        after = await tiered.head_file("a.json")
+        content, evicted_validator = await tiered.get_file_content_with_validator("a.json")
+        return before, validator, after, content, evicted_validator
+
+    try:
+        before, validator, after, content, evicted_validator = asyncio.run(run())
+        assert tiered.evicted == 1
+        assert before["etag"] == after["etag"] == "remote-1"
+        assert validator == evicted_validator == "1"
+        assert content == b"0123456789"
+    finally:
+        tiered.close()
+
+
+def test_pending_files_are_never_evicted(hot_dir, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_HOT_TIER_MAX_BYTES", 5)
+    cold = RemoteStorageClient(failures=1000)
+    tiered = _tiered(hot_dir, cold)
+
+    async def run():
+        await tiered.upload_file("a.json", b"0123456789")
+        await tiered.upload_file("b.json", b"0123456789")
+        await tiered.flush()
+        return [await tiered.get_file_content(name) for name in ("a.json", "b.json")]
+
+    try:
+        assert asyncio.run(run()) == [b"0123456789"] * 2
+        assert tiered.evicted == 0
+    finally:
+        tiered.close()
@@ -0,0 +1,128 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services.upstream_governor import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    UpstreamGovernor,
+    UpstreamUnavailableError
+)
+
+
+def _respond(status_code: int):
+    async def send():
+        return httpx.Response(status_code)
+    return send
+
+
+def _raise(error: Exception):
+    async def send():
+        raise error
+    return send
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    monkeypatch.setattr(settings, "UPSTREAM_CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "UPSTREAM_CIRCUIT_OPEN_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "UPSTREAM_MAX_ATTEMPTS", 1)
+    return UpstreamGovernor()
+
+
+def _open_circuit(governor: UpstreamGovernor) -> None:
+    for _ in range(governor.breaker.failure_threshold):
+        asyncio.run(governor.call(_respond(503)))
+    assert governor.breaker.state == CIRCUIT_OPEN
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker(failure_threshold=2, open_seconds=60)
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["opened"] == 1
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED and breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=3, open_seconds=0)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.allow() and breaker.state == CIRCUIT_HALF_OPEN
+    breaker.open_seconds = 60
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow()
+
+
+def test_open_circuit_rejects_calls(governor):
+    governor.breaker.open_seconds = 60
+    _open_circuit(governor)
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(governor.call(_respond(200)))
+    assert governor.rejected == 1
+
+
+def test_probe_success_closes_circuit(governor):
+    _open_circuit(governor)
+    response = asyncio.run(governor.call(_respond(200)))
+    assert response.status_code == 200
+    assert governor.breaker.state == CIRCUIT_CLOSED
+
+
+@pytest.mark.parametrize("error", [
+    httpx.PoolTimeout("pool exhausted"),
+    RuntimeError("unexpected")
+])
+def test_probe_without_outcome_is_released(governor, error):
+    _open_circuit(governor)
+    with pytest.raises(type(error)):
+        asyncio.run(governor.call(_raise(error)))
+    assert governor.breaker.state == CIRCUIT_HALF_OPEN
+    asyncio.run(governor.call(_respond(200)))
+    assert governor.breaker.state == CIRCUIT_CLOSED
+
+
+def test_cancelled_probe_is_released(governor):
+    _open_circuit(governor)
+
+    async def run():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        probe = asyncio.create_task(governor.call(hang))
+        await started.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        return await governor.call(_respond(200))
+
+    assert asyncio.run(run()).status_code == 200
+    assert governor.breaker.state == CIRCUIT_CLOSED
+
+
+def test_throttled_probe_does_not_close_circuit(governor):
+    _open_circuit(governor)
+    response = asyncio.run(governor.call(_respond(429)))
+    assert response.status_code == 429
+    assert governor.breaker.state == CIRCUIT_HALF_OPEN
+    assert governor.breaker.allow()
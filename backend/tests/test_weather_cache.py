@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from app.config import settings
+from app.services import weather_cache
+from app.services.http_client import UpstreamHTTPClient
+from app.services.weather_cache import (
+    CACHE_BYPASS,
+    CACHE_HIT_DISK,
+    CACHE_HIT_MEMORY,
+    CACHE_MISS,
+    WeatherCache,
+    is_cacheable_range,
+    make_cache_key
+)
+from app.services.weather_service import WeatherService
+from benchmarks.fakes import FakeOpenMeteo
+
+VARIABLES = ["temperature_2m_max", "temperature_2m_min"]
+
+
+@pytest.fixture
+def cache_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "WEATHER_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "WEATHER_CACHE_DISK_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "WEATHER_CACHE_COORD_PRECISION", 4)
+    monkeypatch.setattr(weather_cache, "_weather_cache", None)
+
+
+def test_key_normalizes_coordinate_precision():
+    key = make_cache_key(52.52, 13.405, "2023-01-01", "2023-01-31", VARIABLES)
+    assert make_cache_key(52.520001, 13.40500004, "2023-01-01", "2023-01-31", VARIABLES) == key
+    assert make_cache_key(52.5201, 13.405, "2023-01-01", "2023-01-31", VARIABLES) != key
+    assert make_cache_key(-0.0, 0.0, "2023-01-01", "2023-01-31", VARIABLES) == \
+        make_cache_key(0.0, -0.0, "2023-01-01", "2023-01-31", VARIABLES)
+
+
+def test_key_ignores_variable_order_and_duplicates():
+    key = make_cache_key(1.0, 2.0, "2023-01-01", "2023-01-31", VARIABLES)
+    assert make_cache_key(1.0, 2.0, "2023-01-01", "2023-01-31", VARIABLES[::-1] + VARIABLES) == key
+
+
+def test_ranges_within_the_freshness_window_are_not_cacheable(monkeypatch):
+    monkeypatch.setattr(settings, "WEATHER_CACHE_FRESHNESS_DAYS", 5)
+    cutoff = date.today() - timedelta(days=5)
+    assert is_cacheable_range(cutoff.isoformat())
+    assert not is_cacheable_range((cutoff + timedelta(days=1)).isoformat())
+    assert not is_cacheable_range(date.today().isoformat())
+    assert not is_cacheable_range("not-a-date")
+
+
+def test_disk_tier_serves_entries_after_a_restart(cache_settings):
+    data = {"daily": {"time": ["2023-01-01"], "temperature_2m_max": [1.5]}}
+
+    async def run():
+        await WeatherCache().set("key", data)
+        restarted = WeatherCache()
+        return [await restarted.get("key"), await restarted.get("key"), await restarted.get("other")]
+
+    assert asyncio.run(run()) == [(data, CACHE_HIT_DISK), (data, CACHE_HIT_MEMORY), (None, CACHE_MISS)]
+
+
+def test_service_reports_miss_hit_and_bypass(cache_settings):
+    upstream = FakeOpenMeteo(latency=0.0)
+
+    async def run():
+        service = WeatherService(UpstreamHTTPClient(transport=upstream))
+        try:
+            statuses = []
+            for latitude, bypass in [(10.0, False), (10.00001, False), (10.0, True)]:
+                _, status = await service.fetch_weather_data_with_cache_status(
+                    latitude, 20.0, "2023-05-01", "2023-05-07", bypass_cache=bypass
+                )
+                statuses.append(status)
+            return statuses
+        finally:
+            await service.http_client.aclose()
+
+    assert asyncio.run(run()) == [CACHE_MISS, CACHE_HIT_MEMORY, CACHE_BYPASS]
+    assert upstream.requests == 2
+
+
+def test_service_does_not_cache_recent_ranges(cache_settings):
+    upstream = FakeOpenMeteo(latency=0.0)
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=6)
+
+    async def run():
+        service = WeatherService(UpstreamHTTPClient(transport=upstream))
+        try:
+            return [
+                (await service.fetch_weather_data_with_cache_status(10.0, 20.0, start.isoformat(), end.isoformat()))[1]
+                for _ in range(2)
+            ]
+        finally:
+            await service.http_client.aclose()
+
+    assert asyncio.run(run()) == [CACHE_BYPASS, CACHE_BYPASS]
+    assert upstream.requests == 2
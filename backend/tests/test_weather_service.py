@@ -0,0 +1,43 @@
+import asyncio
+
+from app.services.http_client import UpstreamHTTPClient
+from app.services.weather_cache import CACHE_BYPASS
+from app.services.weather_service import WeatherService
+from benchmarks.fakes import FakeOpenMeteo
+
+
+async def _fetch_concurrently(service, *bypass_flags):
+    return await asyncio.gather(*(
+        service.fetch_weather_data_with_cache_status(10.0, 20.0, "2023-05-01", "2023-05-07", bypass_cache=bypass)
+        for bypass in bypass_flags
+    ))
+
+
+def test_identical_concurrent_fetches_share_one_upstream_call():
+    upstream = FakeOpenMeteo(latency=0.05)
+
+    async def run():
+        service = WeatherService(UpstreamHTTPClient(transport=upstream))
+        try:
+            return await _fetch_concurrently(service, False, False, False)
+        finally:
+            await service.http_client.aclose()
+
+    results = asyncio.run(run())
+    assert upstream.requests == 1
+    assert results[0][0] == results[1][0] == results[2][0]
+
+
+def test_bypass_does_not_join_a_regular_fetch():
+    upstream = FakeOpenMeteo(latency=0.05)
+
+    async def run():
+        service = WeatherService(UpstreamHTTPClient(transport=upstream))
+        try:
+            return await _fetch_concurrently(service, False, True)
+        finally:
+            await service.http_client.aclose()
+
+    _, (_, bypass_status) = asyncio.run(run())
+    assert upstream.requests == 2
+    assert bypass_status == CACHE_BYPASS
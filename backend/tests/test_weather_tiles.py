@@ -0,0 +1,120 @@
+import asyncio
+import math
+from datetime import date, timedelta
+
+import pytest
+
+from app.config import settings
+from app.services import weather_tiles
+from app.services.weather_cache import CACHE_MISS
+from app.services.weather_tiles import CACHE_HIT_TILE, CACHE_PARTIAL, WeatherTileStore, month_ranges, snap_to_grid
+from app.storage.serialization import serialize
+from benchmarks.fakes import InMemoryStorageClient
+
+
+class FakeUpstream:
+    """Archive stand-in: one value per day, the day of the month"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, latitude, longitude, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "daily": {"time": [day.isoformat() for day in days], "value": [day.day for day in days]}
+        }
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setattr(settings, "WEATHER_TILE_GRID_DEGREES", 0.1)
+    monkeypatch.setattr(settings, "WEATHER_TILE_FORMAT", "json-gzip")
+    monkeypatch.setattr(settings, "WEATHER_CACHE_FRESHNESS_DAYS", 5)
+    backend = InMemoryStorageClient()
+    monkeypatch.setattr(weather_tiles, "get_storage_client", lambda: backend)
+    return backend
+
+
+def _days(start, end):
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    return [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+
+def test_month_ranges_cover_partial_months_and_year_ends():
+    assert month_ranges(date(2023, 12, 20), date(2024, 2, 3)) == [
+        (date(2023, 12, 1), date(2023, 12, 31)),
+        (date(2024, 1, 1), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29))
+    ]
+    assert month_ranges(date(2023, 2, 10), date(2023, 2, 10)) == [(date(2023, 2, 1), date(2023, 2, 28))]
+
+
+@pytest.mark.parametrize("latitude, longitude, grid, expected", [
+    (51.5149, -0.1278, 0.1, (51.5, -0.1)),
+    (51.5149, -0.1278, 0.25, (51.5, -0.25)),
+    (89.99, 179.99, 0.25, (90.0, 180.0)),
+    (0.3, 0.3, 0.1, (0.3, 0.3))
+])
+def test_snap_to_grid(latitude, longitude, grid, expected):
+    assert snap_to_grid(latitude, longitude, grid) == expected
+
+
+def test_snap_to_grid_has_no_negative_zero():
+    latitude, longitude = snap_to_grid(-0.04, -0.04, 0.1)
+    assert math.copysign(1.0, latitude) == math.copysign(1.0, longitude) == 1.0
+
+
+def test_missing_months_are_fetched_in_one_call_per_run(storage):
+    store = WeatherTileStore()
+    upstream = FakeUpstream()
+    feb = {"latitude": 10.0, "longitude": 20.0, "daily": {"time": _days("2020-02-01", "2020-02-29"), "value": list(range(1, 30))}}
+    storage.put(store.tile_name(10.0, 20.0, date(2020, 2, 1)), serialize(feb, "json-gzip"))
+
+    async def run():
+        first = await store.fetch(10.01, 19.99, "2020-01-10", "2020-04-05", upstream)
+        second = await store.fetch(10.0, 20.0, "2020-01-10", "2020-04-05", upstream)
+        return first, second
+
+    (data, status), (again, again_status) = asyncio.run(run())
+    # Jan on its own, then Mar-Apr together, each fetched as whole months
+    assert upstream.calls == [("2020-01-01", "2020-01-31"), ("2020-03-01", "2020-04-30")]
+    assert status == CACHE_PARTIAL and again_status == CACHE_HIT_TILE
+    # Sliced to the request across the month edges, with no gaps or repeats
+    assert data["daily"]["time"] == _days("2020-01-10", "2020-04-05")
+    assert data["daily"]["value"] == [date.fromisoformat(day).day for day in data["daily"]["time"]]
+    assert again == data
+    assert store.tiles_stored == 3
+
+
+def test_unsettled_months_are_fetched_but_not_stored(storage, monkeypatch):
+    # Settled up to 2020-02-15: January is stored, February and March are not
+    monkeypatch.setattr(settings, "WEATHER_CACHE_FRESHNESS_DAYS", (date.today() - date(2020, 2, 15)).days)
+    store = WeatherTileStore()
+    upstream = FakeUpstream()
+
+    async def run():
+        return [await store.fetch(10.0, 20.0, "2020-01-20", "2020-03-10", upstream) for _ in range(2)]
+
+    (data, status), (again, again_status) = asyncio.run(run())
+    assert upstream.calls == [("2020-01-01", "2020-03-10"), ("2020-02-01", "2020-03-10")]
+    assert status == CACHE_MISS and again_status == CACHE_PARTIAL
+    assert list(storage._objects) == [store.tile_name(10.0, 20.0, date(2020, 1, 1))]
+    assert data["daily"]["time"] == again["daily"]["time"] == _days("2020-01-20", "2020-03-10")
+
+
+def test_corrupt_tile_is_fetched_again(storage):
+    store = WeatherTileStore()
+    upstream = FakeUpstream()
+    name = store.tile_name(10.0, 20.0, date(2020, 1, 1))
+    tile = {"latitude": 10.0, "longitude": 20.0, "daily": {"time": _days("2020-01-01", "2020-01-31"), "value": [0] * 31}}
+    storage.put(name, serialize(tile, "json-gzip")[:20])
+
+    data, status = asyncio.run(store.fetch(10.0, 20.0, "2020-01-01", "2020-01-31", upstream))
+    assert status == CACHE_MISS and upstream.calls == [("2020-01-01", "2020-01-31")]
+    assert data["daily"]["value"] == list(range(1, 32))
+    # The refetched month replaced the unreadable tile
+    assert asyncio.run(store._load(name)) == data
@@ -110,6 +110,13 @@ export default function WeatherFileList({ refreshTrigger, onFileSelect }: Weathe
     }
   }
 
+  const formatTemperatureRange = (file: FileInfo): string | null => {
+    const max = file.summary?.variables?.temperature_2m_max
+    const min = file.summary?.variables?.temperature_2m_min
+    if (!max || !min) return null
+    return `${min.min.toFixed(1)}° – ${max.max.toFixed(1)}°C`
+  }
+
   const handleFileClick = (fileName: string) => {
     setSelectedFile(fileName)
     onFileSelect(fileName)
@@ -312,6 +319,15 @@ export default function WeatherFileList({ refreshTrigger, onFileSelect }: Weathe
                         <span className="hidden sm:inline">{formatDate(file.created_at)}</span>
                         <span className="sm:hidden">{new Date(file.created_at || '').toLocaleDateString('en-US', { month: 'short', day: 'numeric' })}</span>
                       </span>
+                      {file.summary && (
+                        <span className="inline-flex items-center gap-1 px-1.5 sm:px-2 py-0.5 bg-gray-50 rounded-md font-medium">
+                          <span className="text-xs">🌡️</span>
+                          {formatTemperatureRange(file) ?? `${file.summary.days} days`}
+                          {formatTemperatureRange(file) && (
+                            <span className="hidden sm:inline text-gray-400">· {file.summary.days} days</span>
+                          )}
+                        </span>
+                      )}
                     </div>
                   </div>
                   {selectedFile === file.name && (
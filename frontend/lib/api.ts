@@ -51,10 +51,25 @@ export interface WeatherResponse {
   message?: string
 }
 
+export interface VariableRange {
+  min: number
+  max: number
+}
+
+export interface FileSummary {
+  days: number
+  latitude?: number
+  longitude?: number
+  start_date?: string
+  end_date?: string
+  variables: Record<string, VariableRange>
+}
+
 export interface FileInfo {
   name: string
   size: number
   created_at?: string
+  summary?: FileSummary | null
 }
 
 export interface FileListResponse {
@@ -87,6 +102,8 @@ export const weatherAPI = {
   listWeatherFiles: async (cancelToken?: CancelTokenSource): Promise<FileListResponse> => {
     try {
       const response = await api.get<FileListResponse>('/list-weather-files', {
+        // Summaries are stored at write time, so listing them costs no content downloads
+        params: { include_summary: true },
         cancelToken: cancelToken?.token,
       })
       // Ensure files is always an array